@@ -8,7 +8,7 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
-from sse_starlette.sse import EventSourceResponse, ServerSentEvent
+from sse_starlette.sse import EventSourceResponse
 
 from app.api.deps import get_llm_client, get_current_user
 from app.core.sse import sse
@@ -49,7 +49,7 @@ def sse_session(
     turn_id: str,
     title: str,
     is_new_thread: bool,
-) -> ServerSentEvent:
+) -> bytes:
     """创建 session 事件"""
     return sse(
         {
@@ -62,7 +62,7 @@ def sse_session(
     )
 
 
-def sse_session_error(code: str, message: str) -> ServerSentEvent:
+def sse_session_error(code: str, message: str) -> bytes:
     """创建会话级错误事件"""
     return sse({"code": code, "message": message}, event="error")
 
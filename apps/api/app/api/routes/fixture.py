@@ -9,15 +9,59 @@ from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from sse_starlette.sse import EventSourceResponse
 
-from app.core.sse import sse_error
-from app.services.processor_stream import stream_excel_processing
-from app.engine.excel_parser import ExcelParser
+from app.core.sse import SSE_HEADERS, sse_error
 from app.services.fixture import get_fixture_service
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/fixture", tags=["fixture"])
 
+# 同时运行的测试用例上限
+MAX_CONCURRENT_RUNS = 4
+
+
+class _AdmissionController:
+    """
+    并发准入控制
+
+    每个运行中的用例都会占用解析线程、LLM 客户端和 OSS 连接，
+    限制并发数可避免突发请求耗尽 asyncio.to_thread 共用的线程池。
+    基于 asyncio.Condition 实现，调整上限时唤醒所有等待者重新判断。
+    """
+
+    def __init__(self, max_concurrent: int):
+        self._max_concurrent = max_concurrent
+        self._active = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: self._active < self._max_concurrent
+            )
+            self._active += 1
+
+    async def release(self) -> None:
+        async with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    async def resize(self, max_concurrent: int) -> None:
+        """调整并发上限"""
+        async with self._condition:
+            self._max_concurrent = max_concurrent
+            self._condition.notify_all()
+
+    async def __aenter__(self) -> "_AdmissionController":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.release()
+
+
+_admission = _AdmissionController(MAX_CONCURRENT_RUNS)
+
 
 # ============ Response Models ============
 
@@ -195,6 +239,11 @@ async def run_fixture_case(
     - export:result: 导出结果 → { output_files }
     - complete: 完成 → { success, errors }
     """
+    # 处理链路依赖 pandas/openpyxl，延迟到实际运行用例时再导入，
+    # 列表、详情等只读接口不需要承担这部分导入开销
+    from app.engine.excel_parser import ExcelParser
+    from app.services.processor_stream import stream_excel_processing
+
     service = get_fixture_service()
 
     # 预加载场景和用例（在流之前验证）
@@ -207,27 +256,28 @@ async def run_fixture_case(
 
     async def stream():
         try:
-            # 加载文件的函数
-            async def load_tables():
-                file_paths = {ds.path.stem: ds.path for ds in scenario.datasets}
-                return await asyncio.to_thread(
-                    ExcelParser.parse_multiple_files, file_paths
-                )
-
-            # 执行处理流程
-            async for sse_event in stream_excel_processing(
-                load_tables_fn=load_tables,
-                query=case.prompt,
-                stream_llm=stream_llm,
-                export_path_prefix=f"fixture_outputs/{scenario_id}/{case_id}",
-            ):
-                yield sse_event
+            async with _admission:
+                # 加载文件的函数
+                async def load_tables():
+                    file_paths = {ds.path.stem: ds.path for ds in scenario.datasets}
+                    return await asyncio.to_thread(
+                        ExcelParser.parse_multiple_files, file_paths
+                    )
+
+                # 执行处理流程
+                async for sse_event in stream_excel_processing(
+                    load_tables_fn=load_tables,
+                    query=case.prompt,
+                    stream_llm=stream_llm,
+                    export_path_prefix=f"fixture_outputs/{scenario_id}/{case_id}",
+                ):
+                    yield sse_event
 
         except Exception as e:
             logger.exception(f"运行测试用例失败: {e}")
             yield sse_error(f"运行失败: {e}")
 
-    return EventSourceResponse(stream())
+    return EventSourceResponse(stream(), headers=SSE_HEADERS)
 
 
 @router.get("/cases", response_model=List[Dict[str, Any]])
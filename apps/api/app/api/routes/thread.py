@@ -61,12 +61,10 @@ async def get_threads(
             Permissions.THREAD_READ_ALL
         )
 
-        # 查询线程，按更新时间倒序
+        # 查询线程，按更新时间倒序（只取当前页，不与消息表 JOIN）
         stmt = (
-            select(Thread, func.count(ThreadTurn.id).label("turn_count"))
-            .outerjoin(ThreadTurn, Thread.id == ThreadTurn.thread_id)
+            select(Thread)
             .where(Thread.status == "active")
-            .group_by(Thread.id)
             .order_by(Thread.updated_at.desc())
             .limit(limit)
             .offset(offset)
@@ -77,17 +75,28 @@ async def get_threads(
             stmt = stmt.where(Thread.user_id == current_user.id)
 
         result = await db.execute(stmt)
-        rows = result.all()
+        thread_rows = result.scalars().all()
+
+        # 仅统计当前页线程的消息数量
+        turn_counts = {}
+        if thread_rows:
+            count_stmt = (
+                select(ThreadTurn.thread_id, func.count(ThreadTurn.id))
+                .where(ThreadTurn.thread_id.in_([t.id for t in thread_rows]))
+                .group_by(ThreadTurn.thread_id)
+            )
+            count_result = await db.execute(count_stmt)
+            turn_counts = dict(count_result.all())
 
         threads = []
-        for thread, turn_count in rows:
+        for thread in thread_rows:
             threads.append(ThreadListItem(
                 id=str(thread.id),
                 title=thread.title,
                 status=thread.status,
                 created_at=thread.created_at,
                 updated_at=thread.updated_at,
-                turn_count=turn_count or 0,
+                turn_count=turn_counts.get(thread.id, 0),
             ))
 
         return ApiResponse(
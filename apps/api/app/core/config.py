@@ -1,5 +1,6 @@
 """配置"""
 
+from functools import cached_property
 from pathlib import Path
 from typing import Optional
 
@@ -38,9 +39,9 @@ class Settings(BaseSettings):
 
     DEFAULT_AVATAR: str = "/storage/llm-excel/__SYS__/default_avatar.png"
 
-    @property
+    @cached_property
     def DATABASE_URL_ASYNC(self) -> str:
-        """始终返回 postgresql+asyncpg URL，供应用与 Alembic 使用。"""
+        """始终返回 postgresql+asyncpg URL，供应用与 Alembic 使用（首次访问后缓存）。"""
         u = self.DATABASE_URL
         if u.startswith("postgresql://") and "+asyncpg" not in u and "+psycopg" not in u:
             return u.replace("postgresql://", "postgresql+asyncpg://", 1)
@@ -1,9 +1,21 @@
 """SSE 事件辅助函数"""
 
 import json
+from json.encoder import encode_basestring, encode_basestring_ascii
 from typing import Any, Optional
 
-from sse_starlette.sse import ServerSentEvent
+try:
+    import orjson
+except ImportError:
+    # orjson 为可选依赖，未安装时退回标准库 json
+    orjson = None
+
+# orjson 选项：原生序列化 numpy 标量/数组与无时区 datetime，允许非字符串键（与 json.dumps 行为一致）
+_ORJSON_OPTIONS = (
+    orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+    if orjson is not None
+    else 0
+)
 
 
 class StepStatus:
@@ -15,36 +27,79 @@ class StepStatus:
     ERROR = "error"
 
 
-def sse(data: Any, event: Optional[str] = None) -> ServerSentEvent:
+# SSE 响应头：禁止缓存，并关闭反向代理（nginx 等）的响应缓冲，保证事件实时送达
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+
+def _frame(payload: str, event: Optional[str] = None) -> bytes:
+    """
+    将 JSON 文本封装为完整的 SSE 帧
+
+    json.dumps 的输出不含换行，可直接作为单行 data 字段；
+    EventSourceResponse 对 bytes 原样透传，无需再构造 ServerSentEvent。
+    """
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+    return f"data: {payload}\n\n".encode("utf-8")
+
+
+def sse(data: Any, event: Optional[str] = None) -> bytes:
     """创建 SSE 事件"""
-    return ServerSentEvent(data=json.dumps(data, ensure_ascii=False), event=event)
+    return _frame(json.dumps(data, ensure_ascii=False), event)
 
 
-def sse_error(message: str) -> ServerSentEvent:
+def sse_error(message: str) -> bytes:
     """创建系统级错误事件"""
     return sse({"message": message}, event="error")
 
 
-def sse_step_running(step: str, stage_id: str) -> ServerSentEvent:
+def sse_step_running(step: str, stage_id: str) -> bytes:
     """创建步骤开始事件"""
     return sse({"step": step, "status": StepStatus.RUNNING, "stage_id": stage_id})
 
 
-def sse_step_streaming(step: str, delta: str, stage_id: str) -> ServerSentEvent:
-    """创建步骤流式输出事件"""
-    return sse(
-        {"step": step, "status": StepStatus.STREAMING, "delta": delta, "stage_id": stage_id}
+def _json_str(value: str) -> str:
+    """编码 JSON 字符串字面量（纯 ASCII 走更快的转义路径，结果与 json.dumps 一致）"""
+    if value.isascii():
+        return encode_basestring_ascii(value)
+    return encode_basestring(value)
+
+
+def sse_step_streaming(step: str, delta: str, stage_id: str) -> bytes:
+    """
+    创建步骤流式输出事件
+
+    流式增量是最高频的事件，直接拼接 JSON，跳过 json.dumps 的编码器构造开销。
+    """
+    payload = (
+        f'{{"step": {_json_str(step)}, "status": "{StepStatus.STREAMING}", '
+        f'"delta": {_json_str(delta)}, "stage_id": {_json_str(stage_id)}}}'
     )
+    return _frame(payload)
+
+
+def _dumps_output(data: Any) -> str:
+    """序列化步骤完成事件（输出可能包含整张表的结构信息，优先使用 orjson）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=_ORJSON_OPTIONS).decode("utf-8")
+        except TypeError:
+            # orjson 不支持的类型（如超过 64 位的整数）交给标准库处理
+            pass
+    return json.dumps(data, ensure_ascii=False)
 
 
-def sse_step_done(step: str, output: Any, stage_id: Optional[str] = None) -> ServerSentEvent:
+def sse_step_done(step: str, output: Any, stage_id: Optional[str] = None) -> bytes:
     """创建步骤完成事件"""
     data = {"step": step, "status": StepStatus.DONE, "output": output}
     if stage_id:
         data["stage_id"] = stage_id
-    return sse(data)
+    return _frame(_dumps_output(data))
 
 
-def sse_step_error(step: str, error: str, stage_id: str) -> ServerSentEvent:
+def sse_step_error(step: str, error: str, stage_id: str) -> bytes:
     """创建步骤错误事件"""
     return sse({"step": step, "status": StepStatus.ERROR, "error": error, "stage_id": stage_id})
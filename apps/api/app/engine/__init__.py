@@ -18,6 +18,7 @@ from app.engine.models import (
     DIV0,
     VALUE,
     REF,
+    ERROR,
     Table,
     ExcelFile,
     FileCollection,
@@ -42,6 +43,7 @@ __all__ = [
     "DIV0",
     "VALUE",
     "REF",
+    "ERROR",
     "Table",
     "ExcelFile",
     "FileCollection",
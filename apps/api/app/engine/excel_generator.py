@@ -1,8 +1,10 @@
 """Excel 公式生成器 - 将 JSON 格式公式转换为 Excel 公式"""
 
-from typing import Dict, List, Any, Union
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from app.engine.models import (
     FileCollection,
+    AggregateOperation,
     AddColumnOperation,
     UpdateColumnOperation,
     FilterOperation,
@@ -12,15 +14,85 @@ from app.engine.models import (
     TakeOperation,
     SelectColumnsOperation,
     DropColumnsOperation,
+    column_letter_to_index,
 )
 
+# 单个生成器实例最多缓存的公式数量（超出时淘汰最久未使用的）
+FORMULA_CACHE_MAXSIZE = 4096
+
+# 公式结果中的版本要求说明
+_EXCEL_365 = "Excel 365+"
+_NOTE_EXCEL_365 = "此公式需要 Excel 365 或 Excel 2021 及以上版本"
+_NOTE_GROUPBY = "GROUPBY 函数需要 Excel 365（2023年9月更新版本）"
+_NOTE_TAKE = "TAKE 函数需要 Excel 365 或 Excel 2021 及以上版本"
+_NOTE_CHOOSECOLS = "CHOOSECOLS 函数需要 Excel 365 或 Excel 2021 及以上版本"
+
+# 聚合函数 -> 兜底描述中的中文名称
+_AGGREGATE_DESCRIPTIONS = {
+    "SUM": "求和",
+    "COUNT": "计数",
+    "COUNTA": "非空计数",
+    "AVERAGE": "平均值",
+    "MIN": "最小值",
+    "MAX": "最大值",
+    "MEDIAN": "中位数",
+    "SUMIF": "条件求和",
+    "COUNTIF": "条件计数",
+    "AVERAGEIF": "条件平均值",
+}
+
 
 class ExcelFormulaGenerator:
     """Excel 公式生成器"""
 
+    __slots__ = (
+        "tables",
+        "column_mapping",
+        "_col_to_letter",
+        "_data_range_cache",
+        "_column_range_cache",
+        "_formula_cache",
+        "_handlers",
+    )
+
+    # 运算符映射（JSON 运算符 -> Excel 运算符）
+    _OP_MAP = {
+        "==": "=",
+        "!=": "<>",
+    }
+
+    # 固定输出片段
+    _TRUE = "TRUE"
+    _FALSE = "FALSE"
+    _ERROR = "#ERROR"
+    _UNKNOWN = "#UNKNOWN"
+
     def __init__(self, tables: FileCollection):
         self.tables = tables
         self.column_mapping = tables.get_column_mapping()  # 三层：file_id -> sheet_name -> col_name -> letter
+        # 扁平索引：(file_id, sheet_name, col_name) -> letter，列查找只需一次哈希
+        # 键包含文件和 sheet，不同表的同名列互不覆盖
+        self._col_to_letter: Dict[tuple, str] = {
+            (file_id, sheet_name, col_name): letter
+            for file_id, sheets in self.column_mapping.items()
+            for sheet_name, mapping in sheets.items()
+            for col_name, letter in mapping.items()
+        }
+        # 整表数据范围缓存：(file_id, sheet_name) -> (数据范围, 列名列表, 列名 -> 列序号)，表不可用时为 None
+        self._data_range_cache: Dict[tuple, Optional[Tuple[str, List[str], Dict[str, int]]]] = {}
+        # 整列范围缓存：(file_id, sheet_name, col_name) -> "sheet!列:列"
+        self._column_range_cache: Dict[tuple, str] = {}
+        # 公式缓存：(冻结后的表达式, file_id, sheet_name, row_placeholder) -> 公式
+        self._formula_cache: "OrderedDict[tuple, str]" = OrderedDict()
+        # 表达式节点分派表：判别键 -> 处理方法，按顺序匹配
+        self._handlers = (
+            ("value", self._emit_value),
+            ("col", self._emit_col),
+            ("ref", self._emit_ref),
+            ("var", self._emit_var),
+            ("func", self._emit_func),
+            ("op", self._emit_op),
+        )
 
     def generate_formula(
         self,
@@ -32,6 +104,10 @@ class ExcelFormulaGenerator:
         """
         将 JSON 表达式转换为 Excel 公式
 
+        使用显式栈按从左到右的顺序展开表达式：栈中元素为待展开的子表达式或
+        _Token（固定文本片段），所有片段追加到同一个缓冲区，最后只 join 一次，
+        既避免深层嵌套时的递归调用，也不产生逐层拼接的中间字符串。
+
         Args:
             expr: JSON 表达式对象
             file_id: 当前文件 ID
@@ -41,60 +117,142 @@ class ExcelFormulaGenerator:
         Returns:
             Excel 公式字符串
         """
+        # 相同的公式模板（多个操作共用的表达式）直接复用已生成的结果
+        try:
+            key = (_freeze(expr), file_id, sheet_name, row_placeholder)
+            cached = self._formula_cache.get(key)
+        except TypeError:
+            # 表达式中含不可哈希的值时不缓存
+            key = cached = None
+        if cached is not None:
+            self._formula_cache.move_to_end(key)
+            return cached
+
+        buf: List[str] = []
+        stack: List[Any] = [expr]
+
+        while stack:
+            item = stack.pop()
+            if type(item) is _Token:
+                buf.append(item)
+            else:
+                self._emit(item, buf, stack, file_id, sheet_name, row_placeholder)
+
+        formula = "".join(buf)
+        if key is not None:
+            self._formula_cache[key] = formula
+            if len(self._formula_cache) > FORMULA_CACHE_MAXSIZE:
+                self._formula_cache.popitem(last=False)
+        return formula
+
+    def _emit(
+        self,
+        expr: Union[Dict, Any],
+        buf: List[str],
+        stack: List[Any],
+        file_id: str,
+        sheet_name: str,
+        row_placeholder: str,
+    ) -> None:
+        """
+        展开单个表达式节点
+
+        叶子节点直接写入 buf；函数、运算等复合节点把自身的文本片段和子表达式
+        逆序压入 stack，由 generate_formula 的主循环继续展开。
+        """
         if not isinstance(expr, dict):
             # 原始值
             if isinstance(expr, str):
-                return f'"{expr}"'
-            return str(expr)
-
-        # 字面量
-        if "value" in expr:
-            value = expr["value"]
-            if isinstance(value, str):
-                return f'"{value}"'
-            if isinstance(value, bool):
-                return "TRUE" if value else "FALSE"
-            return str(value)
-
-        # 列引用（当前行）
-        if "col" in expr:
-            col_name = expr["col"]
-            # 从当前表获取列字母
-            col_letter = self._find_column_letter(file_id, sheet_name, col_name)
-            return f"{col_letter}{row_placeholder}"
+                buf.append(_quote_str(expr))
+            else:
+                buf.append(str(expr))
+            return
+
+        # 按判别键分派（顺序即优先级）
+        for key, handler in self._handlers:
+            if key in expr:
+                handler(expr, buf, stack, file_id, sheet_name, row_placeholder)
+                return
+
+        buf.append(self._UNKNOWN)
 
-        # 跨表引用
-        if "ref" in expr:
-            return self._generate_ref(expr["ref"])
+    def _emit_value(self, expr: Dict, buf: List[str], stack: List[Any], file_id: str, sheet_name: str, row_placeholder: str) -> None:
+        """字面量"""
+        value = expr["value"]
+        if isinstance(value, str):
+            buf.append(_quote_str(value))
+        elif isinstance(value, bool):
+            buf.append(self._TRUE if value else self._FALSE)
+        else:
+            buf.append(str(value))
+
+    def _emit_col(self, expr: Dict, buf: List[str], stack: List[Any], file_id: str, sheet_name: str, row_placeholder: str) -> None:
+        """列引用（当前行）"""
+        # 从当前表获取列字母
+        buf.append(self._find_column_letter(file_id, sheet_name, expr["col"]))
+        buf.append(row_placeholder)
 
-        # 变量引用 - 引用前面 aggregate/compute 操作的结果
-        if "var" in expr:
-            var_name = expr["var"]
-            # 在 Excel 中，变量通常需要用命名范围或单元格引用
-            # 这里生成一个占位符，提示用户替换为实际的聚合结果
-            return f"${{{var_name}}}"
+    def _emit_ref(self, expr: Dict, buf: List[str], stack: List[Any], file_id: str, sheet_name: str, row_placeholder: str) -> None:
+        """跨表引用"""
+        buf.append(self._generate_ref(expr["ref"]))
 
-        # 函数调用
-        if "func" in expr:
-            return self._generate_function(
-                expr["func"], expr.get("args", []), file_id, sheet_name, row_placeholder
-            )
+    def _emit_var(self, expr: Dict, buf: List[str], stack: List[Any], file_id: str, sheet_name: str, row_placeholder: str) -> None:
+        """变量引用 - 引用前面 aggregate/compute 操作的结果"""
+        # 在 Excel 中，变量通常需要用命名范围或单元格引用
+        # 这里生成一个占位符，提示用户替换为实际的聚合结果
+        var_name = expr["var"]
+        buf.append(f"${{{var_name}}}")
 
-        # 二元运算
-        if "op" in expr:
-            return self._generate_binary_op(
-                expr["op"], expr["left"], expr["right"], file_id, sheet_name, row_placeholder
-            )
+    def _emit_func(self, expr: Dict, buf: List[str], stack: List[Any], file_id: str, sheet_name: str, row_placeholder: str) -> None:
+        """函数调用"""
+        self._emit_function(expr["func"], expr.get("args", []), buf, stack)
 
-        return "#UNKNOWN"
+    def _emit_op(self, expr: Dict, buf: List[str], stack: List[Any], file_id: str, sheet_name: str, row_placeholder: str) -> None:
+        """二元运算"""
+        self._emit_binary_op(expr["op"], expr["left"], expr["right"], stack)
 
     def _find_column_letter(self, file_id: str, sheet_name: str, col_name: str) -> str:
         """找到列名对应的 Excel 列字母"""
-        if file_id in self.column_mapping:
-            if sheet_name in self.column_mapping[file_id]:
-                mapping = self.column_mapping[file_id][sheet_name]
-                return mapping.get(col_name, "?")
-        return "?"
+        return self._col_to_letter.get((file_id, sheet_name, col_name), "?")
+
+    def _column_range(self, file_id: str, sheet_name: str, col_name: str) -> str:
+        """获取整列引用（sheet!列:列），按列缓存"""
+        key = (file_id, sheet_name, col_name)
+        col_range = self._column_range_cache.get(key)
+        if col_range is None:
+            col_letter = self._find_column_letter(file_id, sheet_name, col_name)
+            col_range = self._column_range_cache[key] = f"{sheet_name}!{col_letter}:{col_letter}"
+        return col_range
+
+    def _get_data_range(self, file_id: str, table_name: str) -> Optional[Tuple[str, List[str], Dict[str, int]]]:
+        """
+        获取整表数据范围（sheet!首列:末列）、列名列表和列名 -> 列序号（从 1 开始），按表缓存
+
+        表不存在或没有列时返回 None，由调用方使用 A:Z 等兜底写法。
+        """
+        key = (file_id, table_name)
+        try:
+            return self._data_range_cache[key]
+        except KeyError:
+            pass
+
+        try:
+            columns = self.tables.get_table(file_id, table_name).get_columns()
+        except Exception:
+            columns = []
+
+        entry = None
+        if columns:
+            first_col = self._find_column_letter(file_id, table_name, columns[0])
+            last_col = self._find_column_letter(file_id, table_name, columns[-1])
+            positions: Dict[str, int] = {}
+            for position, col_name in enumerate(columns, 1):
+                # 重名列取第一个，与 list.index 一致
+                positions.setdefault(col_name, position)
+            entry = (f"{table_name}!{first_col}:{last_col}", columns, positions)
+
+        self._data_range_cache[key] = entry
+        return entry
 
     def _generate_ref(self, ref: str) -> str:
         """生成跨表引用（三段式：file_id.sheet_name.column_name）"""
@@ -104,120 +262,181 @@ class ExcelFormulaGenerator:
 
         file_id, sheet_name, col_name = parts
 
-        # 获取列字母
-        col_letter = self._find_column_letter(file_id, sheet_name, col_name)
-
         # 生成 Excel 引用格式：sheet_name!列:列
-        return f"{sheet_name}!{col_letter}:{col_letter}"
-
-    def _generate_function(
-        self, func_name: str, args: List, file_id: str, sheet_name: str, row_placeholder: str
-    ) -> str:
-        """生成函数调用"""
+        return self._column_range(file_id, sheet_name, col_name)
+
+    @staticmethod
+    def _push_call(stack: List[Any], open_tok: "_Token", args: List, sep: "_Token", close_tok: "_Token"):
+        """将 open_tok arg1 sep arg2 ... close_tok 逆序压栈（出栈即为从左到右的顺序）"""
+        stack.append(close_tok)
+        for i in range(len(args) - 1, -1, -1):
+            stack.append(args[i])
+            if i:
+                stack.append(sep)
+        stack.append(open_tok)
+
+    def _emit_function(self, func_name: str, args: List, buf: List[str], stack: List[Any]) -> None:
+        """展开函数调用"""
         func_upper = func_name.upper()
 
-        # COUNTIFS 特殊处理
-        if func_upper == "COUNTIFS":
-            return self._generate_countifs(args, file_id, sheet_name, row_placeholder)
-
-        # VLOOKUP 特殊处理
-        if func_upper == "VLOOKUP":
-            return self._generate_vlookup(args, file_id, sheet_name, row_placeholder)
-
-        # IF
-        if func_upper == "IF":
-            if len(args) != 3:
-                return "#ERROR"
-            cond = self.generate_formula(args[0], file_id, sheet_name, row_placeholder)
-            true_val = self.generate_formula(args[1], file_id, sheet_name, row_placeholder)
-            false_val = self.generate_formula(args[2], file_id, sheet_name, row_placeholder)
-            return f"IF({cond}, {true_val}, {false_val})"
-
-        # CONCAT -> 使用 & 连接
-        if func_upper == "CONCAT":
-            parts = [self.generate_formula(arg, file_id, sheet_name, row_placeholder) for arg in args]
-            return "&".join(parts)
-
-        # 其他函数
-        arg_strs = [self.generate_formula(arg, file_id, sheet_name, row_placeholder) for arg in args]
-        return f"{func_upper}({', '.join(arg_strs)})"
-
-    def _generate_countifs(
-        self, args: List, file_id: str, sheet_name: str, row_placeholder: str
-    ) -> str:
-        """生成 COUNTIFS 公式"""
+        # IF、CONCAT、COUNTIFS、VLOOKUP 需要特殊处理
+        handler = self._SPECIAL_FUNCTIONS.get(func_upper)
+        if handler is not None:
+            handler(self, args, buf, stack)
+            return
+
+        # 其他函数（函数名开头片段按名称缓存复用）
+        open_tok = _FUNC_OPEN_TOKENS.get(func_upper)
+        if open_tok is None:
+            open_tok = _FUNC_OPEN_TOKENS[func_upper] = _Token(func_upper + "(")
+        self._push_call(stack, open_tok, args, _ARG_SEP, _CLOSE)
+
+    def _emit_if(self, args: List, buf: List[str], stack: List[Any]) -> None:
+        """展开 IF 公式（必须是三个参数）"""
+        if len(args) != 3:
+            buf.append(self._ERROR)
+            return
+        self._push_call(stack, _IF_OPEN, args, _ARG_SEP, _CLOSE)
+
+    def _emit_concat(self, args: List, buf: List[str], stack: List[Any]) -> None:
+        """展开 CONCAT（使用 & 连接）"""
+        self._push_call(stack, _EMPTY, args, _CONCAT_SEP, _EMPTY)
+
+    def _emit_countifs(self, args: List, buf: List[str], stack: List[Any]) -> None:
+        """展开 COUNTIFS 公式（范围与条件成对出现）"""
         if len(args) % 2 != 0:
-            return "#ERROR"
-
-        parts = []
-        for i in range(0, len(args), 2):
-            range_expr = args[i]
-            criteria_expr = args[i + 1]
-
-            # 范围
-            range_str = self.generate_formula(range_expr, file_id, sheet_name, row_placeholder)
-            # 条件
-            criteria_str = self.generate_formula(criteria_expr, file_id, sheet_name, row_placeholder)
-
-            parts.append(range_str)
-            parts.append(criteria_str)
+            buf.append(self._ERROR)
+            return
 
-        return f"COUNTIFS({', '.join(parts)})"
+        self._push_call(stack, _COUNTIFS_OPEN, args, _ARG_SEP, _CLOSE)
 
-    def _generate_vlookup(
-        self, args: List, file_id: str, sheet_name: str, row_placeholder: str
-    ) -> str:
-        """生成 VLOOKUP 公式（表引用格式：file_id.sheet_name）"""
+    def _emit_vlookup(self, args: List, buf: List[str], stack: List[Any]) -> None:
+        """展开 VLOOKUP 公式（表引用格式：file_id.sheet_name）"""
         if len(args) != 4:
-            return "#ERROR"
+            buf.append(self._ERROR)
+            return
+
+        # 只有查找值需要生成公式，其余参数为字面量，可提前算出尾部片段
+        tail = self._vlookup_tail(args)
+        if tail is None:
+            buf.append(self._ERROR)
+            return
+
+        stack.append(_Token(tail))
+        stack.append(args[0])
+        stack.append(_VLOOKUP_OPEN)
+
+    @staticmethod
+    def _unwrap_literal(arg: Any) -> Any:
+        """取出字面量参数的值：{"value": x} -> x，其他参数原样返回"""
+        if isinstance(arg, dict):
+            try:
+                return arg["value"]
+            except KeyError:
+                return arg
+        return arg
 
-        lookup_value = self.generate_formula(args[0], file_id, sheet_name, row_placeholder)
-        table_ref = args[1].get("value", args[1]) if isinstance(args[1], dict) else args[1]  # "file_id.sheet_name"
-        key_col = args[2].get("value", args[2]) if isinstance(args[2], dict) else args[2]
-        value_col = args[3].get("value", args[3]) if isinstance(args[3], dict) else args[3]
+    def _vlookup_tail(self, args: List) -> Optional[str]:
+        """生成 VLOOKUP 查找值之后的部分：", sheet!起:止, 偏移, FALSE)"，表引用无效时返回 None"""
+        table_ref = self._unwrap_literal(args[1])  # "file_id.sheet_name"
+        key_col = self._unwrap_literal(args[2])
+        value_col = self._unwrap_literal(args[3])
 
         # 解析表引用
         parts = table_ref.split(".")
         if len(parts) != 2:
-            return "#ERROR"
+            return None
         target_file_id, target_sheet = parts
 
         # 获取表的列映射
-        if target_file_id not in self.column_mapping:
-            return "#ERROR"
-        if target_sheet not in self.column_mapping[target_file_id]:
-            return "#ERROR"
-        mapping = self.column_mapping[target_file_id][target_sheet]
+        mapping = self.column_mapping.get(target_file_id, {}).get(target_sheet)
+        if mapping is None:
+            return None
 
         key_letter = mapping.get(key_col, "A")
         value_letter = mapping.get(value_col, "B")
 
-        # 计算列偏移
-        key_idx = ord(key_letter) - ord('A')
-        value_idx = ord(value_letter) - ord('A')
+        # 计算列偏移（按列索引计算，支持 AA、AB 等多字母列）
+        key_idx = column_letter_to_index(key_letter)
+        value_idx = column_letter_to_index(value_letter)
         col_offset = value_idx - key_idx + 1
 
-        # 确定范围
-        start_col = min(key_letter, value_letter)
-        end_col = max(key_letter, value_letter)
+        # 确定范围（按索引比较，避免 "AA" < "B" 这类字符串比较错误；直接复用已有的列标识）
+        if key_idx <= value_idx:
+            start_col, end_col = key_letter, value_letter
+        else:
+            start_col, end_col = value_letter, key_letter
 
-        return f"VLOOKUP({lookup_value}, {target_sheet}!{start_col}:{end_col}, {col_offset}, FALSE)"
+        return "".join((", ", target_sheet, "!", start_col, ":", end_col, ", ", str(col_offset), ", FALSE)"))
+
+    def _emit_binary_op(self, op: str, left, right, stack: List[Any]) -> None:
+        """展开二元运算"""
+        # 运算符片段按 JSON 运算符缓存复用
+        op_tok = _OP_TOKENS.get(op)
+        if op_tok is None:
+            op_tok = _OP_TOKENS[op] = _Token(self._OP_MAP.get(op) or op)
+
+        stack.append(_CLOSE)
+        stack.append(right)
+        stack.append(op_tok)
+        stack.append(left)
+        stack.append(_OPEN)
+
+    # 需要特殊处理的函数（函数名 -> 展开方法），其他函数按 FUNC(arg1, arg2, ...) 生成
+    _SPECIAL_FUNCTIONS = {
+        "IF": _emit_if,
+        "CONCAT": _emit_concat,
+        "COUNTIFS": _emit_countifs,
+        "VLOOKUP": _emit_vlookup,
+    }
+
+
+def _freeze(expr: Any) -> tuple:
+    """
+    将 JSON 表达式展开为扁平的可哈希元组，用作公式缓存的键
+
+    用显式栈前序遍历：字典记为 (dict, 键元组)、列表记为 (list, 长度)，随后依次是各子节点，
+    结果不含嵌套元组，深层嵌套的表达式在展开、哈希和比较时都不会递归。
+    标量带上类型，避免 True/1/1.0 这类相等但生成公式不同的值发生冲突。
+    """
+    parts = []
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            parts.append((dict, tuple(node)))
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, (list, tuple)):
+            parts.append((list, len(node)))
+            stack.extend(reversed(node))
+        else:
+            parts.append((type(node), node))
+    return tuple(parts)
+
+
+def _quote_str(value: str) -> str:
+    """生成 Excel 字符串字面量（内部的双引号写成两个双引号）"""
+    return '"' + value.replace('"', '""') + '"'
+
+
+class _Token(str):
+    """公式中的固定文本片段（与需要继续展开的子表达式区分）"""
+
+    __slots__ = ()
 
-    def _generate_binary_op(
-        self, op: str, left, right, file_id: str, sheet_name: str, row_placeholder: str
-    ) -> str:
-        """生成二元运算"""
-        left_str = self.generate_formula(left, file_id, sheet_name, row_placeholder)
-        right_str = self.generate_formula(right, file_id, sheet_name, row_placeholder)
-
-        # 运算符映射
-        op_map = {
-            "==": "=",
-            "!=": "<>",
-        }
-        excel_op = op_map.get(op, op)
 
-        return f"({left_str}{excel_op}{right_str})"
+_EMPTY = _Token("")
+_OPEN = _Token("(")
+_CLOSE = _Token(")")
+_ARG_SEP = _Token(", ")
+_CONCAT_SEP = _Token("&")
+_IF_OPEN = _Token("IF(")
+_COUNTIFS_OPEN = _Token("COUNTIFS(")
+_VLOOKUP_OPEN = _Token("VLOOKUP(")
+
+# 已生成的运算符片段（JSON 运算符 -> _Token）与函数开头片段（函数名 -> "FUNC("）
+_OP_TOKENS: Dict[str, _Token] = {}
+_FUNC_OPEN_TOKENS: Dict[str, _Token] = {}
 
 
 def _get_description(op, fallback: str) -> str:
@@ -247,224 +466,245 @@ def generate_formulas(operations: List, tables: FileCollection) -> List[Dict]:
     Returns:
         公式结果列表
     """
-    generator = ExcelFormulaGenerator(tables)
+    # 同一文件集合在表结构不变时复用生成器（列映射与公式缓存），结构变化后重新创建
+    generator = tables.get_derived(
+        "formula_generator", lambda: ExcelFormulaGenerator(tables)
+    )
     results = []
 
+    # 文件名缓存：连续的操作通常针对同一文件
+    filenames: Dict[str, str] = {}
+
+    def filename_of(file_id: str) -> str:
+        filename = filenames.get(file_id)
+        if filename is None:
+            filename = filenames[file_id] = tables.get_file(file_id).filename
+        return filename
+
     for op in operations:
-        if isinstance(op, AddColumnOperation):
-            # add_column 操作
-            if isinstance(op.formula, dict):
-                formula_template = generator.generate_formula(
-                    op.formula, op.file_id, op.table
-                )
-                excel_file = tables.get_file(op.file_id)
-                fallback_desc = f"在 {op.table} 表中新增「{op.name}」列"
-                results.append({
-                    "type": "add_column",
-                    "file_id": op.file_id,
-                    "filename": excel_file.filename,
-                    "sheet": op.table,
-                    "column_name": op.name,
-                    "formula_template": f"={formula_template}",
-                    "description": _get_description(op, fallback_desc)
-                })
-
-        elif isinstance(op, UpdateColumnOperation):
-            # update_column 操作
-            if isinstance(op.formula, dict):
-                formula_template = generator.generate_formula(
-                    op.formula, op.file_id, op.table
-                )
-                excel_file = tables.get_file(op.file_id)
-                fallback_desc = f"更新 {op.table} 表中「{op.column}」列的值"
-                results.append({
-                    "type": "update_column",
-                    "file_id": op.file_id,
-                    "filename": excel_file.filename,
-                    "sheet": op.table,
-                    "column_name": op.column,
-                    "formula_template": f"={formula_template}",
-                    "description": _get_description(op, fallback_desc)
-                })
-
-        elif isinstance(op, FilterOperation):
-            # filter 操作
-            excel_file = tables.get_file(op.file_id)
-            formula = _generate_filter_formula(op, generator)
-            output_name = op.output.get("name", op.table)
-            fallback_desc = f"筛选 {op.table} 表中符合条件的数据到 {output_name}"
-            results.append({
-                "type": "filter",
-                "file_id": op.file_id,
-                "filename": excel_file.filename,
-                "sheet": op.table,
-                "output_sheet": output_name,
-                "formula": formula,
-                "description": _get_description(op, fallback_desc),
-                "excel_version": "Excel 365+",
-                "note": "此公式需要 Excel 365 或 Excel 2021 及以上版本"
-            })
-
-        elif isinstance(op, SortOperation):
-            # sort 操作
-            excel_file = tables.get_file(op.file_id)
-            formula = _generate_sort_formula(op, generator)
-            output_type = op.output.get("type", "in_place") if op.output else "in_place"
-            output_name = op.output.get("name", op.table) if op.output else op.table
-            fallback_desc = f"对 {op.table} 表按指定列排序"
-            if output_type == "new_sheet":
-                fallback_desc += f"，结果输出到 {output_name}"
-            results.append({
-                "type": "sort",
-                "file_id": op.file_id,
-                "filename": excel_file.filename,
-                "sheet": op.table,
-                "output_sheet": output_name,
-                "formula": formula,
-                "description": _get_description(op, fallback_desc),
-                "excel_version": "Excel 365+",
-                "note": "此公式需要 Excel 365 或 Excel 2021 及以上版本"
-            })
-
-        elif isinstance(op, GroupByOperation):
-            # group_by 操作
-            excel_file = tables.get_file(op.file_id)
-            formula = _generate_groupby_formula(op, generator)
-            output_name = op.output["name"]
-            group_cols = ", ".join(op.group_columns)
-            fallback_desc = f"按 {group_cols} 分组统计 {op.table} 表，结果输出到 {output_name}"
-            results.append({
-                "type": "group_by",
-                "file_id": op.file_id,
-                "filename": excel_file.filename,
-                "sheet": op.table,
-                "output_sheet": output_name,
-                "formula": formula,
-                "description": _get_description(op, fallback_desc),
-                "excel_version": "Excel 365+",
-                "note": "GROUPBY 函数需要 Excel 365（2023年9月更新版本）"
-            })
-
-        elif isinstance(op, CreateSheetOperation):
-            # create_sheet 操作（无 Excel 公式）
-            excel_file = tables.get_file(op.file_id)
-            source_type = op.source.get("type", "empty") if op.source else "empty"
-            if source_type == "empty":
-                fallback_desc = f"创建新工作表 {op.name}"
-            elif source_type == "copy":
-                fallback_desc = f"复制 {op.source.get('table')} 到新工作表 {op.name}"
-            else:
-                fallback_desc = f"创建工作表 {op.name}（结构引用 {op.source.get('table')}）"
-            results.append({
-                "type": "create_sheet",
-                "file_id": op.file_id,
-                "filename": excel_file.filename,
-                "sheet": op.name,
-                "formula": "（无对应公式，手动创建工作表）",
-                "description": _get_description(op, fallback_desc),
-                "note": "这是工作表操作，需要手动在 Excel 中创建"
-            })
-
-        elif isinstance(op, TakeOperation):
-            # take 操作
-            excel_file = tables.get_file(op.file_id)
-            formula = _generate_take_formula(op, generator)
-            output_type = op.output.get("type", "in_place") if op.output else "in_place"
-            output_name = op.output.get("name", op.table) if op.output else op.table
-
-            if op.rows > 0:
-                fallback_desc = f"从 {op.table} 表取前 {op.rows} 行"
-            else:
-                fallback_desc = f"从 {op.table} 表取后 {abs(op.rows)} 行"
-            if output_type == "new_sheet":
-                fallback_desc += f"，结果输出到 {output_name}"
-
-            results.append({
-                "type": "take",
-                "file_id": op.file_id,
-                "filename": excel_file.filename,
-                "sheet": op.table,
-                "output_sheet": output_name,
-                "formula": formula,
-                "description": _get_description(op, fallback_desc),
-                "excel_version": "Excel 365+",
-                "note": "TAKE 函数需要 Excel 365 或 Excel 2021 及以上版本"
-            })
-
-        elif isinstance(op, SelectColumnsOperation):
-            # select_columns 操作
-            excel_file = tables.get_file(op.file_id)
-            formula = _generate_select_columns_formula(op, generator)
-            output_type = op.output.get("type", "in_place") if op.output else "in_place"
-            output_name = op.output.get("name", op.table) if op.output else op.table
-            fallback_desc = f"从 {op.table} 表中选择指定列"
-            if output_type == "new_sheet":
-                fallback_desc += f"，结果输出到 {output_name}"
-            results.append({
-                "type": "select_columns",
-                "file_id": op.file_id,
-                "filename": excel_file.filename,
-                "sheet": op.table,
-                "output_sheet": output_name,
-                "formula": formula,
-                "description": _get_description(op, fallback_desc),
-                "excel_version": "Excel 365+",
-                "note": "CHOOSECOLS 函数需要 Excel 365 或 Excel 2021 及以上版本"
-            })
-
-        elif isinstance(op, DropColumnsOperation):
-            # drop_columns 操作
-            excel_file = tables.get_file(op.file_id)
-            formula = _generate_drop_columns_formula(op, generator)
-            output_type = op.output.get("type", "in_place") if op.output else "in_place"
-            output_name = op.output.get("name", op.table) if op.output else op.table
-            fallback_desc = f"从 {op.table} 表中删除指定列"
-            if output_type == "new_sheet":
-                fallback_desc += f"，结果输出到 {output_name}"
-            results.append({
-                "type": "drop_columns",
-                "file_id": op.file_id,
-                "filename": excel_file.filename,
-                "sheet": op.table,
-                "output_sheet": output_name,
-                "formula": formula,
-                "description": _get_description(op, fallback_desc),
-                "excel_version": "Excel 365+",
-                "note": "CHOOSECOLS 函数需要 Excel 365 或 Excel 2021 及以上版本"
-            })
-
-        elif hasattr(op, 'function'):
-            # aggregate 操作
-            excel_file = tables.get_file(op.file_id)
-            # 生成更友好的兜底描述
-            func_desc_map = {
-                "SUM": "求和",
-                "COUNT": "计数",
-                "COUNTA": "非空计数",
-                "AVERAGE": "平均值",
-                "MIN": "最小值",
-                "MAX": "最大值",
-                "MEDIAN": "中位数",
-                "SUMIF": "条件求和",
-                "COUNTIF": "条件计数",
-                "AVERAGEIF": "条件平均值"
-            }
-            func_name = func_desc_map.get(op.function, op.function)
-            col_part = f"「{op.column}」列" if op.column else ""
-            fallback_desc = f"计算 {op.table} 表{col_part}的{func_name}"
-            results.append({
-                "type": "aggregate",
-                "file_id": op.file_id,
-                "filename": excel_file.filename,
-                "sheet": op.table,
-                "variable": op.as_var,
-                "formula": f"=聚合公式（{op.function}）",
-                "description": _get_description(op, fallback_desc)
-            })
+        # 按操作的具体类型分派（操作类型均为 models 中的 dataclass，不存在子类）
+        build = _RESULT_BUILDERS.get(type(op))
+        if build is None:
+            continue
+        result = build(op, generator, filename_of)
+        if result is not None:
+            results.append(result)
 
     return results
 
 
+def _output_target(op) -> tuple:
+    """获取 sort/take/select_columns/drop_columns 的 (输出类型, 输出表名)，未指定 output 时为原表"""
+    if not op.output:
+        return "in_place", op.table
+    return op.output.get("type", "in_place"), op.output.get("name", op.table)
+
+
+def _with_output(desc: str, op) -> str:
+    """输出到新 sheet 时在描述后补充输出表"""
+    output_type, output_name = _output_target(op)
+    if output_type == "new_sheet":
+        desc += f"，结果输出到 {output_name}"
+    return desc
+
+
+def _add_column_result(op: AddColumnOperation, generator: ExcelFormulaGenerator, filename_of: Callable[[str], str]) -> Optional[Dict]:
+    """add_column 操作"""
+    if not isinstance(op.formula, dict):
+        return None
+    formula_template = generator.generate_formula(op.formula, op.file_id, op.table)
+    fallback_desc = f"在 {op.table} 表中新增「{op.name}」列"
+    return {
+        "type": "add_column",
+        "file_id": op.file_id,
+        "filename": filename_of(op.file_id),
+        "sheet": op.table,
+        "column_name": op.name,
+        "formula_template": f"={formula_template}",
+        "description": _get_description(op, fallback_desc)
+    }
+
+
+def _update_column_result(op: UpdateColumnOperation, generator: ExcelFormulaGenerator, filename_of: Callable[[str], str]) -> Optional[Dict]:
+    """update_column 操作"""
+    if not isinstance(op.formula, dict):
+        return None
+    formula_template = generator.generate_formula(op.formula, op.file_id, op.table)
+    fallback_desc = f"更新 {op.table} 表中「{op.column}」列的值"
+    return {
+        "type": "update_column",
+        "file_id": op.file_id,
+        "filename": filename_of(op.file_id),
+        "sheet": op.table,
+        "column_name": op.column,
+        "formula_template": f"={formula_template}",
+        "description": _get_description(op, fallback_desc)
+    }
+
+
+def _filter_result(op: FilterOperation, generator: ExcelFormulaGenerator, filename_of: Callable[[str], str]) -> Dict:
+    """filter 操作"""
+    filename = filename_of(op.file_id)
+    output_name = op.output.get("name", op.table)
+    fallback_desc = f"筛选 {op.table} 表中符合条件的数据到 {output_name}"
+    return {
+        "type": "filter",
+        "file_id": op.file_id,
+        "filename": filename,
+        "sheet": op.table,
+        "output_sheet": output_name,
+        "formula": _generate_filter_formula(op, generator),
+        "description": _get_description(op, fallback_desc),
+        "excel_version": _EXCEL_365,
+        "note": _NOTE_EXCEL_365
+    }
+
+
+def _sort_result(op: SortOperation, generator: ExcelFormulaGenerator, filename_of: Callable[[str], str]) -> Dict:
+    """sort 操作"""
+    filename = filename_of(op.file_id)
+    fallback_desc = _with_output(f"对 {op.table} 表按指定列排序", op)
+    return {
+        "type": "sort",
+        "file_id": op.file_id,
+        "filename": filename,
+        "sheet": op.table,
+        "output_sheet": _output_target(op)[1],
+        "formula": _generate_sort_formula(op, generator),
+        "description": _get_description(op, fallback_desc),
+        "excel_version": _EXCEL_365,
+        "note": _NOTE_EXCEL_365
+    }
+
+
+def _group_by_result(op: GroupByOperation, generator: ExcelFormulaGenerator, filename_of: Callable[[str], str]) -> Dict:
+    """group_by 操作"""
+    filename = filename_of(op.file_id)
+    formula = _generate_groupby_formula(op, generator)
+    output_name = op.output["name"]
+    group_cols = ", ".join(op.group_columns)
+    fallback_desc = f"按 {group_cols} 分组统计 {op.table} 表，结果输出到 {output_name}"
+    return {
+        "type": "group_by",
+        "file_id": op.file_id,
+        "filename": filename,
+        "sheet": op.table,
+        "output_sheet": output_name,
+        "formula": formula,
+        "description": _get_description(op, fallback_desc),
+        "excel_version": _EXCEL_365,
+        "note": _NOTE_GROUPBY
+    }
+
+
+def _create_sheet_result(op: CreateSheetOperation, generator: ExcelFormulaGenerator, filename_of: Callable[[str], str]) -> Dict:
+    """create_sheet 操作（无 Excel 公式）"""
+    filename = filename_of(op.file_id)
+    source_type = op.source.get("type", "empty") if op.source else "empty"
+    if source_type == "empty":
+        fallback_desc = f"创建新工作表 {op.name}"
+    elif source_type == "copy":
+        fallback_desc = f"复制 {op.source.get('table')} 到新工作表 {op.name}"
+    else:
+        fallback_desc = f"创建工作表 {op.name}（结构引用 {op.source.get('table')}）"
+    return {
+        "type": "create_sheet",
+        "file_id": op.file_id,
+        "filename": filename,
+        "sheet": op.name,
+        "formula": "（无对应公式，手动创建工作表）",
+        "description": _get_description(op, fallback_desc),
+        "note": "这是工作表操作，需要手动在 Excel 中创建"
+    }
+
+
+def _take_result(op: TakeOperation, generator: ExcelFormulaGenerator, filename_of: Callable[[str], str]) -> Dict:
+    """take 操作"""
+    filename = filename_of(op.file_id)
+    if op.rows > 0:
+        fallback_desc = f"从 {op.table} 表取前 {op.rows} 行"
+    else:
+        fallback_desc = f"从 {op.table} 表取后 {abs(op.rows)} 行"
+    return {
+        "type": "take",
+        "file_id": op.file_id,
+        "filename": filename,
+        "sheet": op.table,
+        "output_sheet": _output_target(op)[1],
+        "formula": _generate_take_formula(op, generator),
+        "description": _get_description(op, _with_output(fallback_desc, op)),
+        "excel_version": _EXCEL_365,
+        "note": _NOTE_TAKE
+    }
+
+
+def _select_columns_result(op: SelectColumnsOperation, generator: ExcelFormulaGenerator, filename_of: Callable[[str], str]) -> Dict:
+    """select_columns 操作"""
+    filename = filename_of(op.file_id)
+    fallback_desc = _with_output(f"从 {op.table} 表中选择指定列", op)
+    return {
+        "type": "select_columns",
+        "file_id": op.file_id,
+        "filename": filename,
+        "sheet": op.table,
+        "output_sheet": _output_target(op)[1],
+        "formula": _generate_select_columns_formula(op, generator),
+        "description": _get_description(op, fallback_desc),
+        "excel_version": _EXCEL_365,
+        "note": _NOTE_CHOOSECOLS
+    }
+
+
+def _drop_columns_result(op: DropColumnsOperation, generator: ExcelFormulaGenerator, filename_of: Callable[[str], str]) -> Dict:
+    """drop_columns 操作"""
+    filename = filename_of(op.file_id)
+    fallback_desc = _with_output(f"从 {op.table} 表中删除指定列", op)
+    return {
+        "type": "drop_columns",
+        "file_id": op.file_id,
+        "filename": filename,
+        "sheet": op.table,
+        "output_sheet": _output_target(op)[1],
+        "formula": _generate_drop_columns_formula(op, generator),
+        "description": _get_description(op, fallback_desc),
+        "excel_version": _EXCEL_365,
+        "note": _NOTE_CHOOSECOLS
+    }
+
+
+def _aggregate_result(op: AggregateOperation, generator: ExcelFormulaGenerator, filename_of: Callable[[str], str]) -> Dict:
+    """aggregate 操作"""
+    filename = filename_of(op.file_id)
+    # 生成更友好的兜底描述
+    func_name = _AGGREGATE_DESCRIPTIONS.get(op.function, op.function)
+    col_part = f"「{op.column}」列" if op.column else ""
+    fallback_desc = f"计算 {op.table} 表{col_part}的{func_name}"
+    return {
+        "type": "aggregate",
+        "file_id": op.file_id,
+        "filename": filename,
+        "sheet": op.table,
+        "variable": op.as_var,
+        "formula": f"=聚合公式（{op.function}）",
+        "description": _get_description(op, fallback_desc)
+    }
+
+
+# 操作类型 -> 公式结果生成函数（compute 等没有对应公式的操作不生成结果）
+_RESULT_BUILDERS = {
+    AddColumnOperation: _add_column_result,
+    UpdateColumnOperation: _update_column_result,
+    FilterOperation: _filter_result,
+    SortOperation: _sort_result,
+    GroupByOperation: _group_by_result,
+    CreateSheetOperation: _create_sheet_result,
+    TakeOperation: _take_result,
+    SelectColumnsOperation: _select_columns_result,
+    DropColumnsOperation: _drop_columns_result,
+    AggregateOperation: _aggregate_result,
+}
+
+
 def _generate_filter_formula(op: FilterOperation, generator: ExcelFormulaGenerator) -> str:
     """
     生成 FILTER 公式
@@ -475,14 +715,8 @@ def _generate_filter_formula(op: FilterOperation, generator: ExcelFormulaGenerat
     file_id = op.file_id
 
     # 获取表的列信息
-    try:
-        table = generator.tables.get_table(file_id, table_name)
-        columns = table.get_columns()
-        first_col = generator._find_column_letter(file_id, table_name, columns[0])
-        last_col = generator._find_column_letter(file_id, table_name, columns[-1])
-        data_range = f"{table_name}!{first_col}:{last_col}"
-    except Exception:
-        data_range = f"{table_name}!A:Z"
+    table_range = generator._get_data_range(file_id, table_name)
+    data_range = table_range[0] if table_range else f"{table_name}!A:Z"
 
     # 构建条件表达式
     condition_parts = []
@@ -491,12 +725,11 @@ def _generate_filter_formula(op: FilterOperation, generator: ExcelFormulaGenerat
         operator = cond["op"]
         value = cond["value"]
 
-        col_letter = generator._find_column_letter(file_id, table_name, col_name)
-        col_range = f"{table_name}!{col_letter}:{col_letter}"
+        col_range = generator._column_range(file_id, table_name, col_name)
 
         # 格式化值
         if isinstance(value, str):
-            formatted_value = f'"{value}"'
+            formatted_value = _quote_str(value)
         else:
             formatted_value = str(value)
 
@@ -527,14 +760,8 @@ def _generate_sort_formula(op: SortOperation, generator: ExcelFormulaGenerator)
     file_id = op.file_id
 
     # 获取表的列信息
-    try:
-        table = generator.tables.get_table(file_id, table_name)
-        columns = table.get_columns()
-        first_col = generator._find_column_letter(file_id, table_name, columns[0])
-        last_col = generator._find_column_letter(file_id, table_name, columns[-1])
-        data_range = f"{table_name}!{first_col}:{last_col}"
-    except Exception:
-        data_range = f"{table_name}!A:Z"
+    table_range = generator._get_data_range(file_id, table_name)
+    data_range = table_range[0] if table_range else f"{table_name}!A:Z"
 
     # 构建排序参数
     if len(op.by) == 1:
@@ -543,10 +770,8 @@ def _generate_sort_formula(op: SortOperation, generator: ExcelFormulaGenerator)
         col_name = rule["column"]
         order = rule.get("order", "asc")
 
-        try:
-            col_index = columns.index(col_name) + 1  # Excel 列索引从 1 开始
-        except (ValueError, NameError):
-            col_index = 1
+        # Excel 列索引从 1 开始，找不到列时取第 1 列
+        col_index = table_range[2].get(col_name, 1) if table_range else 1
 
         sort_order = 1 if order == "asc" else -1
         return f"=SORT({data_range}, {col_index}, {sort_order})"
@@ -557,10 +782,7 @@ def _generate_sort_formula(op: SortOperation, generator: ExcelFormulaGenerator)
         for rule in op.by:
             col_name = rule["column"]
             order = rule.get("order", "asc")
-            try:
-                col_index = columns.index(col_name) + 1
-            except (ValueError, NameError):
-                col_index = 1
+            col_index = table_range[2].get(col_name, 1) if table_range else 1
             col_indices.append(str(col_index))
             sort_orders.append("1" if order == "asc" else "-1")
 
@@ -577,10 +799,10 @@ def _generate_groupby_formula(op: GroupByOperation, generator: ExcelFormulaGener
     file_id = op.file_id
 
     # 分组列
-    group_ranges = []
-    for col_name in op.group_columns:
-        col_letter = generator._find_column_letter(file_id, table_name, col_name)
-        group_ranges.append(f"{table_name}!{col_letter}:{col_letter}")
+    group_ranges = [
+        generator._column_range(file_id, table_name, col_name)
+        for col_name in op.group_columns
+    ]
 
     # 如果只有一个分组列
     if len(group_ranges) == 1:
@@ -593,8 +815,7 @@ def _generate_groupby_formula(op: GroupByOperation, generator: ExcelFormulaGener
         agg = op.aggregations[0]
         agg_col = agg["column"]
         agg_func = agg["function"].upper()
-        col_letter = generator._find_column_letter(file_id, table_name, agg_col)
-        agg_range = f"{table_name}!{col_letter}:{col_letter}"
+        agg_range = generator._column_range(file_id, table_name, agg_col)
         return f"=GROUPBY({group_range}, {agg_range}, {agg_func})"
     else:
         # 多个聚合需要使用更复杂的公式
@@ -602,8 +823,7 @@ def _generate_groupby_formula(op: GroupByOperation, generator: ExcelFormulaGener
         for agg in op.aggregations:
             agg_col = agg["column"]
             agg_func = agg["function"].upper()
-            col_letter = generator._find_column_letter(file_id, table_name, agg_col)
-            agg_parts.append(f"{agg_func}({table_name}!{col_letter}:{col_letter})")
+            agg_parts.append(f"{agg_func}({generator._column_range(file_id, table_name, agg_col)})")
 
         # 返回说明性公式（Excel 中需要更复杂的 LAMBDA 语法）
         return f"=GROUPBY({group_range}, ..., LAMBDA(x, HSTACK({', '.join(agg_parts)})))"
@@ -621,14 +841,8 @@ def _generate_take_formula(op: TakeOperation, generator: ExcelFormulaGenerator)
     file_id = op.file_id
 
     # 获取表的列信息
-    try:
-        table = generator.tables.get_table(file_id, table_name)
-        columns = table.get_columns()
-        first_col = generator._find_column_letter(file_id, table_name, columns[0])
-        last_col = generator._find_column_letter(file_id, table_name, columns[-1])
-        data_range = f"{table_name}!{first_col}:{last_col}"
-    except Exception:
-        data_range = f"{table_name}!A:Z"
+    table_range = generator._get_data_range(file_id, table_name)
+    data_range = table_range[0] if table_range else f"{table_name}!A:Z"
 
     return f"=TAKE({data_range}, {op.rows})"
 
@@ -642,16 +856,15 @@ def _generate_select_columns_formula(op: SelectColumnsOperation, generator: Exce
     table_name = op.table
     file_id = op.file_id
 
+    table_range = generator._get_data_range(file_id, table_name)
+    if table_range is None:
+        return f"=CHOOSECOLS({table_name}!A:Z, ...)"
+    data_range, _, positions = table_range
     try:
-        table = generator.tables.get_table(file_id, table_name)
-        columns = table.get_columns()
-        first_col = generator._find_column_letter(file_id, table_name, columns[0])
-        last_col = generator._find_column_letter(file_id, table_name, columns[-1])
-        data_range = f"{table_name}!{first_col}:{last_col}"
-        indices = [str(columns.index(col) + 1) for col in op.columns]
-        return f"=CHOOSECOLS({data_range}, {', '.join(indices)})"
-    except Exception:
+        indices = [str(positions[col]) for col in op.columns]
+    except KeyError:
         return f"=CHOOSECOLS({table_name}!A:Z, ...)"
+    return f"=CHOOSECOLS({data_range}, {', '.join(indices)})"
 
 
 def _generate_drop_columns_formula(op: DropColumnsOperation, generator: ExcelFormulaGenerator) -> str:
@@ -663,99 +876,62 @@ def _generate_drop_columns_formula(op: DropColumnsOperation, generator: ExcelFor
     table_name = op.table
     file_id = op.file_id
 
-    try:
-        table = generator.tables.get_table(file_id, table_name)
-        columns = table.get_columns()
-        first_col = generator._find_column_letter(file_id, table_name, columns[0])
-        last_col = generator._find_column_letter(file_id, table_name, columns[-1])
-        data_range = f"{table_name}!{first_col}:{last_col}"
-        keep_cols = [col for col in columns if col not in op.columns]
-        indices = [str(columns.index(col) + 1) for col in keep_cols]
-        return f"=CHOOSECOLS({data_range}, {', '.join(indices)})"
-    except Exception:
+    table_range = generator._get_data_range(file_id, table_name)
+    if table_range is None:
         return f"=CHOOSECOLS({table_name}!A:Z, ...)"
+    data_range, columns, positions = table_range
+    dropped = set(op.columns)
+    indices = [str(positions[col]) for col in columns if col not in dropped]
+    return f"=CHOOSECOLS({data_range}, {', '.join(indices)})"
+
+
+# 各类公式结果的输出模板（{i} 为序号，其余字段取自公式结果）
+_COLUMN_TEMPLATE = (
+    "{i}. {description}\n"
+    "   文件: {filename}\n"
+    "   Sheet: {sheet}\n"
+    "   公式模板: {formula_template}\n"
+    "   说明: 将 {{row}} 替换为行号（如 2, 3, 4...），"
+)
+_SHEET_FORMULA_TEMPLATE = (
+    "{i}. {description}\n"
+    "   文件: {filename}\n"
+    "   源表: {sheet}\n"
+    "   输出表: {output_sheet}\n"
+    "   公式: {formula}\n"
+    "   ⚠️ {note}"
+)
+_OUTPUT_TEMPLATES = {
+    "add_column": _COLUMN_TEMPLATE + "下拉填充",
+    "update_column": _COLUMN_TEMPLATE + "覆盖原列",
+    "aggregate": (
+        "{i}. {description}\n"
+        "   文件: {filename}\n"
+        "   Sheet: {sheet}\n"
+        "   变量: {variable}\n"
+        "   公式: {formula}"
+    ),
+    "filter": _SHEET_FORMULA_TEMPLATE,
+    "sort": _SHEET_FORMULA_TEMPLATE,
+    "group_by": _SHEET_FORMULA_TEMPLATE,
+    "create_sheet": (
+        "{i}. {description}\n"
+        "   文件: {filename}\n"
+        "   新Sheet: {sheet}\n"
+        "   {note}"
+    ),
+    "take": _SHEET_FORMULA_TEMPLATE,
+    "select_columns": _SHEET_FORMULA_TEMPLATE,
+    "drop_columns": _SHEET_FORMULA_TEMPLATE,
+}
 
 
 def format_formula_output(formula_results: List[Dict]) -> str:
     """格式化公式输出"""
-    lines = []
-
-    for i, result in enumerate(formula_results, 1):
-        op_type = result["type"]
-
-        if op_type == "add_column":
-            lines.append(f"{i}. {result['description']}")
-            lines.append(f"   文件: {result['filename']}")
-            lines.append(f"   Sheet: {result['sheet']}")
-            lines.append(f"   公式模板: {result['formula_template']}")
-            lines.append(f"   说明: 将 {{row}} 替换为行号（如 2, 3, 4...），下拉填充")
-
-        elif op_type == "update_column":
-            lines.append(f"{i}. {result['description']}")
-            lines.append(f"   文件: {result['filename']}")
-            lines.append(f"   Sheet: {result['sheet']}")
-            lines.append(f"   公式模板: {result['formula_template']}")
-            lines.append(f"   说明: 将 {{row}} 替换为行号（如 2, 3, 4...），覆盖原列")
-
-        elif op_type == "aggregate":
-            lines.append(f"{i}. {result['description']}")
-            lines.append(f"   文件: {result['filename']}")
-            lines.append(f"   Sheet: {result['sheet']}")
-            lines.append(f"   变量: {result['variable']}")
-            lines.append(f"   公式: {result['formula']}")
-
-        elif op_type == "filter":
-            lines.append(f"{i}. {result['description']}")
-            lines.append(f"   文件: {result['filename']}")
-            lines.append(f"   源表: {result['sheet']}")
-            lines.append(f"   输出表: {result['output_sheet']}")
-            lines.append(f"   公式: {result['formula']}")
-            lines.append(f"   ⚠️ {result.get('note', '')}")
-
-        elif op_type == "sort":
-            lines.append(f"{i}. {result['description']}")
-            lines.append(f"   文件: {result['filename']}")
-            lines.append(f"   源表: {result['sheet']}")
-            lines.append(f"   输出表: {result['output_sheet']}")
-            lines.append(f"   公式: {result['formula']}")
-            lines.append(f"   ⚠️ {result.get('note', '')}")
-
-        elif op_type == "group_by":
-            lines.append(f"{i}. {result['description']}")
-            lines.append(f"   文件: {result['filename']}")
-            lines.append(f"   源表: {result['sheet']}")
-            lines.append(f"   输出表: {result['output_sheet']}")
-            lines.append(f"   公式: {result['formula']}")
-            lines.append(f"   ⚠️ {result.get('note', '')}")
-
-        elif op_type == "create_sheet":
-            lines.append(f"{i}. {result['description']}")
-            lines.append(f"   文件: {result['filename']}")
-            lines.append(f"   新Sheet: {result['sheet']}")
-            lines.append(f"   {result.get('note', '')}")
-
-        elif op_type == "take":
-            lines.append(f"{i}. {result['description']}")
-            lines.append(f"   文件: {result['filename']}")
-            lines.append(f"   源表: {result['sheet']}")
-            lines.append(f"   输出表: {result['output_sheet']}")
-            lines.append(f"   公式: {result['formula']}")
-            lines.append(f"   ⚠️ {result.get('note', '')}")
-
-        elif op_type == "select_columns":
-            lines.append(f"{i}. {result['description']}")
-            lines.append(f"   文件: {result['filename']}")
-            lines.append(f"   源表: {result['sheet']}")
-            lines.append(f"   输出表: {result['output_sheet']}")
-            lines.append(f"   公式: {result['formula']}")
-            lines.append(f"   ⚠️ {result.get('note', '')}")
-
-        elif op_type == "drop_columns":
-            lines.append(f"{i}. {result['description']}")
-            lines.append(f"   文件: {result['filename']}")
-            lines.append(f"   源表: {result['sheet']}")
-            lines.append(f"   输出表: {result['output_sheet']}")
-            lines.append(f"   公式: {result['formula']}")
-            lines.append(f"   ⚠️ {result.get('note', '')}")
-
-    return "\n".join(lines)
+    return "\n".join(
+        _OUTPUT_TEMPLATES[result["type"]].format_map(
+            {**result, "i": i, "note": result.get("note", "")}
+        )
+        for i, result in enumerate(formula_results, 1)
+        if result["type"] in _OUTPUT_TEMPLATES
+    )
@@ -1,16 +1,115 @@
 """Excel 解析器 - 负责读取 Excel 文件并转换为系统内部数据结构"""
 
 import io
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
 from pathlib import Path
-from typing import Union, List, Dict
+from typing import Union, List, Dict, Optional
 
+import numpy as np
+import openpyxl
 import pandas as pd
+import urllib3
 from minio import Minio
 from minio.error import S3Error
+from urllib3.util import Retry, Timeout
 
 from app.core.config import settings
 from app.engine.models import Table, ExcelFile, FileCollection
 
+try:
+    from numba import njit, prange
+except ImportError:
+    # numba 为可选依赖，未安装时使用 pandas 的 dropna
+    njit = None
+
+# 多文件并行解析的最大线程数
+MAX_PARSE_WORKERS = 8
+
+# 读取引擎：安装了 python-calamine（Rust 实现）时优先使用，速度比 openpyxl 快数倍；
+# 未安装时退回 openpyxl（pandas 默认以 read_only、data_only 模式打开，不需要另传 engine_kwargs）
+EXCEL_ENGINE = "calamine" if find_spec("python_calamine") is not None else "openpyxl"
+
+# 从 MinIO 流式读取对象时的分块大小
+MINIO_READ_CHUNK_SIZE = 64 * 1024
+
+# 行数达到该阈值才使用 numba 计算全空行，小表的编译/调度开销不划算
+NUMBA_MIN_ROWS = 10_000
+
+# MinIO 读取超时（秒），与 minio 默认 HTTP 客户端一致
+MINIO_TIMEOUT = 300
+
+# 进程内共享的 MinIO 客户端（首次使用时创建，复用连接池）
+_minio_client: Optional[Minio] = None
+
+if njit is not None:
+
+    @njit(cache=True, parallel=True)
+    def _all_nan_rows(values):
+        """逐行判断二维 float 数组是否全为 NaN（按行并行）"""
+        n_rows, n_cols = values.shape
+        result = np.empty(n_rows, dtype=np.bool_)
+        for i in prange(n_rows):
+            all_nan = True
+            for j in range(n_cols):
+                if not np.isnan(values[i, j]):
+                    all_nan = False
+                    break
+            result[i] = all_nan
+        return result
+
+
+def _map_in_threads(func, items: List) -> List:
+    """
+    在线程池中并行执行 func，结果顺序与 items 一致
+
+    MinIO 下载、文件读取和 zip 解压都会释放 GIL，多文件时可与解析过程重叠；
+    只有一个元素时直接在当前线程执行。异常按 items 顺序向上抛出。
+    """
+    if len(items) <= 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(MAX_PARSE_WORKERS, len(items))) as pool:
+        return list(pool.map(func, items))
+
+
+def _row_width(row: tuple) -> int:
+    """去掉行尾空单元格后的宽度（全空行为 0）"""
+    width = len(row)
+    while width and row[width - 1] is None:
+        width -= 1
+    return width
+
+
+def _header_names(header: tuple, width: int) -> List:
+    """
+    按 pandas read_excel 的规则生成列名
+
+    空表头记为 "Unnamed: n"；重复列名依次加 ".1"、".2" 后缀，
+    跳过已存在的名称，有名称的列先于空表头列编号。
+    """
+    names = [
+        f"Unnamed: {i}" if i >= len(header) or header[i] is None else header[i]
+        for i in range(width)
+    ]
+    unnamed = [i for i in range(width) if i >= len(header) or header[i] is None]
+    named = [i for i in range(width) if i < len(header) and header[i] is not None]
+
+    counts: Dict = {}
+    for i in named + unnamed:
+        name = original = names[i]
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            if name in names:
+                count += 1
+            else:
+                count = counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
 
 class ExcelParser:
     """Excel 文件解析器"""
@@ -49,7 +148,7 @@ class ExcelParser:
 
         # 读取 Excel 文件（读取第一个 sheet）
         try:
-            df = pd.read_excel(file_path, engine='openpyxl')
+            df = pd.read_excel(file_path, engine=EXCEL_ENGINE)
         except Exception as e:
             raise ValueError(f"读取 Excel 文件失败: {str(e)}") from e
 
@@ -60,7 +159,11 @@ class ExcelParser:
         return Table(name=table_name, data=df)
 
     @staticmethod
-    def parse_file_all_sheets(file_path: Union[str, Path], file_id: str = None, sheet_names: List[str] = None) -> FileCollection:
+    def parse_file_all_sheets(
+        file_path: Union[str, Path],
+        file_id: str = None,
+        sheet_names: List[str] = None,
+    ) -> FileCollection:
         """
         解析 Excel 文件的所有（或指定）sheet
 
@@ -80,54 +183,73 @@ class ExcelParser:
 
         # 读取所有 sheets
         try:
-            excel_file_data = pd.ExcelFile(file_path, engine='openpyxl')
+            excel_file_data = pd.ExcelFile(file_path, engine=EXCEL_ENGINE)
             all_sheet_names = excel_file_data.sheet_names
         except Exception as e:
             raise ValueError(f"读取 Excel 文件失败: {str(e)}") from e
 
-        # 确定要解析的 sheets
-        if sheet_names is None:
-            sheets_to_parse = all_sheet_names
-        else:
-            # 验证 sheet 名称是否存在
-            invalid_sheets = set(sheet_names) - set(all_sheet_names)
-            if invalid_sheets:
-                raise ValueError(f"Sheet 不存在: {', '.join(invalid_sheets)}")
-            sheets_to_parse = sheet_names
-
-        # 创建文件集合
-        collection = FileCollection()
+        with excel_file_data:
+            # 确定要解析的 sheets
+            if sheet_names is None:
+                sheets_to_parse = all_sheet_names
+            else:
+                # 验证 sheet 名称是否存在
+                invalid_sheets = set(sheet_names) - set(all_sheet_names)
+                if invalid_sheets:
+                    raise ValueError(f"Sheet 不存在: {', '.join(invalid_sheets)}")
+                sheets_to_parse = sheet_names
 
-        # 使用文件名或提供的 file_id
-        if file_id is None:
-            file_id = file_path.stem
+            # 创建文件集合
+            collection = FileCollection()
 
-        # 创建 ExcelFile
-        excel_file = ExcelFile(file_id=file_id, filename=file_path.name)
+            # 使用文件名或提供的 file_id
+            if file_id is None:
+                file_id = file_path.stem
 
-        # 解析每个 sheet
-        for sheet_name in sheets_to_parse:
-            df = pd.read_excel(file_path, sheet_name=sheet_name, engine='openpyxl')
-            df = ExcelParser._clean_dataframe(df)
+            # 创建 ExcelFile
+            excel_file = ExcelFile(file_id=file_id, filename=file_path.name)
 
-            # 使用 sheet 名称作为表名
-            table = Table(name=sheet_name, data=df)
-            excel_file.add_sheet(table)
+            # 解析每个 sheet（复用已打开的工作簿，不再按 sheet 重新打开文件）
+            for sheet_name in sheets_to_parse:
+                excel_file.add_sheet(ExcelParser._read_sheet(excel_file_data, sheet_name))
 
         collection.add_file(excel_file)
         return collection
 
+    @staticmethod
+    def _read_sheet(excel_file_data: pd.ExcelFile, sheet_name: str) -> Table:
+        """从已打开的工作簿读取并清洗单个 sheet"""
+        df = pd.read_excel(excel_file_data, sheet_name=sheet_name, engine=EXCEL_ENGINE)
+        df = ExcelParser._clean_dataframe(df)
+
+        # 使用 sheet 名称作为表名
+        return Table(name=sheet_name, data=df)
+
     # ========= MinIO 文件解析 =========
 
     @staticmethod
     def _get_minio_client() -> Minio:
-        """创建 MinIO 客户端"""
-        return Minio(
-            endpoint=settings.MINIO_ENDPOINT,
-            access_key=settings.MINIO_ACCESS_KEY,
-            secret_key=settings.MINIO_SECRET_KEY,
-            secure=False,
-        )
+        """获取 MinIO 客户端（进程内复用，保持 keep-alive 连接）"""
+        global _minio_client
+        if _minio_client is None:
+            # 连接池大小不小于并行解析线程数，避免并发下载时连接被丢弃重建
+            http_client = urllib3.PoolManager(
+                timeout=Timeout(connect=MINIO_TIMEOUT, read=MINIO_TIMEOUT),
+                maxsize=max(10, MAX_PARSE_WORKERS),
+                retries=Retry(
+                    total=5,
+                    backoff_factor=0.2,
+                    status_forcelist=[500, 502, 503, 504],
+                ),
+            )
+            _minio_client = Minio(
+                endpoint=settings.MINIO_ENDPOINT,
+                access_key=settings.MINIO_ACCESS_KEY,
+                secret_key=settings.MINIO_SECRET_KEY,
+                secure=False,
+                http_client=http_client,
+            )
+        return _minio_client
 
     @staticmethod
     def _extract_minio_object_name(path: str) -> str:
@@ -170,52 +292,66 @@ class ExcelParser:
 
         bucket_name = settings.MINIO_BUCKET
 
-        for file_id, file_path, filename in file_records:
-            # 提取 MinIO object_name
-            object_name = ExcelParser._extract_minio_object_name(file_path)
+        # 各文件的下载与解析相互独立，并行执行；结果按原顺序加入集合
+        excel_files = _map_in_threads(
+            lambda record: ExcelParser._load_file_from_minio(client, bucket_name, *record),
+            file_records,
+        )
+        for excel_file in excel_files:
+            collection.add_file(excel_file)
 
-            # 从 MinIO 读取对象
-            try:
-                response = client.get_object(bucket_name, object_name)
-                try:
-                    data = response.read()
-                finally:
-                    response.close()
-                    response.release_conn()
-            except S3Error as e:
-                raise FileNotFoundError(
-                    f"文件不存在或无法从 MinIO 读取: {e}"
-                ) from e
-            except Exception as e:
-                raise RuntimeError(f"从 MinIO 读取文件失败: {e}") from e
-
-            # 使用 pandas 解析 Excel 内容
+        return collection
+
+    @staticmethod
+    def _load_file_from_minio(
+        client: Minio, bucket_name: str, file_id: str, file_path: str, filename: str
+    ) -> ExcelFile:
+        """从 MinIO 下载单个文件并解析为 ExcelFile"""
+        # 提取 MinIO object_name
+        object_name = ExcelParser._extract_minio_object_name(file_path)
+
+        # 从 MinIO 读取对象
+        try:
+            response = client.get_object(bucket_name, object_name)
             try:
-                excel_bytes = io.BytesIO(data)
-                excel_file_data = pd.ExcelFile(excel_bytes, engine="openpyxl")
-                sheet_names = excel_file_data.sheet_names
-
-                # 创建 ExcelFile 对象
-                excel_file = ExcelFile(file_id=file_id, filename=filename)
-
-                # 解析所有 sheets
-                for sheet_name in sheet_names:
-                    df = pd.read_excel(
-                        excel_file_data,
-                        sheet_name=sheet_name,
-                        engine="openpyxl",
-                    )
-                    df = ExcelParser._clean_dataframe(df)
-                    table = Table(name=sheet_name, data=df)
-                    excel_file.add_sheet(table)
-
-                # 添加到集合
-                collection.add_file(excel_file)
+                # 分块写入缓冲区，避免 read() 生成完整 bytes 后再复制一份
+                excel_bytes = io.BytesIO()
+                for chunk in response.stream(MINIO_READ_CHUNK_SIZE):
+                    excel_bytes.write(chunk)
+                excel_bytes.seek(0)
+            finally:
+                response.close()
+                response.release_conn()
+        except S3Error as e:
+            raise FileNotFoundError(
+                f"文件不存在或无法从 MinIO 读取: {e}"
+            ) from e
+        except Exception as e:
+            raise RuntimeError(f"从 MinIO 读取文件失败: {e}") from e
 
-            except Exception as e:
-                raise ValueError(f"解析 Excel 文件失败 ({filename}): {e}") from e
+        # 使用 pandas 解析 Excel 内容
+        try:
+            excel_file_data = pd.ExcelFile(excel_bytes, engine=EXCEL_ENGINE)
+            sheet_names = excel_file_data.sheet_names
 
-        return collection
+            # 创建 ExcelFile 对象
+            excel_file = ExcelFile(file_id=file_id, filename=filename)
+
+            # 解析所有 sheets
+            for sheet_name in sheet_names:
+                df = pd.read_excel(
+                    excel_file_data,
+                    sheet_name=sheet_name,
+                    engine=EXCEL_ENGINE,
+                )
+                df = ExcelParser._clean_dataframe(df)
+                table = Table(name=sheet_name, data=df)
+                excel_file.add_sheet(table)
+
+            return excel_file
+
+        except Exception as e:
+            raise ValueError(f"解析 Excel 文件失败 ({filename}): {e}") from e
 
     @staticmethod
     def parse_multiple_files(file_paths: Dict[str, Union[str, Path]]) -> FileCollection:
@@ -230,13 +366,14 @@ class ExcelParser:
         """
         collection = FileCollection()
 
-        for file_id, file_path in file_paths.items():
-            # 使用 parse_file_all_sheets 解析整个文件
-            file_collection = ExcelParser.parse_file_all_sheets(
-                file_path,
-                file_id=file_id
-            )
-            # 提取第一个文件并添加到集合
+        # 使用 parse_file_all_sheets 并行解析各个文件
+        file_collections = _map_in_threads(
+            lambda item: ExcelParser.parse_file_all_sheets(item[0], file_id=item[1]),
+            [(file_path, file_id) for file_id, file_path in file_paths.items()],
+        )
+
+        # 按原顺序提取文件并添加到集合
+        for file_collection in file_collections:
             for excel_file in file_collection:
                 collection.add_file(excel_file)
 
@@ -251,20 +388,62 @@ class ExcelParser:
         - 标准化列名
         - 处理数据类型
         """
-        # 标准化列名（去除空格，转为小写）
-        df.columns = [str(col).strip() for col in df.columns]
-
-        # 删除完全空的行
-        df = df.dropna(how='all')
-
-        # 重置索引
-        df = df.reset_index(drop=True)
+        # 标准化列名（去除空格，转为小写）；已经是规范列名时不重建
+        if not all(isinstance(col, str) and col == col.strip() for col in df.columns):
+            df.columns = [str(col).strip() for col in df.columns]
+
+        # 各列是否含空值；整表没有空值时跳过删除空行和 None 转换
+        has_na = df.isna().any()
+        if not has_na.any():
+            if not ExcelParser._has_default_index(df):
+                df.reset_index(drop=True, inplace=True)
+            return df
+
+        # 删除完全空的行并重置索引（原地操作，避免中间副本）
+        if njit is not None and len(df) >= NUMBA_MIN_ROWS:
+            empty_rows = ExcelParser._all_missing_rows(df)
+            if empty_rows.any():
+                df.drop(index=df.index[empty_rows], inplace=True)
+        else:
+            df.dropna(how='all', inplace=True)
+        if not ExcelParser._has_default_index(df):
+            df.reset_index(drop=True, inplace=True)
 
         # 处理 NaN 值（保留为 None）
-        df = df.where(pd.notna(df), None)
+        # 数值/日期列中的 None 会被还原为 NaN/NaT，只有含空值的 object 列需要转换
+        # 按位置处理，重名列也不会出错
+        for i in np.flatnonzero((df.dtypes == object).to_numpy() & has_na.to_numpy()):
+            column = df.iloc[:, i]
+            df.isetitem(i, column.where(column.notna(), None))
 
         return df
 
+    @staticmethod
+    def _has_default_index(df: pd.DataFrame) -> bool:
+        """索引是否已经是从 0 开始的连续 RangeIndex"""
+        index = df.index
+        return isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
+
+    @staticmethod
+    def _all_missing_rows(df: pd.DataFrame) -> np.ndarray:
+        """
+        计算全空行的布尔掩码（等价于 df.isna().all(axis=1)）
+
+        数值列转为 float 数组交给 numba 按行并行判断，其余列仍用 pandas 判断。
+        """
+        numeric = df.select_dtypes(include='number')
+        others = df.columns.difference(numeric.columns, sort=False)
+
+        if len(numeric.columns):
+            values = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+            mask = _all_nan_rows(values)
+        else:
+            mask = np.ones(len(df), dtype=bool)
+
+        if len(others):
+            mask &= df[others].isna().all(axis=1).to_numpy()
+        return mask
+
     @staticmethod
     def get_file_info(file_path: Union[str, Path]) -> Dict:
         """
@@ -282,16 +461,28 @@ class ExcelParser:
             raise FileNotFoundError(f"文件不存在: {file_path}")
 
         try:
-            excel_file = pd.ExcelFile(file_path, engine='openpyxl')
-
             sheets_info = {}
-            for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(file_path, sheet_name=sheet_name, engine='openpyxl')
-                sheets_info[sheet_name] = {
-                    "rows": len(df),
-                    "columns": len(df.columns),
-                    "column_names": list(df.columns)
-                }
+            # 只需要行列数和表头，用 openpyxl 只读模式逐行扫描，不构建 DataFrame
+            wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+            try:
+                for ws in wb.worksheets:
+                    header = next(ws.iter_rows(max_row=1, values_only=True), ())
+                    width = _row_width(header)
+                    # 行数按最后一个非空行计算（带格式的空单元格不计入），列数取各行最大宽度
+                    rows = 0
+                    for i, row in enumerate(ws.iter_rows(min_row=2, values_only=True), 1):
+                        row_width = _row_width(row)
+                        if row_width:
+                            rows = i
+                            width = max(width, row_width)
+                    column_names = _header_names(header, width)
+                    sheets_info[ws.title] = {
+                        "rows": rows,
+                        "columns": len(column_names),
+                        "column_names": column_names
+                    }
+            finally:
+                wb.close()
 
             return {
                 "file_name": file_path.name,
@@ -1,6 +1,9 @@
 """执行引擎 - 执行操作并计算结果"""
 
-from typing import Any, Dict, List, Optional, Union
+import operator
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+import numpy as np
 import pandas as pd
 from app.engine.models import (
     FileCollection,
@@ -20,23 +23,41 @@ from app.engine.models import (
     ExecutionResult,
     OperationResult,
     ExcelError,
+    NA,
+    DIV0,
+    VALUE,
+    ERROR,
 )
 from app.engine.functions import (
     AGGREGATE_FUNC_MAP,
     ROW_FUNC_MAP,
     SCALAR_FUNC_MAP,
 )
+from app.engine.functions_jit import NUMBA_AVAILABLE, parse_numeric_condition
 
 
 class FormulaEvaluator:
     """JSON 格式公式求值器"""
 
+    # 逐行求值时属性访问非常频繁，使用 __slots__ 省去实例 __dict__ 查找
+    __slots__ = (
+        "tables",
+        "functions",
+        "row_context",
+        "variables",
+        "columns",
+        "row_idx",
+        "_ref_cache",
+        "_array_cache",
+    )
+
     def __init__(
         self,
         tables: FileCollection,
         functions: Dict[str, callable],
         row_context: Optional[Dict[str, Any]] = None,
         variables: Optional[Dict[str, Any]] = None,
+        columns: Optional[Dict[str, List[Any]]] = None,
     ):
         """
         初始化求值器
@@ -46,16 +67,27 @@ class FormulaEvaluator:
             functions: 可用函数
             row_context: 当前行的数据 {"列名": 值, ...}
             variables: 变量上下文 {"变量名": 值, ...}
+            columns: 按列存储的整表数据 {"列名": [值, ...]}，配合 set_row 逐行求值
         """
         self.tables = tables
         self.functions = functions
         self.row_context = row_context or {}
         self.variables = variables or {}
+        self.columns = columns or {}
+        self.row_idx = 0
+        # 跨表引用缓存（ref -> 列数据），同一个 evaluator 逐行求值时共用
+        self._ref_cache: Dict[str, List[Any]] = {}
+        # 范围列的 object 数组缓存（id(列数据) -> (列数据, 数组)），供 COUNTIFS 向量化比较
+        self._array_cache: Dict[int, tuple] = {}
 
     def set_row_context(self, row_context: Dict[str, Any]):
         """设置当前行上下文（用于复用 evaluator）"""
         self.row_context = row_context
 
+    def set_row(self, row_idx: int):
+        """设置当前行号（按列数据 columns 取值，不需要为每行构建上下文字典）"""
+        self.row_idx = row_idx
+
     def set_variables(self, variables: Dict[str, Any]):
         """设置变量上下文"""
         self.variables = variables
@@ -81,6 +113,9 @@ class FormulaEvaluator:
         # 列引用: {"col": "列名"}
         if "col" in expr:
             col_name = expr["col"]
+            column = self.columns.get(col_name)
+            if column is not None:
+                return column[self.row_idx]
             if col_name in self.row_context:
                 return self.row_context[col_name]
             raise ValueError(f"未知的列名: {col_name}")
@@ -106,6 +141,193 @@ class FormulaEvaluator:
 
         raise ValueError(f"未知的表达式类型: {expr}")
 
+    def compile(self, expr: Union[Dict, Any]) -> Callable[[int], Any]:
+        """
+        将表达式预编译为闭包，调用时只需传入行号
+
+        逐行求值时表达式结构不变，预先解析好节点类型、列数据和函数，
+        避免每行重复走 evaluate 的类型判断。结果与 evaluate 一致：
+        无法预先确定的情况（未知列、参数个数错误、COUNTIFS/VLOOKUP 等）
+        退回 evaluate，错误仍在对应行求值时抛出。
+
+        Args:
+            expr: 表达式对象或原始值
+
+        Returns:
+            接收行号、返回计算结果的函数
+        """
+        if not isinstance(expr, dict):
+            return lambda row_idx: expr
+
+        if "value" in expr:
+            value = expr["value"]
+            return lambda row_idx: value
+
+        if "col" in expr:
+            column = self.columns.get(expr["col"])
+            if column is not None:
+                return column.__getitem__
+            return self._compile_fallback(expr)
+
+        if "var" in expr:
+            return self._compile_fallback(expr)
+
+        if "ref" in expr:
+            ref = expr["ref"]
+            return lambda row_idx: self._get_table_column(ref)
+
+        if "func" in expr:
+            return self._compile_function(expr)
+
+        if "op" in expr:
+            if "left" not in expr or "right" not in expr:
+                return self._compile_fallback(expr)
+            op = expr["op"]
+            left = self.compile(expr["left"])
+            right = self.compile(expr["right"])
+            apply_op = self._apply_binary_op
+            return lambda row_idx: apply_op(op, left(row_idx), right(row_idx))
+
+        return self._compile_fallback(expr)
+
+    def _compile_fallback(self, expr: Dict) -> Callable[[int], Any]:
+        """无法预编译的节点：切换到对应行后交给 evaluate 求值"""
+        def run(row_idx: int) -> Any:
+            self.row_idx = row_idx
+            return self.evaluate(expr)
+
+        return run
+
+    def _compile_function(self, expr: Dict) -> Callable[[int], Any]:
+        """预编译函数调用（IF/AND/OR 保持短路求值）"""
+        if not isinstance(expr["func"], str):
+            return self._compile_fallback(expr)
+        func_name_upper = expr["func"].upper()
+        args = expr.get("args", [])
+
+        if func_name_upper == "IF":
+            if len(args) != 3:
+                return self._compile_fallback(expr)
+            condition, if_true, if_false = (self.compile(arg) for arg in args)
+            return lambda row_idx: if_true(row_idx) if condition(row_idx) else if_false(row_idx)
+
+        if func_name_upper == "AND":
+            compiled_args = [self.compile(arg) for arg in args]
+            return lambda row_idx: all(arg(row_idx) for arg in compiled_args)
+
+        if func_name_upper == "OR":
+            compiled_args = [self.compile(arg) for arg in args]
+            return lambda row_idx: any(arg(row_idx) for arg in compiled_args)
+
+        func = self.functions.get(func_name_upper)
+        if func is None or func_name_upper in self._SPECIAL_FUNCTIONS:
+            return self._compile_fallback(expr)
+
+        compiled_args = [self.compile(arg) for arg in args]
+        return lambda row_idx: func(*[arg(row_idx) for arg in compiled_args])
+
+    def try_vectorize(self, expr: Union[Dict, Any], row_count: int) -> Optional[List[Any]]:
+        """
+        尝试整列计算公式（只包含数值列、数值字面量/变量和算术、比较运算时）
+
+        计算结果与逐行求值完全一致：空值参与算术得 #VALUE!，除数为 0 得 #DIV/0!，
+        错误值按左、右操作数的顺序传播。公式包含函数调用、跨表引用、非数值列等情况时返回 None，
+        由调用方退回逐行求值。
+
+        Args:
+            expr: 表达式对象
+            row_count: 行数
+
+        Returns:
+            每行的计算结果，无法向量化时返回 None
+        """
+        result = self._vectorize(expr)
+        if result is None:
+            return None
+        values, errors, _ = result
+        if not isinstance(values, np.ndarray) or len(values) != row_count:
+            return None
+
+        column_values = values.tolist()
+        if errors is not None:
+            for row_idx in np.flatnonzero(errors != None):  # noqa: E711
+                column_values[row_idx] = errors[row_idx]
+        return column_values
+
+    def _vectorize(self, expr: Union[Dict, Any]) -> Optional[tuple]:
+        """
+        递归向量化表达式
+
+        Returns:
+            (数值数组或标量, 错误值数组或 None, 是否为比较结果)，无法向量化时返回 None
+        """
+        if not isinstance(expr, dict):
+            return _vector_scalar(expr)
+
+        if "value" in expr:
+            return _vector_scalar(expr["value"])
+
+        if "col" in expr:
+            values = self.columns.get(expr["col"])
+            if values is None:
+                return None
+            array = _numeric_array(values)
+            if array is None:
+                return None
+            return array, None, False
+
+        if "var" in expr:
+            if expr["var"] not in self.variables:
+                return None
+            return _vector_scalar(self.variables[expr["var"]])
+
+        if "op" not in expr or "func" in expr or "ref" in expr:
+            return None
+
+        op = expr["op"]
+        if op not in _VECTOR_ARITHMETIC and op not in _VECTOR_COMPARE:
+            return None
+
+        left = self._vectorize(expr["left"])
+        if left is None:
+            return None
+        right = self._vectorize(expr["right"])
+        if right is None:
+            return None
+
+        left_values, left_errors, left_is_bool = left
+        right_values, right_errors, right_is_bool = right
+        # 比较结果（bool）再参与运算的语义较特殊，交给逐行求值
+        if left_is_bool or right_is_bool:
+            return None
+        if not isinstance(left_values, np.ndarray) and not isinstance(right_values, np.ndarray):
+            return None
+
+        # 错误传播：左操作数的错误优先
+        errors = _merge_errors(left_errors, right_errors)
+        null_mask = _nan_mask(left_values) | _nan_mask(right_values)
+
+        with np.errstate(all="ignore"):
+            if op in _VECTOR_COMPARE:
+                # 空值参与比较时结果为 False（NaN 的比较结果本身即为 False）
+                return _VECTOR_COMPARE[op](left_values, right_values), errors, True
+
+            values = _VECTOR_ARITHMETIC[op](left_values, right_values)
+            if values.dtype.kind == "i":
+                # 整数运算结果超出 float 精确范围时，可能与 Python 整数运算不一致
+                approx = _VECTOR_ARITHMETIC[op](
+                    np.asarray(left_values, dtype=np.float64),
+                    np.asarray(right_values, dtype=np.float64),
+                )
+                if np.any(np.abs(approx) > _VECTOR_INT_LIMIT):
+                    return None
+
+        errors = _set_errors(errors, null_mask, VALUE, len(values))
+        if op == "/":
+            zero_mask = np.asarray(right_values == 0) & ~np.asarray(null_mask)
+            errors = _set_errors(errors, zero_mask, DIV0, len(values))
+        return values, errors, False
+
     def _get_table_column(self, ref: str) -> List[Any]:
         """
         获取跨表列引用
@@ -116,6 +338,10 @@ class FormulaEvaluator:
         Returns:
             列数据
         """
+        cached = self._ref_cache.get(ref)
+        if cached is not None:
+            return cached
+
         parts = ref.split(".")
         if len(parts) != 3:
             raise ValueError(
@@ -126,37 +352,28 @@ class FormulaEvaluator:
 
         try:
             table = self.tables.get_table(file_id, sheet_name)
-            return table.get_column(col_name)
+            column = table.get_column(col_name)
         except Exception as e:
             raise ValueError(f"无法访问 {ref}: {e}")
 
+        self._ref_cache[ref] = column
+        return column
+
     def _eval_function(self, func_name: str, args: List) -> Any:
         """求值函数调用"""
         func_name_upper = func_name.upper()
 
-        # 特殊处理 IF（短路求值）
-        if func_name_upper == "IF":
-            return self._eval_if(args)
-
-        # 特殊处理 AND/OR（短路求值）
-        if func_name_upper == "AND":
-            return self._eval_and(args)
-        if func_name_upper == "OR":
-            return self._eval_or(args)
-
-        # 特殊处理 COUNTIFS
-        if func_name_upper == "COUNTIFS":
-            return self._eval_countifs(args)
-
-        # 特殊处理 VLOOKUP
-        if func_name_upper == "VLOOKUP":
-            return self._eval_vlookup(args)
+        # IF/AND/OR（短路求值）、COUNTIFS、VLOOKUP 需要特殊处理参数
+        handler = self._SPECIAL_FUNCTIONS.get(func_name_upper)
+        if handler is not None:
+            return handler(self, args)
 
         # 其他函数：先求值所有参数
         evaluated_args = [self.evaluate(arg) for arg in args]
 
-        if func_name_upper in self.functions:
-            return self.functions[func_name_upper](*evaluated_args)
+        func = self.functions.get(func_name_upper)
+        if func is not None:
+            return func(*evaluated_args)
 
         raise ValueError(f"未知的函数: {func_name}")
 
@@ -172,18 +389,12 @@ class FormulaEvaluator:
             return self.evaluate(args[2])
 
     def _eval_and(self, args: List) -> bool:
-        """求值 AND 函数"""
-        for arg in args:
-            if not self.evaluate(arg):
-                return False
-        return True
+        """求值 AND 函数（短路求值）"""
+        return all(self.evaluate(arg) for arg in args)
 
     def _eval_or(self, args: List) -> bool:
-        """求值 OR 函数"""
-        for arg in args:
-            if self.evaluate(arg):
-                return True
-        return False
+        """求值 OR 函数（短路求值）"""
+        return any(self.evaluate(arg) for arg in args)
 
     def _eval_countifs(self, args: List) -> int:
         """
@@ -219,18 +430,50 @@ class FormulaEvaluator:
             if len(r) != first_len:
                 raise ValueError("COUNTIFS 所有范围长度必须一致")
 
-        # 统计满足所有条件的行数
-        count = 0
-        for row_idx in range(first_len):
-            all_match = True
-            for range_data, criterion in zip(ranges, criteria):
-                if range_data[row_idx] != criterion:
-                    all_match = False
-                    break
-            if all_match:
-                count += 1
+        # 逐个条件缩小候选行：之后的条件只比较仍然满足前面所有条件的行
+        rows = None
+        for range_data, criterion in zip(ranges, criteria):
+            mask = self._match_mask(range_data, criterion, rows)
+            rows = np.flatnonzero(mask) if rows is None else rows[mask]
+            if len(rows) == 0:
+                return 0
+
+        return len(rows)
 
-        return count
+    def _match_mask(
+        self, range_data: List[Any], criterion: Any, rows: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        计算范围中每个元素（指定 rows 时只计算这些行）是否等于条件值的布尔掩码
+
+        条件值本身是序列时逐元素比较会被 NumPy 广播，此时退回逐个比较
+        """
+        count = len(range_data) if rows is None else len(rows)
+        if not isinstance(criterion, (list, tuple, dict, np.ndarray)):
+            array = self._as_object_array(range_data)
+            if rows is not None:
+                array = array[rows]
+            matched = array == criterion
+            if isinstance(matched, np.ndarray) and matched.shape == (count,):
+                return matched.astype(bool, copy=False)
+
+        values = range_data if rows is None else (range_data[i] for i in rows.tolist())
+        return np.fromiter(
+            (not (value != criterion) for value in values),
+            dtype=bool,
+            count=count,
+        )
+
+    def _as_object_array(self, values: List[Any]) -> np.ndarray:
+        """将列数据转换为一维 object 数组（同一列只转换一次）"""
+        cached = self._array_cache.get(id(values))
+        if cached is not None and cached[0] is values:
+            return cached[1]
+
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        self._array_cache[id(values)] = (values, array)
+        return array
 
     def _eval_vlookup(self, args: List) -> Any:
         """
@@ -256,110 +499,24 @@ class FormulaEvaluator:
                 )
             file_id, sheet_name = parts
 
-            # 获取表并查找
+            # 获取表，通过键列的哈希索引查找（索引缓存在 Table 上，各行共用）
             table = self.tables.get_table(file_id, sheet_name)
-            key_data = table.get_column(key_col)
-            value_data = table.get_column(value_col)
-
-            for i, key in enumerate(key_data):
-                if key == lookup_value:
-                    return value_data[i]
+            row_idx = table.get_lookup_index(key_col).get(lookup_value)
+            if row_idx is None:
+                return NA
 
-            return ExcelError("#N/A")
+            return table.get_column(value_col)[row_idx]
         except Exception:
-            return ExcelError("#N/A")
+            return NA
 
     def _eval_binary_op(self, op: str, left_expr, right_expr) -> Any:
         """求值二元运算"""
-        import pandas as pd
-        from datetime import datetime, date
-
         left = self.evaluate(left_expr)
         right = self.evaluate(right_expr)
+        return self._apply_binary_op(op, left, right)
 
-        # 处理空值（None 或 pandas NaT/NaN）
-        def is_null(val):
-            if val is None:
-                return True
-            if pd.isna(val):
-                return True
-            return False
-
-        def is_numeric(val):
-            """检查是否为数值类型（排除 bool）"""
-            return isinstance(val, (int, float)) and not isinstance(val, bool)
-
-        def is_datetime(val):
-            return isinstance(val, (datetime, date, pd.Timestamp))
-
-        def try_convert_to_number(val):
-            """尝试将值转换为数值，返回 (成功, 结果)"""
-            if is_numeric(val):
-                return True, val
-            if isinstance(val, str):
-                try:
-                    return True, float(val)
-                except (ValueError, TypeError):
-                    return False, val
-            return False, val
-
-        def safe_compare(a, b, compare_func) -> bool:
-            """
-            安全比较两个值，处理类型不匹配的情况
-
-            比较策略（模拟 Excel 行为）：
-            1. 空值：空值参与比较时返回 False
-            2. 同类型：直接比较
-            3. 数值 vs 字符串：尝试将字符串转为数值
-            4. 无法比较：返回 False（而不是报错）
-            """
-            # 空值处理
-            if is_null(a) or is_null(b):
-                return False
-
-            # 尝试将两边都转换为数值进行比较
-            a_is_num, a_num = try_convert_to_number(a)
-            b_is_num, b_num = try_convert_to_number(b)
-
-            if a_is_num and b_is_num:
-                # 两边都能转换为数值，用数值比较
-                try:
-                    return compare_func(a_num, b_num)
-                except TypeError:
-                    return False
-
-            # 如果有一边是数值另一边是无法转换的字符串
-            # Excel 行为：数值永远 < 文本
-            if a_is_num and not b_is_num:
-                # a 是数值，b 是文本：数值 < 文本
-                if compare_func == (lambda x, y: x < y):
-                    return True
-                elif compare_func == (lambda x, y: x > y):
-                    return False
-                elif compare_func == (lambda x, y: x <= y):
-                    return True
-                elif compare_func == (lambda x, y: x >= y):
-                    return False
-                return False
-
-            if not a_is_num and b_is_num:
-                # a 是文本，b 是数值：文本 > 数值
-                if compare_func == (lambda x, y: x < y):
-                    return False
-                elif compare_func == (lambda x, y: x > y):
-                    return True
-                elif compare_func == (lambda x, y: x <= y):
-                    return False
-                elif compare_func == (lambda x, y: x >= y):
-                    return True
-                return False
-
-            # 两边都是字符串，用字符串比较
-            try:
-                return compare_func(str(a), str(b))
-            except TypeError:
-                return False
-
+    def _apply_binary_op(self, op: str, left: Any, right: Any) -> Any:
+        """对已求值的两个操作数执行二元运算"""
         # 错误传播：如果任一操作数是 ExcelError，直接返回该错误
         if isinstance(left, ExcelError):
             return left
@@ -367,16 +524,15 @@ class FormulaEvaluator:
             return right
 
         # 对于算术运算，检查空值和类型
-        arithmetic_ops = {"+", "-", "*", "/"}
-        if op in arithmetic_ops:
+        if op in _ARITHMETIC_OPS:
             # 检查空值
-            if is_null(left) or is_null(right):
-                return ExcelError("#VALUE!")
+            if _is_null(left) or _is_null(right):
+                return VALUE
 
-            if is_datetime(left) or is_datetime(right):
-                return ExcelError("#VALUE!")
+            if _is_datetime(left) or _is_datetime(right):
+                return VALUE
 
-            if not is_numeric(left) or not is_numeric(right):
+            if not _is_numeric(left) or not _is_numeric(right):
                 # 尝试转换字符串为数字
                 try:
                     if isinstance(left, str):
@@ -384,33 +540,216 @@ class FormulaEvaluator:
                     if isinstance(right, str):
                         right = float(right)
                 except (ValueError, TypeError):
-                    return ExcelError("#VALUE!")
+                    return VALUE
 
         # 比较运算符需要特殊处理类型不匹配
-        comparison_ops = {">", "<", ">=", "<="}
-        if op in comparison_ops:
-            compare_funcs = {
-                ">": lambda x, y: x > y,
-                "<": lambda x, y: x < y,
-                ">=": lambda x, y: x >= y,
-                "<=": lambda x, y: x <= y,
-            }
-            return safe_compare(left, right, compare_funcs[op])
-
-        ops = {
-            "+": lambda a, b: a + b,
-            "-": lambda a, b: a - b,
-            "*": lambda a, b: a * b,
-            "/": lambda a, b: a / b if b != 0 else ExcelError("#DIV/0!"),
-            "=": lambda a, b: a == b,   # Excel 风格的等于运算符
-            "<>": lambda a, b: a != b,  # Excel 风格的不等于运算符
-            "&": lambda a, b: str(a if not is_null(a) else "") + str(b if not is_null(b) else ""),  # 文本拼接运算符
-        }
+        compare_func = _COMPARE_OPS.get(op)
+        if compare_func is not None:
+            return _safe_compare(left, right, compare_func)
 
-        if op not in ops:
+        func = _BIN_OPS.get(op)
+        if func is None:
             raise ValueError(f"未知的运算符: {op}")
 
-        return ops[op](left, right)
+        return func(left, right)
+
+    # 需要特殊处理参数的函数（函数名 -> 求值方法），其他函数先求值参数再调用 functions
+    _SPECIAL_FUNCTIONS = {
+        "IF": _eval_if,
+        "AND": _eval_and,
+        "OR": _eval_or,
+        "COUNTIFS": _eval_countifs,
+        "VLOOKUP": _eval_vlookup,
+    }
+
+
+# ==================== 二元运算辅助函数 ====================
+
+
+def _is_null(val: Any) -> bool:
+    """处理空值（None 或 pandas NaT/NaN）"""
+    if val is None:
+        return True
+    if pd.isna(val):
+        return True
+    return False
+
+
+def _is_numeric(val: Any) -> bool:
+    """检查是否为数值类型（排除 bool）"""
+    return isinstance(val, (int, float)) and not isinstance(val, bool)
+
+
+def _is_datetime(val: Any) -> bool:
+    return isinstance(val, (datetime, date, pd.Timestamp))
+
+
+def _try_convert_to_number(val: Any):
+    """尝试将值转换为数值，返回 (成功, 结果)"""
+    if _is_numeric(val):
+        return True, val
+    if isinstance(val, str):
+        try:
+            return True, float(val)
+        except (ValueError, TypeError):
+            return False, val
+    return False, val
+
+
+def _safe_compare(a: Any, b: Any, compare_func: Callable[[Any, Any], bool]) -> bool:
+    """
+    安全比较两个值，处理类型不匹配的情况
+
+    比较策略：
+    1. 空值：空值参与比较时返回 False
+    2. 同类型：直接比较
+    3. 数值 vs 字符串：尝试将字符串转为数值
+    4. 无法比较：返回 False（而不是报错）
+    """
+    # 空值处理
+    if _is_null(a) or _is_null(b):
+        return False
+
+    # 尝试将两边都转换为数值进行比较
+    a_is_num, a_num = _try_convert_to_number(a)
+    b_is_num, b_num = _try_convert_to_number(b)
+
+    if a_is_num and b_is_num:
+        # 两边都能转换为数值，用数值比较
+        try:
+            return compare_func(a_num, b_num)
+        except TypeError:
+            return False
+
+    # 一边是数值、另一边是无法转换为数值的文本：视为无法比较
+    if a_is_num or b_is_num:
+        return False
+
+    # 两边都是字符串，用字符串比较
+    try:
+        return compare_func(str(a), str(b))
+    except TypeError:
+        return False
+
+
+def _safe_div(a: Any, b: Any) -> Any:
+    """除法（除数为 0 时返回 #DIV/0!）"""
+    return a / b if b != 0 else DIV0
+
+
+def _concat_text(a: Any, b: Any) -> str:
+    """文本拼接（空值按空字符串处理）"""
+    return str(a if not _is_null(a) else "") + str(b if not _is_null(b) else "")
+
+
+# 算术运算符（需要检查空值和类型）
+_ARITHMETIC_OPS = frozenset({"+", "-", "*", "/"})
+
+# 比较运算符 -> 比较函数
+_COMPARE_OPS = {
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
+# 其他二元运算符 -> 运算函数
+_BIN_OPS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": _safe_div,
+    "=": operator.eq,    # Excel 风格的等于运算符
+    "<>": operator.ne,   # Excel 风格的不等于运算符
+    "&": _concat_text,   # 文本拼接运算符
+}
+
+
+# ==================== 整列向量化辅助函数 ====================
+
+# 可整列计算的算术运算符
+_VECTOR_ARITHMETIC = {
+    "+": np.add,
+    "-": np.subtract,
+    "*": np.multiply,
+    "/": np.true_divide,
+}
+
+# 可整列计算的比较运算符
+_VECTOR_COMPARE = {
+    ">": np.greater,
+    "<": np.less,
+    ">=": np.greater_equal,
+    "<=": np.less_equal,
+    "=": np.equal,
+    "<>": np.not_equal,
+}
+
+# 整数参与向量化计算的绝对值上限（float64 可精确表示的最大整数）
+_VECTOR_INT_LIMIT = 2 ** 53
+
+
+def _vector_scalar(value: Any) -> Optional[tuple]:
+    """数值字面量转为向量化结果，其他类型返回 None"""
+    if type(value) is float:
+        return value, None, False
+    if type(value) is int and abs(value) <= _VECTOR_INT_LIMIT:
+        return value, None, False
+    return None
+
+
+def _numeric_array(values: List[Any]) -> Optional[np.ndarray]:
+    """
+    将全为 float（或全为 int）的列数据转为数组，其他列返回 None
+
+    要求类型完全一致，保证整列计算的结果类型与逐行计算相同（int 与 int 运算仍得到 int）。
+    """
+    types = set(map(type, values))
+    if types == {float}:
+        return np.array(values, dtype=np.float64)
+    if types == {int}:
+        try:
+            array = np.array(values, dtype=np.int64)
+        except OverflowError:
+            return None
+        if len(array) and np.abs(array).max() > _VECTOR_INT_LIMIT:
+            return None
+        return array
+    return None
+
+
+def _nan_mask(values: Any) -> Any:
+    """空值（NaN）掩码，整数数组和标量按各自类型判断"""
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == "f":
+            return np.isnan(values)
+        return np.zeros(len(values), dtype=bool)
+    return isinstance(values, float) and values != values
+
+
+def _merge_errors(left: Optional[np.ndarray], right: Optional[np.ndarray]) -> Optional[np.ndarray]:
+    """合并两侧的错误值（左侧优先）"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return np.where(left != None, left, right)  # noqa: E711
+
+
+def _set_errors(
+    errors: Optional[np.ndarray], mask: Any, error: ExcelError, length: int
+) -> Optional[np.ndarray]:
+    """在 mask 为 True 且尚无错误的位置填入错误值"""
+    mask = np.broadcast_to(mask, (length,))
+    if not mask.any():
+        return errors
+    if errors is None:
+        errors = np.full(length, None, dtype=object)
+    else:
+        errors = errors.copy()
+        mask = mask & (errors == None)  # noqa: E711
+    errors[mask] = error
+    return errors
 
 
 class Executor:
@@ -419,6 +758,20 @@ class Executor:
     def __init__(self, tables: FileCollection):
         self.tables = tables
         self.variables: Dict[str, Any] = {}
+        # 操作类型 -> 执行方法
+        self._dispatch: Dict[type, Callable[[Any], OperationResult]] = {
+            AggregateOperation: self._execute_aggregate,
+            AddColumnOperation: self._execute_add_column,
+            UpdateColumnOperation: self._execute_update_column,
+            ComputeOperation: self._execute_compute,
+            FilterOperation: self._execute_filter,
+            SortOperation: self._execute_sort,
+            GroupByOperation: self._execute_group_by,
+            CreateSheetOperation: self._execute_create_sheet,
+            TakeOperation: self._execute_take,
+            SelectColumnsOperation: self._execute_select_columns,
+            DropColumnsOperation: self._execute_drop_columns,
+        }
 
     def execute(self, operations: List[Operation]) -> ExecutionResult:
         """执行操作列表"""
@@ -513,33 +866,13 @@ class Executor:
 
     def _execute_operation(self, op: Operation) -> OperationResult:
         """执行单个操作"""
-        if isinstance(op, AggregateOperation):
-            return self._execute_aggregate(op)
-        elif isinstance(op, AddColumnOperation):
-            return self._execute_add_column(op)
-        elif isinstance(op, UpdateColumnOperation):
-            return self._execute_update_column(op)
-        elif isinstance(op, ComputeOperation):
-            return self._execute_compute(op)
-        elif isinstance(op, FilterOperation):
-            return self._execute_filter(op)
-        elif isinstance(op, SortOperation):
-            return self._execute_sort(op)
-        elif isinstance(op, GroupByOperation):
-            return self._execute_group_by(op)
-        elif isinstance(op, CreateSheetOperation):
-            return self._execute_create_sheet(op)
-        elif isinstance(op, TakeOperation):
-            return self._execute_take(op)
-        elif isinstance(op, SelectColumnsOperation):
-            return self._execute_select_columns(op)
-        elif isinstance(op, DropColumnsOperation):
-            return self._execute_drop_columns(op)
-        else:
+        handler = self._dispatch.get(type(op))
+        if handler is None:
             return OperationResult(
                 operation=op,
                 error=f"未知操作类型: {type(op).__name__}"
             )
+        return handler(op)
 
     def _execute_aggregate(self, op: AggregateOperation) -> OperationResult:
         """执行聚合操作"""
@@ -554,22 +887,28 @@ class Executor:
                     error=f"未知聚合函数: {op.function}"
                 )
 
-            if op.function in {"SUM", "COUNT", "COUNTA", "AVERAGE", "MIN", "MAX", "MEDIAN"}:
+            if op.function in {"SUM", "COUNT", "AVERAGE", "MIN", "MAX", "MEDIAN"}:
+                # 使用按列缓存的有效数值数组，不再逐个做类型检查
+                value = func(table.get_numeric_values(op.column))
+
+            elif op.function == "COUNTA":
                 column_data = table.get_column(op.column)
                 value = func(column_data)
 
             elif op.function == "SUMIF":
-                sum_range = table.get_column(op.column)
-                criteria_range = table.get_column(op.condition_column)
+                sum_range, criteria_range = self._conditional_ranges(table, op)
                 value = func(sum_range, criteria_range, op.condition)
 
             elif op.function == "COUNTIF":
-                criteria_range = table.get_column(op.condition_column)
+                criteria_range = None
+                if NUMBA_AVAILABLE and parse_numeric_condition(op.condition) is not None:
+                    criteria_range = table.get_float_array(op.condition_column)
+                if criteria_range is None:
+                    criteria_range = table.get_column(op.condition_column)
                 value = func(criteria_range, op.condition)
 
             elif op.function == "AVERAGEIF":
-                avg_range = table.get_column(op.column)
-                criteria_range = table.get_column(op.condition_column)
+                avg_range, criteria_range = self._conditional_ranges(table, op)
                 value = func(avg_range, criteria_range, op.condition)
 
             else:
@@ -583,6 +922,21 @@ class Executor:
         except Exception as e:
             return OperationResult(operation=op, error=str(e))
 
+    @staticmethod
+    def _conditional_ranges(table: Table, op: AggregateOperation) -> tuple:
+        """
+        获取 SUMIF/AVERAGEIF 的 (值范围, 条件范围)
+
+        可用 numba 且两列都是数值列、条件是数值条件时返回 float64 数组，交给 JIT 内核；
+        否则返回普通列数据。
+        """
+        if NUMBA_AVAILABLE and parse_numeric_condition(op.condition) is not None:
+            values = table.get_float_array(op.column)
+            criteria_values = table.get_float_array(op.condition_column)
+            if values is not None and criteria_values is not None:
+                return values, criteria_values
+        return table.get_column(op.column), table.get_column(op.condition_column)
+
     def _execute_add_column(self, op: AddColumnOperation) -> OperationResult:
         """
         执行新增列操作
@@ -606,33 +960,30 @@ class Executor:
                 for col_name in columns
             }
 
-            # ✅ 优化 2: 复用 FormulaEvaluator 实例
+            # ✅ 优化 2: 复用 FormulaEvaluator 实例，按列数据 + 行号取值
             evaluator = FormulaEvaluator(
                 tables=self.tables,
                 functions=ROW_FUNC_MAP,
                 variables=self.variables,  # ✅ 支持变量引用
+                columns=column_cache,
             )
 
-            column_values = []
             row_errors = []  # ✅ 优化 4: 记录行级错误
 
-            # 为每一行计算值
-            for row_idx in range(row_count):
-                # 构建行上下文（直接从缓存获取，避免重复调用 get_column）
-                row_context = {
-                    col_name: column_cache[col_name][row_idx]
-                    for col_name in columns
-                }
-
-                # 设置行上下文（复用 evaluator）
-                evaluator.set_row_context(row_context)
-
-                try:
-                    value = evaluator.evaluate(op.formula)
-                    column_values.append(value)
-                except Exception as e:
-                    column_values.append(ExcelError("#ERROR"))
-                    row_errors.append(f"行 {row_idx + 2}: {str(e)}")
+            # 纯数值列的算术/比较公式整列计算；否则预编译为按行号求值的函数，逐行调用
+            column_values = evaluator.try_vectorize(op.formula, row_count)
+            if column_values is None:
+                formula = evaluator.compile(op.formula)
+                column_values = []
+
+                # 为每一行计算值
+                for row_idx in range(row_count):
+                    try:
+                        value = formula(row_idx)
+                        column_values.append(value)
+                    except Exception as e:
+                        column_values.append(ERROR)
+                        row_errors.append(f"行 {row_idx + 2}: {str(e)}")
 
             # ✅ 优化 5: 不直接修改 Table，由调用方统一应用
             # （移除了 table.add_column(op.name, column_values)）
@@ -678,33 +1029,30 @@ class Executor:
                 for col_name in columns
             }
 
-            # 复用 FormulaEvaluator 实例
+            # 复用 FormulaEvaluator 实例，按列数据 + 行号取值
             evaluator = FormulaEvaluator(
                 tables=self.tables,
                 functions=ROW_FUNC_MAP,
                 variables=self.variables,
+                columns=column_cache,
             )
 
-            column_values = []
             row_errors = []
 
-            # 为每一行计算值
-            for row_idx in range(row_count):
-                # 构建行上下文
-                row_context = {
-                    col_name: column_cache[col_name][row_idx]
-                    for col_name in columns
-                }
-
-                # 设置行上下文
-                evaluator.set_row_context(row_context)
-
-                try:
-                    value = evaluator.evaluate(op.formula)
-                    column_values.append(value)
-                except Exception as e:
-                    column_values.append(ExcelError("#ERROR"))
-                    row_errors.append(f"行 {row_idx + 2}: {str(e)}")
+            # 纯数值列的算术/比较公式整列计算；否则预编译为按行号求值的函数
+            column_values = evaluator.try_vectorize(op.formula, row_count)
+            if column_values is None:
+                formula = evaluator.compile(op.formula)
+                column_values = []
+
+                # 为每一行计算值
+                for row_idx in range(row_count):
+                    try:
+                        value = formula(row_idx)
+                        column_values.append(value)
+                    except Exception as e:
+                        column_values.append(ERROR)
+                        row_errors.append(f"行 {row_idx + 2}: {str(e)}")
 
             # 构建结果
             result = OperationResult(operation=op, value=column_values)
@@ -879,7 +1227,7 @@ class Executor:
         """
         try:
             table = self.tables.get_table(op.file_id, op.table)
-            df = table.get_data().copy()  # 复制一份，避免修改原数据
+            df = table.get_data(copy=True)  # 复制一份，避免修改原数据
 
             # 构建排序参数
             sort_columns = []
@@ -964,7 +1312,7 @@ class Executor:
         """
         try:
             table = self.tables.get_table(op.file_id, op.table)
-            df = table.get_data()
+            df = table.get_data(copy=True)  # 下面会把 object 列转为数值，不能改到原表
 
             # 验证分组列
             for col in op.group_columns:
@@ -1065,7 +1413,7 @@ class Executor:
                         error="copy 模式需要指定 source.table"
                     )
                 table = self.tables.get_table(op.file_id, source_table)
-                df = table.get_data()
+                df = table.get_data(copy=True)
 
             elif source_type == "reference":
                 # 引用结构（创建空表但列结构相同）
@@ -1,8 +1,18 @@
 """函数库 - 实现聚合函数和行级函数"""
 
 import math
-from typing import Any, Union
-from app.engine.models import Range, ExcelError
+import operator
+from typing import Any, Callable, Optional, Tuple, Union
+
+import numpy as np
+
+from app.engine.functions_jit import (
+    NUMBA_AVAILABLE,
+    conditional_count,
+    conditional_sum,
+    parse_numeric_condition,
+)
+from app.engine.models import Range, ExcelError, DIV0, VALUE as VALUE_ERROR
 
 
 # ==================== 辅助函数 ====================
@@ -30,25 +40,86 @@ def _is_blank(value: Any) -> bool:
     return False
 
 
+def _valid_numbers(values: Union[Range, np.ndarray]) -> np.ndarray:
+    """
+    取出有效数值（排除 NaN、None、bool）
+
+    整数/浮点 ndarray（如 Table.get_numeric_values 的结果）直接向量化过滤；
+    列表逐个判断，结果为 object 数组，保留原始 Python 类型（int/float 混合时 MIN/MAX 结果类型不变）。
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iuf":
+        if values.dtype.kind == "f":
+            return values[~np.isnan(values)]
+        return values
+    return np.array([v for v in values if _is_valid_number(v)], dtype=object)
+
+
+def _sum_numbers(nums: np.ndarray) -> float:
+    """
+    对有效数值求和（数值数组在 C 层求和，object 数组按原顺序累加）
+
+    数值数组不交给 numba：numpy 的 sum 已经是 C 层循环，且使用成对求和，误差比逐个累加小。
+    """
+    if nums.dtype == object:
+        return sum(nums.tolist(), 0.0)
+    return float(nums.sum(dtype=np.float64))
+
+
+def _conditional_sum_jit(
+    values: Union[Range, np.ndarray],
+    criteria_range: Union[Range, np.ndarray],
+    criteria: Union[str, int, float],
+) -> Optional[Tuple[float, int]]:
+    """
+    数值列 + 数值条件时交给 numba 内核计算，返回 (总和, 计数)
+
+    两个范围都必须是 float64 数组（如 Table.get_float_array 的结果），否则返回 None，
+    由调用方按原逻辑逐个判断。
+    """
+    if not NUMBA_AVAILABLE:
+        return None
+    if not (
+        isinstance(values, np.ndarray) and values.dtype == np.float64
+        and isinstance(criteria_range, np.ndarray) and criteria_range.dtype == np.float64
+    ):
+        return None
+    condition = parse_numeric_condition(criteria)
+    if condition is None:
+        return None
+    return conditional_sum(values, criteria_range, condition)
+
+
+def _conditional_count_jit(
+    criteria_range: Union[Range, np.ndarray],
+    criteria: Union[str, int, float],
+) -> Optional[int]:
+    """数值列 + 数值条件时交给 numba 内核计数，条件范围不是 float64 数组时返回 None"""
+    if not NUMBA_AVAILABLE:
+        return None
+    if not (isinstance(criteria_range, np.ndarray) and criteria_range.dtype == np.float64):
+        return None
+    condition = parse_numeric_condition(criteria)
+    if condition is None:
+        return None
+    return conditional_count(criteria_range, condition)
+
+
+def _to_python(value: Any) -> Any:
+    """numpy 标量转为 Python 标量"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
 # ==================== 聚合函数 ====================
 
 
 def SUM(values: Range) -> float:
     """求和（自动排除空值和 NaN）"""
-    total = 0.0
-    for v in values:
-        if _is_valid_number(v):
-            total += v
-    return total
+    return _sum_numbers(_valid_numbers(values))
 
 
 def COUNT(values: Range) -> int:
     """计数（仅有效数值，排除 NaN）"""
-    count = 0
-    for v in values:
-        if _is_valid_number(v):
-            count += 1
-    return count
+    return len(_valid_numbers(values))
 
 
 def COUNTA(values: Range) -> int:
@@ -62,51 +133,61 @@ def COUNTA(values: Range) -> int:
 
 def AVERAGE(values: Range) -> Union[float, ExcelError]:
     """平均值（自动排除空值和 NaN）"""
-    total = 0.0
-    count = 0
-    for v in values:
-        if _is_valid_number(v):
-            total += v
-            count += 1
-    if count == 0:
-        return ExcelError("#DIV/0!")
-    return total / count
+    nums = _valid_numbers(values)
+    if len(nums) == 0:
+        return DIV0
+    return _sum_numbers(nums) / len(nums)
 
 
 def MIN(values: Range) -> Union[float, ExcelError]:
     """最小值（自动排除 NaN）"""
-    nums = [v for v in values if _is_valid_number(v)]
-    if not nums:
-        return ExcelError("#VALUE!")
-    return min(nums)
+    nums = _valid_numbers(values)
+    if len(nums) == 0:
+        return VALUE_ERROR
+    return _to_python(nums.min())
 
 
 def MAX(values: Range) -> Union[float, ExcelError]:
     """最大值（自动排除 NaN）"""
-    nums = [v for v in values if _is_valid_number(v)]
-    if not nums:
-        return ExcelError("#VALUE!")
-    return max(nums)
+    nums = _valid_numbers(values)
+    if len(nums) == 0:
+        return VALUE_ERROR
+    return _to_python(nums.max())
 
 
 def MEDIAN(values: Range) -> Union[float, ExcelError]:
     """中位数（自动排除 NaN）"""
-    nums = sorted([v for v in values if _is_valid_number(v)])
-    if not nums:
-        return ExcelError("#VALUE!")
+    nums = np.sort(_valid_numbers(values))
+    if len(nums) == 0:
+        return VALUE_ERROR
     n = len(nums)
     mid = n // 2
     if n % 2 == 0:
         # 偶数个：取中间两个的平均值
-        return (nums[mid - 1] + nums[mid]) / 2
+        return (_to_python(nums[mid - 1]) + _to_python(nums[mid])) / 2
     else:
         # 奇数个：取中间值
-        return nums[mid]
+        return _to_python(nums[mid])
 
 
-def _match_condition(value: Any, condition: Union[str, int, float]) -> bool:
+# 条件运算符（按匹配顺序，两个字符的运算符在前）
+_CONDITION_OPERATORS = (
+    (">=", operator.ge),
+    ("<=", operator.le),
+    ("<>", operator.ne),
+    (">", operator.gt),
+    ("<", operator.lt),
+)
+
+
+def _never(value: Any) -> bool:
+    """始终不匹配的条件"""
+    return False
+
+
+def _compile_condition(condition: Union[str, int, float]) -> Callable[[Any], bool]:
     """
-    检查值是否匹配条件
+    将条件预解析为判断函数（每次 SUMIF/COUNTIF 调用只解析一次，逐行只执行比较）
 
     支持的条件格式:
     - 精确匹配: "已完成", 100
@@ -114,48 +195,47 @@ def _match_condition(value: Any, condition: Union[str, int, float]) -> bool:
     """
     if isinstance(condition, (int, float)):
         # 数值精确匹配
-        return value == condition
-
-    if isinstance(condition, str):
-        condition = condition.strip()
-
-        # 检查比较运算符
-        if condition.startswith(">="):
-            try:
-                num = float(condition[2:])
-                return isinstance(value, (int, float)) and value >= num
-            except ValueError:
-                return False
-        elif condition.startswith("<="):
-            try:
-                num = float(condition[2:])
-                return isinstance(value, (int, float)) and value <= num
-            except ValueError:
-                return False
-        elif condition.startswith("<>"):
-            cmp_value = condition[2:]
-            try:
-                num = float(cmp_value)
-                return value != num
-            except ValueError:
-                return str(value) != cmp_value
-        elif condition.startswith(">"):
-            try:
-                num = float(condition[1:])
-                return isinstance(value, (int, float)) and value > num
-            except ValueError:
-                return False
-        elif condition.startswith("<"):
-            try:
-                num = float(condition[1:])
-                return isinstance(value, (int, float)) and value < num
-            except ValueError:
-                return False
-        else:
-            # 字符串精确匹配
-            return str(value) == condition
+        return lambda value: value == condition
+
+    if not isinstance(condition, str):
+        return _never
+
+    condition = condition.strip()
+
+    # 检查比较运算符
+    for prefix, compare in _CONDITION_OPERATORS:
+        if not condition.startswith(prefix):
+            continue
+        operand = condition[len(prefix):]
+        try:
+            num = float(operand)
+        except ValueError:
+            # "<>文本" 按字符串比较，其他比较运算符的操作数必须是数值
+            if compare is operator.ne:
+                return lambda value: str(value) != operand
+            return _never
+        if compare is operator.ne:
+            return lambda value: value != num
+        return lambda value: isinstance(value, (int, float)) and compare(value, num)
+
+    # 字符串精确匹配
+    return lambda value: str(value) == condition
+
+
+def _condition_rank(condition: Union[str, int, float]) -> int:
+    """
+    估计条件的选择性（越小越先判断）
 
-    return False
+    精确匹配通常只命中少数行，比较运算次之，"<>" 通常命中大多数行。
+    """
+    if not isinstance(condition, str):
+        return 0
+    condition = condition.strip()
+    if condition.startswith("<>"):
+        return 2
+    if condition.startswith((">", "<")):
+        return 1
+    return 0
 
 
 def SUMIF(
@@ -167,9 +247,14 @@ def SUMIF(
     if len(sum_range) != len(criteria_range):
         raise ValueError("sum_range 和 criteria_range 长度不匹配")
 
+    jit_result = _conditional_sum_jit(sum_range, criteria_range, criteria)
+    if jit_result is not None:
+        return jit_result[0]
+
+    match = _compile_condition(criteria)
     total = 0.0
     for value, check_value in zip(sum_range, criteria_range):
-        if _match_condition(check_value, criteria):
+        if match(check_value):
             if _is_valid_number(value):
                 total += value
     return total
@@ -180,9 +265,14 @@ def COUNTIF(
     criteria: Union[str, int, float]
 ) -> int:
     """条件计数"""
+    jit_result = _conditional_count_jit(criteria_range, criteria)
+    if jit_result is not None:
+        return jit_result
+
+    match = _compile_condition(criteria)
     count = 0
     for check_value in criteria_range:
-        if _match_condition(check_value, criteria):
+        if match(check_value):
             count += 1
     return count
 
@@ -206,26 +296,32 @@ def COUNTIFS(*args) -> int:
     for i in range(0, len(args), 2):
         criteria_range = args[i]
         criteria = args[i + 1]
-        pairs.append((criteria_range, criteria))
+        pairs.append((criteria_range, criteria, _compile_condition(criteria)))
 
     # 检查所有范围长度一致
     first_len = len(pairs[0][0])
-    for criteria_range, _ in pairs:
+    for criteria_range, _, _ in pairs:
         if len(criteria_range) != first_len:
             raise ValueError("COUNTIFS 所有范围长度必须一致")
 
-    # 统计满足所有条件的行数
-    count = 0
-    for row_idx in range(first_len):
-        all_match = True
-        for criteria_range, criteria in pairs:
-            if not _match_condition(criteria_range[row_idx], criteria):
-                all_match = False
-                break
-        if all_match:
-            count += 1
+    # 估计选择性高的条件（精确匹配）先判断，之后的条件只检查仍然满足的行
+    pairs.sort(key=lambda pair: _condition_rank(pair[1]))
+    rows = None
+    for criteria_range, _, match in pairs:
+        if rows is None:
+            mask = np.fromiter(map(match, criteria_range), dtype=bool, count=first_len)
+            rows = np.flatnonzero(mask)
+        else:
+            mask = np.fromiter(
+                (match(criteria_range[i]) for i in rows.tolist()),
+                dtype=bool,
+                count=len(rows),
+            )
+            rows = rows[mask]
+        if len(rows) == 0:
+            break
 
-    return count
+    return len(rows)
 
 
 def AVERAGEIF(
@@ -237,16 +333,24 @@ def AVERAGEIF(
     if len(avg_range) != len(criteria_range):
         raise ValueError("avg_range 和 criteria_range 长度不匹配")
 
+    jit_result = _conditional_sum_jit(avg_range, criteria_range, criteria)
+    if jit_result is not None:
+        total, count = jit_result
+        if count == 0:
+            return DIV0
+        return total / count
+
+    match = _compile_condition(criteria)
     total = 0.0
     count = 0
     for value, check_value in zip(avg_range, criteria_range):
-        if _match_condition(check_value, criteria):
+        if match(check_value):
             if _is_valid_number(value):
                 total += value
                 count += 1
 
     if count == 0:
-        return ExcelError("#DIV/0!")
+        return DIV0
     return total / count
 
 
@@ -363,23 +467,22 @@ def ABS(value: Union[int, float]) -> float:
 
 def _to_int(value: Any) -> Union[int, ExcelError]:
     """将值转换为整数，处理无效输入"""
-    _VALUE_ERROR = ExcelError("#VALUE!")
     if isinstance(value, ExcelError):
         return value
     if value is None:
-        return _VALUE_ERROR
+        return VALUE_ERROR
     if isinstance(value, bool):
         return 1 if value else 0
     if isinstance(value, float):
         if math.isnan(value):
-            return _VALUE_ERROR
+            return VALUE_ERROR
         return int(value)
     if isinstance(value, int):
         return value
     try:
         return int(float(value))
     except (ValueError, TypeError):
-        return _VALUE_ERROR
+        return VALUE_ERROR
 
 
 def LEFT(text: Any, num_chars: Any) -> Union[str, ExcelError]:
@@ -388,7 +491,7 @@ def LEFT(text: Any, num_chars: Any) -> Union[str, ExcelError]:
     if isinstance(n, ExcelError):
         return n
     if n < 0:
-        return ExcelError("#VALUE!")
+        return VALUE_ERROR
     return str(text)[:n]
 
 
@@ -398,7 +501,7 @@ def RIGHT(text: Any, num_chars: Any) -> Union[str, ExcelError]:
     if isinstance(n, ExcelError):
         return n
     if n < 0:
-        return ExcelError("#VALUE!")
+        return VALUE_ERROR
     return str(text)[-n:] if n > 0 else ""
 
 
@@ -411,7 +514,7 @@ def MID(text: Any, start_num: Any, num_chars: Any) -> Union[str, ExcelError]:
     if isinstance(n, ExcelError):
         return n
     if start < 1 or n < 0:
-        return ExcelError("#VALUE!")
+        return VALUE_ERROR
     text = str(text)
     start_index = start - 1
     return text[start_index:start_index + n]
@@ -485,7 +588,7 @@ def VALUE(text: str) -> Union[float, ExcelError]:
     try:
         return float(str(text))
     except (ValueError, TypeError):
-        return ExcelError("#VALUE!")
+        return VALUE_ERROR
 
 
 def FIND(find_text: str, within_text: str, start_num: int = 1) -> Union[int, ExcelError]:
@@ -511,13 +614,13 @@ def FIND(find_text: str, within_text: str, start_num: int = 1) -> Union[int, Exc
     # 转换为 0-based 索引
     start_index = start_num - 1
     if start_index < 0:
-        return ExcelError("#VALUE!")
+        return VALUE_ERROR
 
     # 从 start_index 开始查找
     pos = within_text.find(find_text, start_index)
 
     if pos == -1:
-        return ExcelError("#VALUE!")
+        return VALUE_ERROR
 
     # 返回 1-based 位置
     return pos + 1
@@ -546,13 +649,13 @@ def SEARCH(find_text: str, within_text: str, start_num: int = 1) -> Union[int, E
     # 转换为 0-based 索引
     start_index = start_num - 1
     if start_index < 0:
-        return ExcelError("#VALUE!")
+        return VALUE_ERROR
 
     # 从 start_index 开始查找（不区分大小写）
     pos = within_text_lower.find(find_text, start_index)
 
     if pos == -1:
-        return ExcelError("#VALUE!")
+        return VALUE_ERROR
 
     # 返回 1-based 位置
     return pos + 1
@@ -0,0 +1,118 @@
+"""聚合函数的 numba JIT 内核（numba 为可选依赖，未安装时由 functions 退回纯 Python 实现）"""
+
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+NUMBA_AVAILABLE = njit is not None
+
+# 条件运算符编码（传给 JIT 内核）
+OP_EQ = 0
+OP_NE = 1
+OP_GT = 2
+OP_GE = 3
+OP_LT = 4
+OP_LE = 5
+
+# 条件运算符前缀（按匹配顺序，两个字符的运算符在前，与 functions._CONDITION_OPERATORS 一致）
+_CONDITION_CODES = (
+    (">=", OP_GE),
+    ("<=", OP_LE),
+    ("<>", OP_NE),
+    (">", OP_GT),
+    ("<", OP_LT),
+)
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True)
+    def _match_f64(c, threshold, op_code):
+        """数值条件判断（NaN 与任何值比较均不成立，"<>" 除外）"""
+        if op_code == OP_EQ:
+            return c == threshold
+        if op_code == OP_NE:
+            return c != threshold
+        if op_code == OP_GT:
+            return c > threshold
+        if op_code == OP_GE:
+            return c >= threshold
+        if op_code == OP_LT:
+            return c < threshold
+        return c <= threshold
+
+    @njit(cache=True)
+    def _sumif_f64(sum_values, criteria_values, threshold, op_code):
+        """按数值条件累加，返回 (总和, 参与累加的个数)；NaN 视为空值"""
+        total = 0.0
+        count = 0
+        for i in range(sum_values.shape[0]):
+            if _match_f64(criteria_values[i], threshold, op_code):
+                v = sum_values[i]
+                if not np.isnan(v):
+                    total += v
+                    count += 1
+        return total, count
+
+    @njit(cache=True)
+    def _countif_f64(criteria_values, threshold, op_code):
+        """按数值条件计数"""
+        count = 0
+        for i in range(criteria_values.shape[0]):
+            if _match_f64(criteria_values[i], threshold, op_code):
+                count += 1
+        return count
+
+else:
+    _sumif_f64 = None
+    _countif_f64 = None
+
+
+def parse_numeric_condition(
+    condition: Union[str, int, float]
+) -> Optional[Tuple[int, float]]:
+    """
+    解析可交给 JIT 内核的数值条件
+
+    Returns:
+        (运算符编码, 阈值)；文本条件等无法用 float 比较表达的条件返回 None
+    """
+    if isinstance(condition, (int, float)):
+        return OP_EQ, float(condition)
+    if not isinstance(condition, str):
+        return None
+
+    condition = condition.strip()
+    for prefix, op_code in _CONDITION_CODES:
+        if condition.startswith(prefix):
+            try:
+                return op_code, float(condition[len(prefix):])
+            except ValueError:
+                return None
+    return None
+
+
+def conditional_sum(
+    sum_values: np.ndarray,
+    criteria_values: np.ndarray,
+    condition: Tuple[int, float],
+) -> Tuple[float, int]:
+    """
+    按 parse_numeric_condition 的结果做条件求和，需要 NUMBA_AVAILABLE
+
+    Returns:
+        (总和, 参与累加的个数)
+    """
+    op_code, threshold = condition
+    total, count = _sumif_f64(sum_values, criteria_values, threshold, op_code)
+    return float(total), int(count)
+
+
+def conditional_count(criteria_values: np.ndarray, condition: Tuple[int, float]) -> int:
+    """按 parse_numeric_condition 的结果做条件计数，需要 NUMBA_AVAILABLE"""
+    op_code, threshold = condition
+    return int(_countif_f64(criteria_values, threshold, op_code))
@@ -3,8 +3,10 @@
 import logging
 import os
 import asyncio
+import threading
 from typing import Optional, Dict, List, Generator, Tuple, AsyncGenerator
 from openai import OpenAI
+from app.core.config import settings
 from app.engine.prompt import (
     get_analysis_prompt_with_schema,
     get_generation_prompt_with_context,
@@ -15,7 +17,30 @@ logging.basicConfig(level=logging.INFO)
 
 logger = logging.getLogger("llm_client")
 
-logger.setLevel(logging.INFO)
+# DEBUG 模式下额外输出完整提示词
+logger.setLevel(logging.DEBUG if settings.DEBUG else logging.INFO)
+
+# 进程内共享的 OpenAI 客户端（按 api_key/base_url 复用），每个请求新建的 LLMClient
+# 共用同一个 HTTP 连接池，避免每次调用都重新建立 TCP/TLS 连接
+_openai_clients: Dict[Tuple[str, Optional[str]], OpenAI] = {}
+_openai_clients_lock = threading.Lock()
+
+
+def _get_openai_client(api_key: str, base_url: Optional[str]) -> OpenAI:
+    """获取共享的 OpenAI 客户端（首次使用时创建）"""
+    key = (api_key, base_url)
+    client = _openai_clients.get(key)
+    if client is None:
+        with _openai_clients_lock:
+            client = _openai_clients.get(key)
+            if client is None:
+                client_kwargs = {"api_key": api_key}
+                if base_url:
+                    client_kwargs["base_url"] = base_url
+                client = OpenAI(**client_kwargs)
+                _openai_clients[key] = client
+    return client
+
 
 class LLMClient:
     """LLM 客户端类，支持两步流程生成操作描述"""
@@ -41,11 +66,7 @@ class LLMClient:
         if not self.api_key:
             raise ValueError("未设置 OPENAI_API_KEY 环境变量")
 
-        client_kwargs = {"api_key": self.api_key}
-        if self.base_url:
-            client_kwargs["base_url"] = self.base_url
-
-        self.client = OpenAI(**client_kwargs)
+        self.client = _get_openai_client(self.api_key, self.base_url)
 
     def _call_llm(self, system_prompt: str, user_message: str) -> str:
         """
@@ -58,18 +79,14 @@ class LLMClient:
         Returns:
             LLM 响应内容
         """
-
-        log_msg = (
-            "\n"
-            "[LLM 调用] 非流式\n"
-            f"[模型] {self.model}\n"
-            "[System Prompt]\n"
-            f"{system_prompt}\n"
-            "[User Message]\n"
-            f"{user_message}\n"
-        )
-
-        logger.info(log_msg)
+        logger.info("[LLM 调用] 非流式 [模型] %s", self.model)
+        # 完整提示词只在 DEBUG 级别输出，避免每次调用都拼接和写出大段文本
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "\n[System Prompt]\n%s\n[User Message]\n%s\n",
+                system_prompt,
+                user_message,
+            )
 
         messages = [
             { "role": "system", "content": system_prompt },
@@ -86,7 +103,7 @@ class LLMClient:
         )
         result = response.choices[0].message.content.strip()
 
-        logger.info(f"\n[LLM 响应内容]\n{result}")
+        logger.info("\n[LLM 响应内容]\n%s", result)
 
         return result
 
@@ -118,19 +135,13 @@ class LLMClient:
                 {"role": "user", "content": user_message}
             ]
 
-        # 打印提示词日志
-        log_msg = (
-            "\n"
-            "[LLM 调用] 流式\n"
-            f"[模型] {self.model}\n"
-            f"[消息数] {len(full_messages)}\n"
-            "[System Prompt]\n"
-            f"{system_prompt}\n"
-        )
-        for i, msg in enumerate(full_messages[1:], 1):
-            log_msg += f"[{msg['role'].upper()} #{i}]\n{msg['content']}\n"
-
-        logger.info(log_msg)
+        logger.info("[LLM 调用] 流式 [模型] %s [消息数] %d", self.model, len(full_messages))
+        # 完整提示词只在 DEBUG 级别输出，避免每次调用都拼接和写出大段文本
+        if logger.isEnabledFor(logging.DEBUG):
+            log_msg = f"\n[System Prompt]\n{system_prompt}\n"
+            for i, msg in enumerate(full_messages[1:], 1):
+                log_msg += f"[{msg['role'].upper()} #{i}]\n{msg['content']}\n"
+            logger.debug(log_msg)
 
         response = self.client.chat.completions.create(
             model=self.model,
@@ -149,7 +160,7 @@ class LLMClient:
                 full_content += delta
                 yield delta, full_content
 
-        logger.info(f"\n[LLM 响应内容]\n{full_content}")
+        logger.info("\n[LLM 响应内容]\n%s", full_content)
 
     async def _call_llm_stream_async(self, system_prompt: str, user_message: str) -> AsyncGenerator[Tuple[str, str], None]:
         """
@@ -501,14 +512,11 @@ class LLMClient:
         content = content.strip()
 
         if content.startswith("```json"):
-            content = content[7:]
-        elif content.startswith("```"):
-            content = content[3:]
-
-        if content.endswith("```"):
-            content = content[:-3]
+            content = content.removeprefix("```json")
+        else:
+            content = content.removeprefix("```")
 
-        return content.strip()
+        return content.removesuffix("```").strip()
 
 
 def create_llm_client() -> LLMClient:
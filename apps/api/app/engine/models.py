@@ -1,13 +1,38 @@
 """数据模型 - 定义系统中的基础数据类型"""
 
-from typing import Union, List, Dict, Any, Optional
+import sys
+from importlib.util import find_spec
+from typing import Union, List, Dict, Any, Optional, Callable, Sequence
 from dataclasses import dataclass, field
+import numpy as np
 import pandas as pd
 
 
+# 导出引擎：安装了 xlsxwriter 时优先使用（逐单元格写出，不为每个单元格构造 Python 对象），
+# 未安装时退回 openpyxl。pandas 按列写出单元格，不能开启 xlsxwriter 的 constant_memory 模式。
+EXCEL_WRITER_ENGINE = "xlsxwriter" if find_spec("xlsxwriter") is not None else "openpyxl"
+
+
 # ==================== 辅助函数 ====================
 
 
+def _compute_column_letter(index: int) -> str:
+    """按 26 进制计算列标识"""
+    result = ""
+    index += 1
+    while index > 0:
+        index -= 1
+        result = chr(65 + (index % 26)) + result
+        index //= 26
+    return result
+
+
+# 预生成 A..ZZ（前 702 列）的列标识，常见表格直接查表（驻留字符串，作为字典键时比较更快）
+_COLUMN_LETTERS = tuple(sys.intern(_compute_column_letter(i)) for i in range(702))
+# 反向表：列标识 -> 列索引
+_COLUMN_INDEXES = {letter: index for index, letter in enumerate(_COLUMN_LETTERS)}
+
+
 def column_index_to_letter(index: int) -> str:
     """
     将列索引转换为 Excel 列标识
@@ -18,24 +43,93 @@ def column_index_to_letter(index: int) -> str:
     Returns:
         Excel 列标识（A, B, ..., Z, AA, AB, ...）
     """
-    result = ""
-    index += 1
-    while index > 0:
-        index -= 1
-        result = chr(65 + (index % 26)) + result
-        index //= 26
-    return result
+    if 0 <= index < 702:
+        return _COLUMN_LETTERS[index]
+    return sys.intern(_compute_column_letter(index))
+
+
+def column_letters(count: int) -> Sequence[str]:
+    """
+    获取前 count 列的 Excel 列标识
+
+    Returns:
+        ("A", "B", ...)，不超过 702 列时直接切片预生成的列标识表
+    """
+    if count <= len(_COLUMN_LETTERS):
+        return _COLUMN_LETTERS[:count]
+    return _COLUMN_LETTERS + tuple(
+        _compute_column_letter(i) for i in range(len(_COLUMN_LETTERS), count)
+    )
+
+
+def column_letter_to_index(letter: str) -> int:
+    """
+    将 Excel 列标识转换为列索引（column_index_to_letter 的逆运算）
+
+    Args:
+        letter: Excel 列标识（A, B, ..., Z, AA, AB, ...）
+
+    Returns:
+        列索引（从 0 开始）
+    """
+    index = _COLUMN_INDEXES.get(letter)
+    if index is not None:
+        return index
+
+    index = 0
+    for char in letter:
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+def _collect_numbers(values: List[Any]) -> np.ndarray:
+    """
+    从列数据中取出有效数值（排除 NaN、None、bool），只遍历一次
+
+    全是 int 时返回 int64 数组，全是 float 时返回 float64 数组，
+    混合类型（或超出 int64 范围）时返回 object 数组以保留原始 Python 类型。
+    """
+    nums = [
+        v for v in values
+        if isinstance(v, (int, float)) and not isinstance(v, bool) and v == v
+    ]
+    if all(type(v) is int for v in nums):
+        try:
+            return np.array(nums, dtype=np.int64)
+        except OverflowError:
+            pass
+    elif all(type(v) is float for v in nums):
+        return np.array(nums, dtype=np.float64)
+    return np.array(nums, dtype=object)
 
 
 # ==================== Excel 错误类型 ====================
 
 
 class ExcelError(Exception):
-    """Excel 错误值"""
+    """
+    Excel 错误值
+
+    同一错误码只创建一个实例（ExcelError("#N/A") 返回的就是 NA），判断错误值可以直接用 `is`。
+    """
+
+    __slots__ = ("code", "_hash")
+
+    # 错误码 -> 实例
+    _instances: Dict[str, "ExcelError"] = {}
+
+    def __new__(cls, code: str):
+        instance = cls._instances.get(code)
+        if instance is None:
+            instance = super().__new__(cls, code)
+            instance.code = sys.intern(code)
+            instance._hash = hash(instance.code)
+            cls._instances[instance.code] = instance
+        return instance
 
     def __init__(self, code: str):
-        self.code = code
-        super().__init__(code)
+        # 属性已在 __new__ 中设置，重复构造时不再重新赋值
+        pass
 
     def __repr__(self):
         return self.code
@@ -44,12 +138,14 @@ class ExcelError(Exception):
         return self.code
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if isinstance(other, ExcelError):
             return self.code == other.code
         return False
 
     def __hash__(self):
-        return hash(self.code)
+        return self._hash
 
 
 # 预定义 Excel 错误
@@ -57,6 +153,8 @@ NA = ExcelError("#N/A")
 DIV0 = ExcelError("#DIV/0!")
 VALUE = ExcelError("#VALUE!")
 REF = ExcelError("#REF!")
+# 行级公式求值失败时填充的错误值
+ERROR = ExcelError("#ERROR")
 
 
 # ==================== 基础类型定义 ====================
@@ -70,7 +168,7 @@ Range = List[Cell]
 # ==================== 操作定义 ====================
 
 
-@dataclass
+@dataclass(slots=True)
 class AggregateOperation:
     """整列聚合操作"""
 
@@ -93,7 +191,7 @@ class AggregateOperation:
             raise ValueError(f"不支持的聚合函数: {self.function}")
 
 
-@dataclass
+@dataclass(slots=True)
 class AddColumnOperation:
     """新增计算列操作"""
 
@@ -104,7 +202,7 @@ class AddColumnOperation:
     description: Optional[str] = None  # LLM 生成的自然语言描述
 
 
-@dataclass
+@dataclass(slots=True)
 class UpdateColumnOperation:
     """更新现有列操作"""
 
@@ -115,7 +213,7 @@ class UpdateColumnOperation:
     description: Optional[str] = None  # LLM 生成的自然语言描述
 
 
-@dataclass
+@dataclass(slots=True)
 class ComputeOperation:
     """标量运算操作"""
 
@@ -127,7 +225,7 @@ class ComputeOperation:
 # ==================== 新增操作类型（Excel 365+）====================
 
 
-@dataclass
+@dataclass(slots=True)
 class FilterCondition:
     """筛选条件"""
     column: str
@@ -135,14 +233,14 @@ class FilterCondition:
     value: Any
 
 
-@dataclass
+@dataclass(slots=True)
 class OutputTarget:
     """输出目标"""
     type: str  # "new_sheet" 或 "in_place" 或 "replace"
     name: Optional[str] = None  # 新 Sheet 名称
 
 
-@dataclass
+@dataclass(slots=True)
 class FilterOperation:
     """
     筛选操作（Excel 365+ FILTER 函数）
@@ -161,14 +259,14 @@ class FilterOperation:
             raise ValueError(f"logic 必须是 'AND' 或 'OR'，收到: {self.logic}")
 
 
-@dataclass
+@dataclass(slots=True)
 class SortRule:
     """排序规则"""
     column: str
     order: str = "asc"  # "asc" 或 "desc"
 
 
-@dataclass
+@dataclass(slots=True)
 class SortOperation:
     """
     排序操作（Excel 365+ SORT 函数）
@@ -189,7 +287,7 @@ class SortOperation:
                 raise ValueError(f"order 必须是 'asc' 或 'desc'")
 
 
-@dataclass
+@dataclass(slots=True)
 class GroupByAggregation:
     """分组聚合定义"""
     column: str
@@ -197,7 +295,7 @@ class GroupByAggregation:
     as_name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class GroupByOperation:
     """
     分组聚合操作（Excel 365+ GROUPBY 函数）
@@ -219,7 +317,7 @@ class GroupByOperation:
                 raise ValueError(f"不支持的聚合函数: {func}")
 
 
-@dataclass
+@dataclass(slots=True)
 class CreateSheetOperation:
     """
     创建新 Sheet 操作（内部抽象，无 Excel 函数对应）
@@ -240,7 +338,7 @@ class CreateSheetOperation:
             raise ValueError(f"source.type 必须是 'empty', 'copy' 或 'reference'")
 
 
-@dataclass
+@dataclass(slots=True)
 class TakeOperation:
     """
     取前/后 N 行操作（Excel 365+ TAKE 函数）
@@ -262,7 +360,7 @@ class TakeOperation:
             raise ValueError("rows 不能为 0")
 
 
-@dataclass
+@dataclass(slots=True)
 class SelectColumnsOperation:
     """
     选择列操作（Excel 365+ CHOOSECOLS 函数）
@@ -280,7 +378,7 @@ class SelectColumnsOperation:
             self.output = {"type": "in_place"}
 
 
-@dataclass
+@dataclass(slots=True)
 class DropColumnsOperation:
     """
     删除列操作（Excel 365+ CHOOSECOLS 函数）
@@ -314,7 +412,7 @@ Operation = Union[
 ]
 
 
-@dataclass
+@dataclass(slots=True)
 class OperationResult:
     """操作执行结果"""
 
@@ -324,7 +422,7 @@ class OperationResult:
     error: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ExecutionResult:
     """执行结果汇总"""
 
@@ -398,24 +496,131 @@ class Table:
         self.name = name
         self._data = data
         self._columns = list(data.columns)
+        # 列名 -> 列索引（重名列取第一个，与 list.index 一致）
+        self._column_index: Dict[str, int] = {}
+        for index, column_name in enumerate(self._columns):
+            self._column_index.setdefault(column_name, index)
+        # 列名 -> Excel 列标识，首次使用时生成，列变化时失效
+        self._column_letters: Optional[Dict[str, str]] = None
+        # 列数据缓存（列名 -> list），列更新时失效
+        self._column_cache: Dict[str, List[Any]] = {}
+        # 数值列的有效数值数组缓存（列名 -> ndarray），列更新时失效
+        self._numeric_cache: Dict[str, np.ndarray] = {}
+        # 数值列的完整 float64 数组缓存（保留 NaN，与行号对齐），列更新时失效
+        self._float_cache: Dict[str, np.ndarray] = {}
+        # 查找索引缓存（列名 -> {值: 首次出现的行号}），列更新时失效
+        self._lookup_cache: Dict[str, Dict[Any, int]] = {}
+        # 最近一次写入各列的值对象（列名 -> values），供 FileCollection 跳过同一数据的重复写入
+        self._column_sources: Dict[str, Any] = {}
+        # 数据版本号，每次添加/更新列时递增（供 FileCollection 判断结构缓存是否失效）
+        self._version = 0
 
     def __getattr__(self, column_name: str) -> Range:
-        """通过属性访问列数据"""
+        """
+        通过属性访问列数据（table.列名）
+
+        只在常规属性查找失败后才会调用，结果与 get_column 共用列缓存；
+        引擎内部代码应直接调用 get_column。
+        """
         if column_name.startswith('_'):
             raise AttributeError(
                 f"'{type(self).__name__}' object has no attribute '{column_name}'"
             )
 
-        if column_name in self._data.columns:
-            return self._data[column_name].tolist()
+        if column_name in self._column_index:
+            return self.get_column(column_name)
 
         raise AttributeError(f"表 '{self.name}' 没有字段 '{column_name}'")
 
     def get_column(self, column_name: str) -> Range:
-        """获取列数据"""
+        """获取列数据（按列缓存，调用方不应修改）"""
+        column = self._column_cache.get(column_name)
+        if column is not None:
+            return column
+        if column_name not in self._data.columns:
+            raise ValueError(f"表 '{self.name}' 没有字段 '{column_name}'")
+        column = self._data[column_name].tolist()
+        self._column_cache[column_name] = column
+        return column
+
+    def get_numeric_values(self, column_name: str) -> np.ndarray:
+        """
+        获取列中的有效数值（排除 NaN、None、bool），供聚合函数向量化计算
+
+        numpy 整数/浮点类型的列直接取数组；其他类型的列（object 等）逐个判断一次，
+        结果按列缓存，之后的 SUM/COUNT/AVERAGE/MIN/MAX 不再重复做类型检查。
+
+        Args:
+            column_name: 列名
+
+        Returns:
+            有效数值数组（调用方不应修改）
+        """
+        cached = self._numeric_cache.get(column_name)
+        if cached is not None:
+            return cached
+        if column_name not in self._data.columns:
+            raise ValueError(f"表 '{self.name}' 没有字段 '{column_name}'")
+
+        series = self._data[column_name]
+        dtype = series.dtype
+        if isinstance(dtype, np.dtype) and dtype.kind in "iuf":
+            values = series.to_numpy()
+            if dtype.kind == "f":
+                values = values[~np.isnan(values)]
+        else:
+            values = _collect_numbers(self.get_column(column_name))
+        self._numeric_cache[column_name] = values
+        return values
+
+    def get_float_array(self, column_name: str) -> Optional[np.ndarray]:
+        """
+        获取数值列的完整 float64 数组（缺失值为 NaN，下标与行号一致），供条件聚合的 JIT 内核使用
+
+        只处理 numpy 整数/浮点类型的列，其他类型的列返回 None。
+
+        Args:
+            column_name: 列名
+
+        Returns:
+            float64 数组（调用方不应修改），非数值列返回 None
+        """
+        cached = self._float_cache.get(column_name)
+        if cached is not None:
+            return cached
         if column_name not in self._data.columns:
             raise ValueError(f"表 '{self.name}' 没有字段 '{column_name}'")
-        return self._data[column_name].tolist()
+
+        series = self._data[column_name]
+        dtype = series.dtype
+        if not isinstance(dtype, np.dtype) or dtype.kind not in "iuf":
+            return None
+
+        values = series.to_numpy(dtype=np.float64)
+        self._float_cache[column_name] = values
+        return values
+
+    def get_lookup_index(self, column_name: str) -> Dict[Any, int]:
+        """
+        获取列的查找索引（用于 VLOOKUP 精确匹配），结果按列缓存
+
+        同一个值出现多次时保留第一次出现的行号；NaN/NaT 不等于任何值，不进入索引。
+
+        Args:
+            column_name: 列名
+
+        Returns:
+            {值: 行号}（调用方不应修改）
+        """
+        index = self._lookup_cache.get(column_name)
+        if index is None:
+            index = {}
+            for row_idx, key in enumerate(self.get_column(column_name)):
+                if key in index or (key is not None and pd.isna(key)):
+                    continue
+                index[key] = row_idx
+            self._lookup_cache[column_name] = index
+        return index
 
     def get_columns(self) -> List[str]:
         """获取所有列名"""
@@ -423,18 +628,38 @@ class Table:
 
     def get_column_index(self, column_name: str) -> int:
         """获取列索引"""
-        if column_name not in self._columns:
+        index = self._column_index.get(column_name)
+        if index is None:
             raise ValueError(f"表 '{self.name}' 没有字段 '{column_name}'")
-        return self._columns.index(column_name)
+        return index
 
     def get_column_letter(self, column_name: str) -> str:
         """获取列的 Excel 列标识"""
         index = self.get_column_index(column_name)
         return column_index_to_letter(index)
 
-    def get_data(self) -> pd.DataFrame:
-        """获取原始 DataFrame"""
-        return self._data.copy()
+    def get_column_letters(self) -> Dict[str, str]:
+        """
+        获取列名到 Excel 列标识的映射（缓存结果，调用方不应修改）
+
+        Returns:
+            {"列名1": "A", "列名2": "B", ...}
+        """
+        if self._column_letters is None:
+            self._column_letters = dict(
+                zip(self._columns, column_letters(len(self._columns)))
+            )
+        return self._column_letters
+
+    def get_data(self, copy: bool = False) -> pd.DataFrame:
+        """
+        获取原始 DataFrame
+
+        Args:
+            copy: 是否返回副本。默认返回内部 DataFrame 本身（只读使用），
+                  需要修改数据的调用方须传 copy=True
+        """
+        return self._data.copy() if copy else self._data
 
     def row_count(self) -> int:
         """获取行数"""
@@ -451,16 +676,43 @@ class Table:
         Raises:
             ValueError: 如果列名已存在或数据长度不匹配
         """
-        if column_name in self._columns:
-            raise ValueError(
-                f"列 '{column_name}' 已存在，请使用 update_column 更新现有列"
-            )
-        if len(values) != len(self._data):
-            raise ValueError(
-                f"新列数据长度 ({len(values)}) 与表行数 ({len(self._data)}) 不匹配"
+        self.add_columns({column_name: values})
+
+    def add_columns(self, columns: Dict[str, List[Any]]):
+        """
+        批量添加新列（一次性赋值到 DataFrame，避免逐列插入反复整理内部数据块）
+
+        Args:
+            columns: 新增列 {列名: 列数据}
+
+        Raises:
+            ValueError: 如果列名已存在或数据长度不匹配
+        """
+        if not columns:
+            return
+        for column_name, values in columns.items():
+            if column_name in self._column_index:
+                raise ValueError(
+                    f"列 '{column_name}' 已存在，请使用 update_column 更新现有列"
+                )
+            if len(values) != len(self._data):
+                raise ValueError(
+                    f"新列数据长度 ({len(values)}) 与表行数 ({len(self._data)}) 不匹配"
+                )
+        if len(columns) == 1:
+            (column_name, values), = columns.items()
+            self._data[column_name] = values
+        else:
+            # 不用 DataFrame.assign：列名可能与其形参名（self）冲突
+            self._data = pd.concat(
+                [self._data, pd.DataFrame(columns, index=self._data.index)], axis=1
             )
-        self._data[column_name] = values
-        self._columns.append(column_name)
+        for column_name in columns:
+            self._column_index[column_name] = len(self._columns)
+            self._columns.append(column_name)
+        self._column_sources.update(columns)
+        self._column_letters = None
+        self._version += 1
 
     def update_column(self, column_name: str, values: List[Any]):
         """
@@ -473,7 +725,7 @@ class Table:
         Raises:
             ValueError: 如果列名不存在或数据长度不匹配
         """
-        if column_name not in self._columns:
+        if column_name not in self._column_index:
             raise ValueError(
                 f"列 '{column_name}' 不存在，请使用 add_column 添加新列"
             )
@@ -482,6 +734,21 @@ class Table:
                 f"新列数据长度 ({len(values)}) 与表行数 ({len(self._data)}) 不匹配"
             )
         self._data[column_name] = values
+        self._column_sources[column_name] = values
+        self._column_cache.pop(column_name, None)
+        self._numeric_cache.pop(column_name, None)
+        self._float_cache.pop(column_name, None)
+        self._lookup_cache.pop(column_name, None)
+        self._version += 1
+
+    def take_column_source(self, column_name: str) -> Any:
+        """
+        取出并释放最近一次写入该列的值对象
+
+        executor 执行时已把新列/更新列写入表，ExecutionResult 中保存的是同一个 list；
+        FileCollection.apply_* 据此跳过重复写入，避免 pandas 再把整列 list 转换一遍。
+        """
+        return self._column_sources.pop(column_name, None)
 
     def __repr__(self):
         return f"Table(name='{self.name}', columns={self._columns}, rows={len(self._data)})"
@@ -536,10 +803,7 @@ class ExcelFile:
         schema = {}
         for sheet_name, table in self._sheets.items():
             columns = table.get_columns()
-            schema[sheet_name] = {
-                column_index_to_letter(i): col_name
-                for i, col_name in enumerate(columns)
-            }
+            schema[sheet_name] = dict(zip(column_letters(len(columns)), columns))
         return schema
 
     def __repr__(self):
@@ -558,6 +822,8 @@ class FileCollection:
 
     def __init__(self):
         self._files: Dict[str, ExcelFile] = {}
+        # 派生结果缓存：缓存键 -> (结构快照, 结果)，快照变化（增删文件/sheet、列变化）时重新计算
+        self._derived_cache: Dict[Any, tuple] = {}
 
     def add_file(self, excel_file: ExcelFile):
         """添加一个 Excel 文件"""
@@ -590,6 +856,39 @@ class FileCollection:
         """获取所有文件 ID"""
         return list(self._files.keys())
 
+    def snapshot(self) -> tuple:
+        """
+        当前结构快照
+
+        快照直接持有 ExcelFile / Table 对象并带上 Table 的版本号，
+        文件或 sheet 被替换、列被添加或更新后快照即不相等。
+        """
+        return tuple(
+            (file_id, excel_file, tuple(
+                (sheet_name, table, table._version)
+                for sheet_name, table in excel_file._sheets.items()
+            ))
+            for file_id, excel_file in self._files.items()
+        )
+
+    def get_derived(self, key: Any, build: Callable[[], Any]) -> Any:
+        """
+        按结构快照缓存由表结构派生的结果（表结构信息、公式生成器等）
+
+        快照不变时直接返回上次 build() 的结果，否则重新计算。
+
+        Args:
+            key: 缓存键（区分不同的派生结果）
+            build: 计算结果的函数
+        """
+        snapshot = self.snapshot()
+        cached = self._derived_cache.get(key)
+        if cached is not None and cached[0] == snapshot:
+            return cached[1]
+        result = build()
+        self._derived_cache[key] = (snapshot, result)
+        return result
+
     def get_schemas(self) -> Dict[str, Dict[str, Dict[str, str]]]:
         """
         获取所有表的结构信息（两层）
@@ -602,11 +901,13 @@ class FileCollection:
                 },
                 "file_id_2": {...}
             }
+
+        结果按结构快照缓存，调用方不应修改
         """
-        schemas = {}
-        for file_id, excel_file in self._files.items():
-            schemas[file_id] = excel_file.get_schema()
-        return schemas
+        return self.get_derived("schemas", lambda: {
+            file_id: excel_file.get_schema()
+            for file_id, excel_file in self._files.items()
+        })
 
     def get_schemas_with_samples(self, sample_count: int = 3) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
         """
@@ -635,7 +936,16 @@ class FileCollection:
             - object (混合) -> "mixed"
             - datetime64 -> "date"
             - bool -> "boolean"
+
+        结果按结构快照缓存（同一请求的分析/生成阶段会重复调用），调用方不应修改
         """
+        return self.get_derived(
+            ("samples", sample_count),
+            lambda: self._build_schemas_with_samples(sample_count),
+        )
+
+    def _build_schemas_with_samples(self, sample_count: int) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """计算 get_schemas_with_samples 的结果"""
         import math
 
         def detect_column_type(series: pd.Series) -> str:
@@ -749,17 +1059,14 @@ class FileCollection:
                 ...
             }
         """
-        mapping = {}
-        for file_id, excel_file in self._files.items():
-            mapping[file_id] = {}
-            for sheet_name in excel_file.get_sheet_names():
-                table = excel_file.get_sheet(sheet_name)
-                columns = table.get_columns()
-                mapping[file_id][sheet_name] = {
-                    col_name: column_index_to_letter(i)
-                    for i, col_name in enumerate(columns)
-                }
-        return mapping
+        # 各表的映射缓存在 Table 上，这里只复制，不重新计算列标识
+        return {
+            file_id: {
+                sheet_name: dict(table.get_column_letters())
+                for sheet_name, table in excel_file._sheets.items()
+            }
+            for file_id, excel_file in self._files.items()
+        }
 
     def __repr__(self):
         file_info = {
@@ -781,7 +1088,7 @@ class FileCollection:
         Args:
             output_path: 输出文件路径
         """
-        with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
+        with pd.ExcelWriter(output_path, engine=EXCEL_WRITER_ENGINE) as writer:
             for file_id, excel_file in self._files.items():
                 for sheet_name in excel_file.get_sheet_names():
                     table = excel_file.get_sheet(sheet_name)
@@ -801,7 +1108,7 @@ class FileCollection:
         import io
 
         output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        with pd.ExcelWriter(output, engine=EXCEL_WRITER_ENGINE) as writer:
             for file_id, excel_file in self._files.items():
                 for sheet_name in excel_file.get_sheet_names():
                     table = excel_file.get_sheet(sheet_name)
@@ -832,7 +1139,7 @@ class FileCollection:
         excel_file = self._files[file_id]
         output = io.BytesIO()
 
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        with pd.ExcelWriter(output, engine=EXCEL_WRITER_ENGINE) as writer:
             for sheet_name in excel_file.get_sheet_names():
                 table = excel_file.get_sheet(sheet_name)
                 # 直接使用 sheet 名称（不加文件名前缀）
@@ -882,13 +1189,17 @@ class FileCollection:
                 for sheet_name, columns in sheets.items():
                     if excel_file.has_sheet(sheet_name):
                         table = excel_file.get_sheet(sheet_name)
+                        # 如果列已存在则更新，否则添加
+                        # （处理 executor 已经应用过的情况）
+                        added = {}
                         for col_name, values in columns.items():
-                            # 如果列已存在则更新，否则添加
-                            # （处理 executor 已经应用过的情况）
                             if col_name in table.get_columns():
-                                table.update_column(col_name, values)
+                                # executor 已写入同一份数据时跳过
+                                if table.take_column_source(col_name) is not values:
+                                    table.update_column(col_name, values)
                             else:
-                                table.add_column(col_name, values)
+                                added[col_name] = values
+                        table.add_columns(added)
 
     def apply_updated_columns(
         self,
@@ -913,7 +1224,9 @@ class FileCollection:
                     if excel_file.has_sheet(sheet_name):
                         table = excel_file.get_sheet(sheet_name)
                         for col_name, values in columns.items():
-                            table.update_column(col_name, values)
+                            # executor 已写入同一份数据时跳过
+                            if table.take_column_source(col_name) is not values:
+                                table.update_column(col_name, values)
 
     def apply_new_sheets(
         self,
@@ -412,8 +412,10 @@ def generate_manual_steps(operations: List, tables: FileCollection) -> str:
 
     lines = ["🔧 手动操作步骤", ""]
 
-    # 创建公式生成器
-    formula_generator = ExcelFormulaGenerator(tables)
+    # 公式生成器（表结构不变时与 generate_formulas 共用同一个）
+    formula_generator = tables.get_derived(
+        "formula_generator", lambda: ExcelFormulaGenerator(tables)
+    )
 
     # 收集高级操作的公式（用于 365 提示）
     advanced_formulas = []
@@ -1,7 +1,13 @@
 """JSON 解析器 - 解析和校验 LLM 输出的操作描述"""
 
 import json
-from typing import List, Dict, Any, Tuple, Optional, Set
+from typing import List, Dict, Any, Tuple, Optional, Set, Union
+
+try:
+    import orjson
+except ImportError:
+    # orjson 为可选依赖，未安装时使用标准库 json
+    orjson = None
 from app.engine.models import (
     AggregateOperation,
     AddColumnOperation,
@@ -65,6 +71,26 @@ FILTER_OPERATORS = {"=", "<>", ">", "<", ">=", "<=", "contains"}
 # 分组聚合函数
 GROUPBY_FUNCTIONS = {"SUM", "COUNT", "AVERAGE", "MIN", "MAX"}
 
+# 各操作类型的必需字段（按报错顺序）
+REQUIRED_FIELDS = {
+    "aggregate": ("function", "file_id", "table", "as"),
+    "add_column": ("file_id", "table", "name", "formula"),
+    "update_column": ("file_id", "table", "column", "formula"),
+    "compute": ("expression", "as"),
+    "filter": ("file_id", "table", "conditions", "output"),
+    "sort": ("file_id", "table", "by"),
+    "group_by": ("file_id", "table", "group_columns", "aggregations", "output"),
+    "create_sheet": ("file_id", "name"),
+    "take": ("file_id", "table", "rows"),
+    "select_columns": ("file_id", "table", "columns"),
+    "drop_columns": ("file_id", "table", "columns"),
+}
+
+# 必需字段集合，字段齐全时一次集合比较即可
+_REQUIRED_FIELD_SETS = {
+    op_type: frozenset(fields) for op_type, fields in REQUIRED_FIELDS.items()
+}
+
 
 # ==================== 表达式验证器 ====================
 
@@ -128,6 +154,21 @@ class ExpressionValidator:
                 self._validate_recursive(expr["right"], errors, prefix)
 
 
+def _loads_json(json_str: str) -> Any:
+    """
+    解析 JSON（优先使用 orjson）
+
+    orjson 不接受的输入（NaN/Infinity 字面量等）交给标准库解析，错误信息与 json.loads 一致。
+    注意 orjson 会把超过 64 位的整数解析为 float。
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(json_str)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(json_str)
+
+
 # ==================== 解析器类 ====================
 
 
@@ -150,7 +191,7 @@ class OperationParser:
 
         # 1. 解析 JSON
         try:
-            data = json.loads(json_str)
+            data = _loads_json(json_str)
         except json.JSONDecodeError as e:
             return [], [f"JSON 解析错误: {str(e)}"]
 
@@ -193,28 +234,9 @@ class OperationParser:
             return None, [f"{prefix}: 无效的操作类型 '{op_type}'"]
 
         # 根据类型解析
-        if op_type == "aggregate":
-            return OperationParser._parse_aggregate(op_data, prefix)
-        elif op_type == "add_column":
-            return OperationParser._parse_add_column(op_data, prefix)
-        elif op_type == "update_column":
-            return OperationParser._parse_update_column(op_data, prefix)
-        elif op_type == "compute":
-            return OperationParser._parse_compute(op_data, prefix)
-        elif op_type == "filter":
-            return OperationParser._parse_filter(op_data, prefix)
-        elif op_type == "sort":
-            return OperationParser._parse_sort(op_data, prefix)
-        elif op_type == "group_by":
-            return OperationParser._parse_group_by(op_data, prefix)
-        elif op_type == "create_sheet":
-            return OperationParser._parse_create_sheet(op_data, prefix)
-        elif op_type == "take":
-            return OperationParser._parse_take(op_data, prefix)
-        elif op_type == "select_columns":
-            return OperationParser._parse_select_columns(op_data, prefix)
-        elif op_type == "drop_columns":
-            return OperationParser._parse_drop_columns(op_data, prefix)
+        parse = _OPERATION_PARSERS.get(op_type)
+        if parse is not None:
+            return parse(op_data, prefix)
 
         return None, [f"{prefix}: 未知操作类型 '{op_type}'"]
 
@@ -226,10 +248,7 @@ class OperationParser:
         errors = []
 
         # 必需字段（添加 file_id）
-        required = ["function", "file_id", "table", "as"]
-        for field in required:
-            if field not in op_data:
-                errors.append(f"{prefix}: 缺少必需字段 '{field}'")
+        errors.extend(_missing_field_errors(op_data, "aggregate", prefix))
 
         if errors:
             return None, errors
@@ -280,10 +299,7 @@ class OperationParser:
         errors = []
 
         # 必需字段（添加 file_id）
-        required = ["file_id", "table", "name", "formula"]
-        for field in required:
-            if field not in op_data:
-                errors.append(f"{prefix}: 缺少必需字段 '{field}'")
+        errors.extend(_missing_field_errors(op_data, "add_column", prefix))
 
         if errors:
             return None, errors
@@ -317,10 +333,7 @@ class OperationParser:
         errors = []
 
         # 必需字段
-        required = ["file_id", "table", "column", "formula"]
-        for field in required:
-            if field not in op_data:
-                errors.append(f"{prefix}: 缺少必需字段 '{field}'")
+        errors.extend(_missing_field_errors(op_data, "update_column", prefix))
 
         if errors:
             return None, errors
@@ -354,10 +367,7 @@ class OperationParser:
         errors = []
 
         # 必需字段
-        required = ["expression", "as"]
-        for field in required:
-            if field not in op_data:
-                errors.append(f"{prefix}: 缺少必需字段 '{field}'")
+        errors.extend(_missing_field_errors(op_data, "compute", prefix))
 
         if errors:
             return None, errors
@@ -395,10 +405,7 @@ class OperationParser:
         errors = []
 
         # 必需字段
-        required = ["file_id", "table", "conditions", "output"]
-        for field in required:
-            if field not in op_data:
-                errors.append(f"{prefix}: 缺少必需字段 '{field}'")
+        errors.extend(_missing_field_errors(op_data, "filter", prefix))
 
         if errors:
             return None, errors
@@ -460,10 +467,7 @@ class OperationParser:
         errors = []
 
         # 必需字段
-        required = ["file_id", "table", "by"]
-        for field in required:
-            if field not in op_data:
-                errors.append(f"{prefix}: 缺少必需字段 '{field}'")
+        errors.extend(_missing_field_errors(op_data, "sort", prefix))
 
         if errors:
             return None, errors
@@ -516,10 +520,7 @@ class OperationParser:
         errors = []
 
         # 必需字段
-        required = ["file_id", "table", "group_columns", "aggregations", "output"]
-        for field in required:
-            if field not in op_data:
-                errors.append(f"{prefix}: 缺少必需字段 '{field}'")
+        errors.extend(_missing_field_errors(op_data, "group_by", prefix))
 
         if errors:
             return None, errors
@@ -580,10 +581,7 @@ class OperationParser:
         errors = []
 
         # 必需字段
-        required = ["file_id", "name"]
-        for field in required:
-            if field not in op_data:
-                errors.append(f"{prefix}: 缺少必需字段 '{field}'")
+        errors.extend(_missing_field_errors(op_data, "create_sheet", prefix))
 
         if errors:
             return None, errors
@@ -620,10 +618,7 @@ class OperationParser:
         errors = []
 
         # 必需字段
-        required = ["file_id", "table", "rows"]
-        for field in required:
-            if field not in op_data:
-                errors.append(f"{prefix}: 缺少必需字段 '{field}'")
+        errors.extend(_missing_field_errors(op_data, "take", prefix))
 
         if errors:
             return None, errors
@@ -667,10 +662,7 @@ class OperationParser:
         errors = []
 
         # 必需字段
-        required = ["file_id", "table", "columns"]
-        for field in required:
-            if field not in op_data:
-                errors.append(f"{prefix}: 缺少必需字段 '{field}'")
+        errors.extend(_missing_field_errors(op_data, "select_columns", prefix))
 
         if errors:
             return None, errors
@@ -716,10 +708,7 @@ class OperationParser:
         errors = []
 
         # 必需字段
-        required = ["file_id", "table", "columns"]
-        for field in required:
-            if field not in op_data:
-                errors.append(f"{prefix}: 缺少必需字段 '{field}'")
+        errors.extend(_missing_field_errors(op_data, "drop_columns", prefix))
 
         if errors:
             return None, errors
@@ -772,94 +761,123 @@ class OperationParser:
         Returns:
             错误列表
         """
-        errors = []
-        defined_vars = set()
+        validator = _SemanticValidator(file_sheets)
+        for i, op in enumerate(operations):
+            handler = _SEMANTIC_VALIDATORS.get(type(op))
+            if handler is not None:
+                handler(validator, op, f"操作 #{i + 1}")
+        return validator.errors
+
+
+class _SemanticValidator:
+    """validate_operations 的校验状态（错误列表、已定义变量、新创建的 sheet）"""
+
+    __slots__ = ("file_sheets", "errors", "defined_vars", "created_sheets")
+
+    def __init__(self, file_sheets: Dict[str, List[str]]):
+        self.file_sheets = file_sheets
+        self.errors: List[str] = []
+        self.defined_vars = set()
         # 跟踪新创建的 sheet（用于验证后续操作引用）
-        created_sheets: Dict[str, List[str]] = {}
-
-        def check_file_and_sheet(file_id: str, table: str, prefix: str) -> bool:
-            """检查文件和 sheet 是否存在（包括动态创建的）"""
-            if file_id not in file_sheets:
-                # 检查是否在已创建的 sheet 中
-                if file_id not in created_sheets:
-                    errors.append(f"{prefix}: 文件 '{file_id}' 不存在")
-                    return False
-            # 检查 sheet
-            existing_sheets = file_sheets.get(file_id, [])
-            new_sheets = created_sheets.get(file_id, [])
-            if table not in existing_sheets and table not in new_sheets:
-                errors.append(f"{prefix}: Sheet '{table}' 不存在于文件 '{file_id}'")
+        self.created_sheets: Dict[str, List[str]] = {}
+
+    def check_file_and_sheet(self, file_id: str, table: str, prefix: str) -> bool:
+        """检查文件和 sheet 是否存在（包括动态创建的）"""
+        if file_id not in self.file_sheets:
+            # 检查是否在已创建的 sheet 中
+            if file_id not in self.created_sheets:
+                self.errors.append(f"{prefix}: 文件 '{file_id}' 不存在")
                 return False
-            return True
+        # 检查 sheet
+        existing_sheets = self.file_sheets.get(file_id, [])
+        new_sheets = self.created_sheets.get(file_id, [])
+        if table not in existing_sheets and table not in new_sheets:
+            self.errors.append(f"{prefix}: Sheet '{table}' 不存在于文件 '{file_id}'")
+            return False
+        return True
+
+    def register_new_sheet(self, file_id: str, sheet_name: str):
+        """注册新创建的 sheet"""
+        sheets = self.created_sheets.setdefault(file_id, [])
+        if sheet_name not in sheets:
+            sheets.append(sheet_name)
+
+    def validate_aggregate(self, op: AggregateOperation, prefix: str):
+        self.check_file_and_sheet(op.file_id, op.table, prefix)
+        self.defined_vars.add(op.as_var)
+
+    def validate_column(self, op: Union[AddColumnOperation, UpdateColumnOperation], prefix: str):
+        self.check_file_and_sheet(op.file_id, op.table, prefix)
+
+    def validate_compute(self, op: ComputeOperation, prefix: str):
+        self.defined_vars.add(op.as_var)
+
+    def validate_with_output(self, op: Operation, prefix: str):
+        """filter / sort / take / select_columns / drop_columns：输出到新 sheet 时注册它"""
+        self.check_file_and_sheet(op.file_id, op.table, prefix)
+        if op.output and op.output.get("type") == "new_sheet":
+            self.register_new_sheet(op.file_id, op.output["name"])
+
+    def validate_group_by(self, op: GroupByOperation, prefix: str):
+        self.check_file_and_sheet(op.file_id, op.table, prefix)
+        # group_by 总是输出到新 sheet
+        self.register_new_sheet(op.file_id, op.output["name"])
+
+    def validate_create_sheet(self, op: CreateSheetOperation, prefix: str):
+        # 检查文件是否存在
+        if op.file_id not in self.file_sheets and op.file_id not in self.created_sheets:
+            self.errors.append(f"{prefix}: 文件 '{op.file_id}' 不存在")
+        # 如果是复制或引用，检查源表
+        source_type = op.source.get("type") if op.source else "empty"
+        if source_type in {"copy", "reference"}:
+            source_table = op.source.get("table")
+            if source_table:
+                self.check_file_and_sheet(op.file_id, source_table, prefix)
+        # 注册新 sheet
+        self.register_new_sheet(op.file_id, op.name)
+
+
+# 操作类型 -> 语义校验函数
+_SEMANTIC_VALIDATORS = {
+    AggregateOperation: _SemanticValidator.validate_aggregate,
+    AddColumnOperation: _SemanticValidator.validate_column,
+    UpdateColumnOperation: _SemanticValidator.validate_column,
+    ComputeOperation: _SemanticValidator.validate_compute,
+    FilterOperation: _SemanticValidator.validate_with_output,
+    SortOperation: _SemanticValidator.validate_with_output,
+    GroupByOperation: _SemanticValidator.validate_group_by,
+    CreateSheetOperation: _SemanticValidator.validate_create_sheet,
+    TakeOperation: _SemanticValidator.validate_with_output,
+    SelectColumnsOperation: _SemanticValidator.validate_with_output,
+    DropColumnsOperation: _SemanticValidator.validate_with_output,
+}
 
-        def register_new_sheet(file_id: str, sheet_name: str):
-            """注册新创建的 sheet"""
-            if file_id not in created_sheets:
-                created_sheets[file_id] = []
-            if sheet_name not in created_sheets[file_id]:
-                created_sheets[file_id].append(sheet_name)
 
-        for i, op in enumerate(operations):
-            prefix = f"操作 #{i + 1}"
-
-            if isinstance(op, AggregateOperation):
-                check_file_and_sheet(op.file_id, op.table, prefix)
-                defined_vars.add(op.as_var)
-
-            elif isinstance(op, AddColumnOperation):
-                check_file_and_sheet(op.file_id, op.table, prefix)
-
-            elif isinstance(op, UpdateColumnOperation):
-                check_file_and_sheet(op.file_id, op.table, prefix)
-
-            elif isinstance(op, ComputeOperation):
-                defined_vars.add(op.as_var)
-
-            elif isinstance(op, FilterOperation):
-                check_file_and_sheet(op.file_id, op.table, prefix)
-                # 如果输出到新 sheet，注册它
-                if op.output.get("type") == "new_sheet":
-                    register_new_sheet(op.file_id, op.output["name"])
-
-            elif isinstance(op, SortOperation):
-                check_file_and_sheet(op.file_id, op.table, prefix)
-                # 如果输出到新 sheet，注册它
-                if op.output and op.output.get("type") == "new_sheet":
-                    register_new_sheet(op.file_id, op.output["name"])
-
-            elif isinstance(op, GroupByOperation):
-                check_file_and_sheet(op.file_id, op.table, prefix)
-                # group_by 总是输出到新 sheet
-                register_new_sheet(op.file_id, op.output["name"])
-
-            elif isinstance(op, CreateSheetOperation):
-                # 检查文件是否存在
-                if op.file_id not in file_sheets and op.file_id not in created_sheets:
-                    errors.append(f"{prefix}: 文件 '{op.file_id}' 不存在")
-                # 如果是复制或引用，检查源表
-                source_type = op.source.get("type") if op.source else "empty"
-                if source_type in {"copy", "reference"}:
-                    source_table = op.source.get("table")
-                    if source_table:
-                        check_file_and_sheet(op.file_id, source_table, prefix)
-                # 注册新 sheet
-                register_new_sheet(op.file_id, op.name)
-
-            elif isinstance(op, TakeOperation):
-                check_file_and_sheet(op.file_id, op.table, prefix)
-                # 如果输出到新 sheet，注册它
-                if op.output and op.output.get("type") == "new_sheet":
-                    register_new_sheet(op.file_id, op.output["name"])
-            elif isinstance(op, SelectColumnsOperation):
-                check_file_and_sheet(op.file_id, op.table, prefix)
-                if op.output and op.output.get("type") == "new_sheet":
-                    register_new_sheet(op.file_id, op.output["name"])
-            elif isinstance(op, DropColumnsOperation):
-                check_file_and_sheet(op.file_id, op.table, prefix)
-                if op.output and op.output.get("type") == "new_sheet":
-                    register_new_sheet(op.file_id, op.output["name"])
+# 操作类型 -> 解析函数
+_OPERATION_PARSERS = {
+    "aggregate": OperationParser._parse_aggregate,
+    "add_column": OperationParser._parse_add_column,
+    "update_column": OperationParser._parse_update_column,
+    "compute": OperationParser._parse_compute,
+    "filter": OperationParser._parse_filter,
+    "sort": OperationParser._parse_sort,
+    "group_by": OperationParser._parse_group_by,
+    "create_sheet": OperationParser._parse_create_sheet,
+    "take": OperationParser._parse_take,
+    "select_columns": OperationParser._parse_select_columns,
+    "drop_columns": OperationParser._parse_drop_columns,
+}
 
-        return errors
+
+def _missing_field_errors(op_data: Dict[str, Any], op_type: str, prefix: str) -> List[str]:
+    """检查操作的必需字段，返回缺失字段的错误信息"""
+    if op_data.keys() >= _REQUIRED_FIELD_SETS[op_type]:
+        return []
+    return [
+        f"{prefix}: 缺少必需字段 '{field}'"
+        for field in REQUIRED_FIELDS[op_type]
+        if field not in op_data
+    ]
 
 
 # ==================== 便捷函数 ====================
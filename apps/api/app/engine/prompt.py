@@ -1,5 +1,12 @@
 """系统提示词 - LLM 生成操作描述的指导"""
 
+import threading
+from collections import OrderedDict
+from typing import Any
+
+# 带表结构的需求分析提示词缓存上限（同一工作簿的多轮对话复用已拼好的提示词，超出时淘汰最久未使用的）
+ANALYSIS_PROMPT_CACHE_MAXSIZE = 64
+
 # ==================== 第一步：需求分析提示词 ====================
 
 ANALYSIS_PROMPT = """
@@ -1047,55 +1054,96 @@ VLOOKUP 用于跨表查找，格式固定为：
 # ==================== 辅助函数 ====================
 
 
+_analysis_prompt_cache: "OrderedDict[Any, str]" = OrderedDict()
+_analysis_prompt_cache_lock = threading.Lock()
+
+
+def _freeze_schema(value: Any) -> Any:
+    """
+    将表结构转换为可哈希的嵌套元组，用作提示词缓存的键
+
+    标量带上类型，避免 1/1.0/True 这类相等但格式化结果不同的样本值发生冲突。
+    """
+    if isinstance(value, dict):
+        return tuple((k, _freeze_schema(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return (list, tuple(_freeze_schema(v) for v in value))
+    return (type(value), value)
+
+
 def get_analysis_prompt_with_schema(table_schemas: dict = None) -> str:
     """
-    获取带表结构信息的需求分析提示词
+    获取带表结构信息的需求分析提示词（按表结构内容缓存）
 
     Args:
         table_schemas: 支持两种格式
             - 简单格式: {file_id: {sheet_name: {col_letter: col_name}}}
             - 增强格式: {file_id: {sheet_name: [{name, type, samples}, ...]}}
     """
-    prompt = ANALYSIS_PROMPT
-
-    if table_schemas:
-        schema_text = "\n\n## 当前表结构信息\n\n"
-
-        # 两层结构：文件 -> sheets
-        for file_id, file_sheets in table_schemas.items():
-            schema_text += f"### 文件 ID: {file_id}\n\n"
-            for sheet_name, fields in file_sheets.items():
-                schema_text += f"**Sheet: {sheet_name}**\n"
-
-                # 检测 schema 格式
-                if isinstance(fields, list):
-                    # 增强格式：包含类型和样本
-                    schema_text += "| 列名 | 类型 | 样本数据 |\n"
-                    schema_text += "|------|------|----------|\n"
-                    for col_info in fields:
-                        name = col_info.get("name", "")
-                        col_type = col_info.get("type", "text")
-                        samples = col_info.get("samples", [])
-                        if samples:
-                            samples_str = ", ".join(
-                                f'"{s}"' if isinstance(s, str) else str(s)
-                                for s in samples[:3]
-                            )
-                        else:
-                            samples_str = "(空)"
-                        schema_text += f"| {name} | {col_type} | {samples_str} |\n"
-                else:
-                    # 简单格式（兼容旧代码）
-                    field_list = ", ".join(fields.values())
-                    schema_text += f"列：{field_list}\n"
-
-                schema_text += "\n"
-
-        prompt = prompt + schema_text
-
+    if not table_schemas:
+        return ANALYSIS_PROMPT
+
+    try:
+        key = _freeze_schema(table_schemas)
+        hash(key)
+    except TypeError:
+        # 样本中含不可哈希的值时不缓存
+        return _build_analysis_prompt(table_schemas)
+
+    with _analysis_prompt_cache_lock:
+        cached = _analysis_prompt_cache.get(key)
+        if cached is not None:
+            _analysis_prompt_cache.move_to_end(key)
+            return cached
+
+    prompt = _build_analysis_prompt(table_schemas)
+    with _analysis_prompt_cache_lock:
+        _analysis_prompt_cache[key] = prompt
+        if len(_analysis_prompt_cache) > ANALYSIS_PROMPT_CACHE_MAXSIZE:
+            _analysis_prompt_cache.popitem(last=False)
     return prompt
 
 
+def _build_analysis_prompt(table_schemas: dict) -> str:
+    """拼接需求分析提示词与表结构信息"""
+    if not table_schemas:
+        return ANALYSIS_PROMPT
+
+    # 静态提示词作为第一段，与表结构一起只拼接一次
+    parts = [ANALYSIS_PROMPT, "\n\n## 当前表结构信息\n\n"]
+
+    # 两层结构：文件 -> sheets
+    for file_id, file_sheets in table_schemas.items():
+        parts.append(f"### 文件 ID: {file_id}\n\n")
+        for sheet_name, fields in file_sheets.items():
+            parts.append(f"**Sheet: {sheet_name}**\n")
+
+            # 检测 schema 格式
+            if isinstance(fields, list):
+                # 增强格式：包含类型和样本
+                parts.append("| 列名 | 类型 | 样本数据 |\n")
+                parts.append("|------|------|----------|\n")
+                for col_info in fields:
+                    name = col_info.get("name", "")
+                    col_type = col_info.get("type", "text")
+                    samples = col_info.get("samples", [])
+                    if samples:
+                        samples_str = ", ".join(
+                            f'"{s}"' if isinstance(s, str) else str(s)
+                            for s in samples[:3]
+                        )
+                    else:
+                        samples_str = "(空)"
+                    parts.append(f"| {name} | {col_type} | {samples_str} |\n")
+            else:
+                # 简单格式（兼容旧代码）
+                parts.append(f"列：{', '.join(fields.values())}\n")
+
+            parts.append("\n")
+
+    return "".join(parts)
+
+
 def get_generation_prompt_with_context(table_schemas: dict = None, analysis_result: str = None) -> str:
     """
     获取带上下文的操作生成提示词
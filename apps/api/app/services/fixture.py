@@ -3,7 +3,7 @@
 import logging
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import yaml
 
@@ -75,6 +75,26 @@ class FixtureService:
 
     def __init__(self, fixtures_dir: Optional[Path] = None):
         self.fixtures_dir = fixtures_dir or FIXTURES_DIR
+        # YAML 解析缓存：{文件路径: (mtime_ns, 解析结果)}
+        self._yaml_cache: Dict[Path, Tuple[int, Any]] = {}
+
+    def _load_yaml(self, path: Path) -> Any:
+        """
+        读取 YAML 文件（按修改时间缓存）
+
+        fixture 文件很少变动，文件未修改时直接复用上次的解析结果，
+        修改后（mtime 变化）自动重新读取。
+        """
+        mtime = path.stat().st_mtime_ns
+        cached = self._yaml_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+
+        self._yaml_cache[path] = (mtime, data)
+        return data
 
     def load_index(self) -> FixtureIndex:
         """
@@ -87,8 +107,7 @@ class FixtureService:
         if not index_path.exists():
             raise FileNotFoundError(f"Fixture 索引文件不存在: {index_path}")
 
-        with open(index_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
+        data = self._load_yaml(index_path)
 
         groups = []
         for g in data.get("groups", []):
@@ -130,8 +149,7 @@ class FixtureService:
         if not meta_path.exists():
             raise FileNotFoundError(f"场景元数据不存在: {meta_path}")
 
-        with open(meta_path, "r", encoding="utf-8") as f:
-            meta = yaml.safe_load(f)
+        meta = self._load_yaml(meta_path)
 
         # 构建数据集列表
         datasets = []
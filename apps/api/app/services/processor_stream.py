@@ -10,7 +10,7 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
 
-from sse_starlette.sse import ServerSentEvent
+import numpy as np
 
 from app.api.deps import get_llm_client
 from app.core.sse import (
@@ -19,7 +19,7 @@ from app.core.sse import (
     sse_step_done,
     sse_step_error,
 )
-from app.engine.models import FileCollection, column_index_to_letter
+from app.engine.models import FileCollection, Table, column_letters
 from app.processor import ExcelProcessor, ProcessConfig, EventType
 from app.services.oss import upload_file
 
@@ -68,6 +68,46 @@ def _dtype_to_friendly(dtype: str) -> str:
     return "text"
 
 
+# numpy dtype.kind → 友好类型名称（与 _dtype_to_friendly 的判定结果一致）
+_KIND_TO_FRIENDLY = {
+    "i": "number",
+    "u": "number",
+    "f": "number",
+    "M": "date",
+    "m": "date",
+    "b": "boolean",
+}
+
+
+def _friendly_type(dtype) -> str:
+    """
+    根据 dtype 对象获取友好类型名称
+
+    numpy 原生 dtype 直接按 kind 查表；pandas 扩展类型（Int64、category 等）
+    退回到基于名称的 _dtype_to_friendly。
+    """
+    if isinstance(dtype, np.dtype):
+        return _KIND_TO_FRIENDLY.get(dtype.kind, "text")
+    return _dtype_to_friendly(str(dtype))
+
+
+def _build_sheet_info(sheet_name: str, table: Table) -> Dict[str, Any]:
+    """构建单个 sheet 的信息（名称、行数、列信息）"""
+    # 一次取出所有列的 dtype，避免逐列 df[col] 构造 Series
+    dtypes = table.get_data().dtypes
+
+    return {
+        "name": sheet_name,
+        "row_count": table.row_count(),
+        "columns": [
+            {"name": col_name, "letter": letter, "type": _friendly_type(dtype)}
+            for letter, col_name, dtype in zip(
+                column_letters(len(dtypes)), dtypes.index.tolist(), dtypes.tolist()
+            )
+        ],
+    }
+
+
 def build_file_collection_info(tables: FileCollection) -> List[Dict[str, Any]]:
     """
     构建 FileCollection 的详细信息
@@ -91,39 +131,17 @@ def build_file_collection_info(tables: FileCollection) -> List[Dict[str, Any]]:
             }
         ]
     """
-    files_info = []
-
-    for excel_file in tables:
-        file_info = {
+    return [
+        {
             "file_id": excel_file.file_id,
             "filename": excel_file.filename,
-            "sheets": [],
+            "sheets": [
+                _build_sheet_info(sheet_name, excel_file.get_sheet(sheet_name))
+                for sheet_name in excel_file.get_sheet_names()
+            ],
         }
-
-        for sheet_name in excel_file.get_sheet_names():
-            table = excel_file.get_sheet(sheet_name)
-            df = table.get_data()
-
-            columns_info = []
-            for idx, col_name in enumerate(table.get_columns()):
-                col_letter = column_index_to_letter(idx)
-                dtype = str(df[col_name].dtype)
-                friendly_type = _dtype_to_friendly(dtype)
-
-                columns_info.append(
-                    {"name": col_name, "letter": col_letter, "type": friendly_type}
-                )
-
-            sheet_info = {
-                "name": sheet_name,
-                "row_count": table.row_count(),
-                "columns": columns_info,
-            }
-            file_info["sheets"].append(sheet_info)
-
-        files_info.append(file_info)
-
-    return files_info
+        for excel_file in tables
+    ]
 
 
 async def _export_modified_files(
@@ -142,7 +160,9 @@ async def _export_modified_files(
     Returns:
         导出文件列表：[{file_id, filename, url}, ...]
     """
+    # 同一批导出共用时间戳目录，对象名前缀只拼接一次
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    object_prefix = f"{path_prefix}/{timestamp}/"
     output_files = []
 
     for file_id in modified_file_ids:
@@ -154,7 +174,7 @@ async def _export_modified_files(
             excel_bytes = await asyncio.to_thread(tables.export_file_to_bytes, file_id)
 
             # 生成对象名称
-            object_name = f"{path_prefix}/{timestamp}/{filename}"
+            object_name = object_prefix + filename
 
             # 上传到 OSS
             public_url = upload_file(
@@ -185,7 +205,7 @@ async def stream_excel_processing(
     on_event: Optional[StageCallback] = None,
     on_failure: Optional[FailureCallback] = None,
     on_load_tables: Optional[Callable[[FileCollection], Awaitable[None]]] = None,
-) -> AsyncGenerator[ServerSentEvent, None]:
+) -> AsyncGenerator[bytes, None]:
     """
     完整的 Excel 处理流式输出
 
@@ -201,7 +221,7 @@ async def stream_excel_processing(
         on_load_tables: 加载表格后回调（可用于缓存等副作用）
 
     Yields:
-        ServerSentEvent 事件
+        SSE 事件帧（bytes）
 
     Example:
         # chat.py
@@ -0,0 +1,236 @@
+"""Excel 公式生成器测试"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from app.engine import excel_generator
+from app.engine.excel_generator import (
+    ExcelFormulaGenerator,
+    format_formula_output,
+    generate_formulas,
+)
+from app.engine.models import ExcelFile, FileCollection, Table
+from app.engine.parser import parse_operations
+
+
+@pytest.fixture
+def tables():
+    collection = FileCollection()
+    excel_file = ExcelFile("f", "orders.xlsx")
+    excel_file.add_sheet(Table("S", pd.DataFrame({"x": [1, 2], "y": ["a", "b"]})))
+    collection.add_file(excel_file)
+    return collection
+
+
+@pytest.fixture
+def generator(tables):
+    return ExcelFormulaGenerator(tables)
+
+
+def _plus_one(column):
+    return {"op": "+", "left": {"col": column}, "right": {"value": 1}}
+
+
+def test_formula_cache_evicts_least_recently_used(generator, monkeypatch):
+    monkeypatch.setattr(excel_generator, "FORMULA_CACHE_MAXSIZE", 2)
+
+    generator.generate_formula(_plus_one("x"), "f", "S")
+    generator.generate_formula(_plus_one("y"), "f", "S")
+    generator.generate_formula(_plus_one("x"), "f", "S")
+    generator.generate_formula({"col": "y"}, "f", "S")
+
+    cached = [key[0] for key in generator._formula_cache]
+    assert cached == [excel_generator._freeze(_plus_one("x")), excel_generator._freeze({"col": "y"})]
+
+
+def test_freeze_keeps_value_types_apart():
+    assert excel_generator._freeze({"value": 1}) != excel_generator._freeze({"value": True})
+    assert excel_generator._freeze({"value": 1}) != excel_generator._freeze({"value": 1.0})
+    assert excel_generator._freeze({"value": [1]}) != excel_generator._freeze({"value": 1})
+
+
+def test_deeply_nested_expression(generator):
+    expr = {"col": "x"}
+    for _ in range(5000):
+        expr = {"op": "+", "left": expr, "right": {"value": 1}}
+
+    formula = generator.generate_formula(expr, "f", "S")
+
+    assert formula.startswith("(" * 5000 + "A{row}+1)")
+    assert generator.generate_formula(expr, "f", "S") is formula
+
+
+# ==================== 公式生成结果 ====================
+
+
+@pytest.fixture
+def orders():
+    collection = FileCollection()
+    excel_file = ExcelFile("orders", "orders.xlsx")
+    excel_file.add_sheet(Table("Sheet1", pd.DataFrame({
+        "id": [1], "amount": [2.0], "name": ["x"], "region": ["n"],
+    })))
+    # 30 列：c0..c29 对应 A..AD
+    excel_file.add_sheet(Table("Wide", pd.DataFrame({f"c{i}": [i] for i in range(30)})))
+    collection.add_file(excel_file)
+    return collection
+
+
+_FORMULAS = [
+    # 嵌套二元运算（每层加括号）、变量占位符
+    (
+        {"op": "*",
+         "left": {"op": "+", "left": {"col": "amount"}, "right": {"value": 1}},
+         "right": {"op": "-", "left": {"col": "id"}, "right": {"var": "avg"}}},
+        "((B{row}+1)*(A{row}-${avg}))",
+    ),
+    ({"op": "==", "left": {"col": "name"}, "right": {"value": "x"}}, '(C{row}="x")'),
+    ({"op": "!=", "left": {"col": "name"}, "right": {"value": "x"}}, '(C{row}<>"x")'),
+    ({"value": False}, "FALSE"),
+    ({"func": "round", "args": [{"col": "amount"}, {"value": 2}]}, "ROUND(B{row}, 2)"),
+    # IF
+    (
+        {"func": "IF", "args": [
+            {"op": ">", "left": {"col": "amount"}, "right": {"value": 10}},
+            {"value": "高"}, {"value": "低"}]},
+        'IF((B{row}>10), "高", "低")',
+    ),
+    ({"func": "IF", "args": [{"value": True}]}, "#ERROR"),
+    # CONCAT 用 & 连接
+    (
+        {"func": "CONCAT", "args": [{"col": "name"}, {"value": "-"}, {"col": "region"}]},
+        'C{row}&"-"&D{row}',
+    ),
+    # COUNTIFS
+    (
+        {"func": "COUNTIFS", "args": [
+            {"ref": "orders.Sheet1.region"}, {"col": "region"},
+            {"ref": "orders.Sheet1.amount"}, {"value": ">0"}]},
+        'COUNTIFS(Sheet1!D:D, D{row}, Sheet1!B:B, ">0")',
+    ),
+    ({"func": "COUNTIFS", "args": [{"ref": "orders.Sheet1.region"}]}, "#ERROR"),
+    # VLOOKUP：多字母列按列序号计算偏移
+    (
+        {"func": "VLOOKUP", "args": [
+            {"col": "id"}, {"value": "orders.Wide"}, {"value": "c1"}, {"value": "c29"}]},
+        "VLOOKUP(A{row}, Wide!B:AD, 29, FALSE)",
+    ),
+    (
+        {"func": "VLOOKUP", "args": [
+            {"col": "id"}, {"value": "orders.Wide"}, {"value": "c0"}, {"value": "c26"}]},
+        "VLOOKUP(A{row}, Wide!A:AA, 27, FALSE)",
+    ),
+    (
+        {"func": "VLOOKUP", "args": [
+            {"col": "id"}, {"value": "orders.Missing"}, {"value": "c0"}, {"value": "c1"}]},
+        "#ERROR",
+    ),
+    # 字符串中的双引号写成两个双引号
+    ({"value": 'say "hi"'}, '"say ""hi"""'),
+    (
+        {"func": "SUBSTITUTE", "args": [{"col": "name"}, {"value": '"'}, {"value": ""}]},
+        'SUBSTITUTE(C{row}, """", "")',
+    ),
+]
+
+
+@pytest.mark.parametrize("expr, expected", _FORMULAS)
+def test_generate_formula(orders, expr, expected):
+    generator = ExcelFormulaGenerator(orders)
+    assert generator.generate_formula(expr, "orders", "Sheet1") == expected
+
+
+def test_generate_formula_row_placeholder(orders):
+    generator = ExcelFormulaGenerator(orders)
+    expr = {"op": "+", "left": {"col": "amount"}, "right": {"col": "id"}}
+    assert generator.generate_formula(expr, "orders", "Sheet1", row_placeholder="2") == "(B2+A2)"
+
+
+_TABLE = {"file_id": "orders", "table": "Sheet1"}
+
+_OPERATIONS = [
+    {"type": "aggregate", **_TABLE, "function": "SUM", "column": "amount", "as": "total"},
+    {"type": "add_column", **_TABLE, "name": "double",
+     "formula": {"op": "*", "left": {"col": "amount"}, "right": {"value": 2}}},
+    {"type": "update_column", **_TABLE, "column": "name",
+     "formula": {"func": "UPPER", "args": [{"col": "name"}]}},
+    {"type": "filter", **_TABLE, "conditions": [{"column": "amount", "op": ">", "value": 1}],
+     "logic": "AND", "output": {"type": "new_sheet", "name": "Big"}},
+    {"type": "sort", **_TABLE, "by": [{"column": "amount", "order": "desc"}]},
+    {"type": "group_by", **_TABLE, "group_columns": ["region"],
+     "aggregations": [{"column": "amount", "function": "sum", "as": "s"}],
+     "output": {"type": "new_sheet", "name": "G"}},
+    {"type": "create_sheet", "file_id": "orders", "name": "Summary", "source": {"type": "empty"}},
+    {"type": "take", **_TABLE, "rows": 3},
+    {"type": "select_columns", **_TABLE, "columns": ["name", "amount"]},
+    {"type": "drop_columns", **_TABLE, "columns": ["region"]},
+]
+
+_EXPECTED_OUTPUT = """\
+1. 计算 Sheet1 表「amount」列的求和
+   文件: orders.xlsx
+   Sheet: Sheet1
+   变量: total
+   公式: =聚合公式（SUM）
+2. 在 Sheet1 表中新增「double」列
+   文件: orders.xlsx
+   Sheet: Sheet1
+   公式模板: =(B{row}*2)
+   说明: 将 {row} 替换为行号（如 2, 3, 4...），下拉填充
+3. 更新 Sheet1 表中「name」列的值
+   文件: orders.xlsx
+   Sheet: Sheet1
+   公式模板: =UPPER(C{row})
+   说明: 将 {row} 替换为行号（如 2, 3, 4...），覆盖原列
+4. 筛选 Sheet1 表中符合条件的数据到 Big
+   文件: orders.xlsx
+   源表: Sheet1
+   输出表: Big
+   公式: =FILTER(Sheet1!A:D, (Sheet1!B:B>1))
+   ⚠️ 此公式需要 Excel 365 或 Excel 2021 及以上版本
+5. 对 Sheet1 表按指定列排序
+   文件: orders.xlsx
+   源表: Sheet1
+   输出表: Sheet1
+   公式: =SORT(Sheet1!A:D, 2, -1)
+   ⚠️ 此公式需要 Excel 365 或 Excel 2021 及以上版本
+6. 按 region 分组统计 Sheet1 表，结果输出到 G
+   文件: orders.xlsx
+   源表: Sheet1
+   输出表: G
+   公式: =GROUPBY(Sheet1!D:D, Sheet1!B:B, SUM)
+   ⚠️ GROUPBY 函数需要 Excel 365（2023年9月更新版本）
+7. 创建新工作表 Summary
+   文件: orders.xlsx
+   新Sheet: Summary
+   这是工作表操作，需要手动在 Excel 中创建
+8. 从 Sheet1 表取前 3 行
+   文件: orders.xlsx
+   源表: Sheet1
+   输出表: Sheet1
+   公式: =TAKE(Sheet1!A:D, 3)
+   ⚠️ TAKE 函数需要 Excel 365 或 Excel 2021 及以上版本
+9. 从 Sheet1 表中选择指定列
+   文件: orders.xlsx
+   源表: Sheet1
+   输出表: Sheet1
+   公式: =CHOOSECOLS(Sheet1!A:D, 3, 2)
+   ⚠️ CHOOSECOLS 函数需要 Excel 365 或 Excel 2021 及以上版本
+10. 从 Sheet1 表中删除指定列
+   文件: orders.xlsx
+   源表: Sheet1
+   输出表: Sheet1
+   公式: =CHOOSECOLS(Sheet1!A:D, 1, 2, 3)
+   ⚠️ CHOOSECOLS 函数需要 Excel 365 或 Excel 2021 及以上版本"""
+
+
+def test_format_formula_output_for_each_operation_type(orders):
+    operations, errors = parse_operations(json.dumps({"operations": _OPERATIONS}))
+    assert errors == []
+
+    results = generate_formulas(operations, orders)
+
+    assert [result["type"] for result in results] == [op["type"] for op in _OPERATIONS]
+    assert format_formula_output(results) == _EXPECTED_OUTPUT
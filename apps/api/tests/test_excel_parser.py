@@ -0,0 +1,106 @@
+"""Excel 解析器测试"""
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+from openpyxl.styles import Font
+
+from app.engine import excel_parser
+from app.engine.excel_parser import ExcelParser
+
+
+def _build_workbook(path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "data"
+    ws.append(["a", "a", None, "a.1", "a"])
+    ws.append([1, 2, 3])
+    ws.append([4, 5, 6, 7, 8, 9])
+    # 带格式的空单元格会扩大工作表记录的维度，但不是数据
+    ws["A10"].font = Font(bold=True)
+    wb.create_sheet("empty")
+    wb.save(path)
+
+
+def test_get_file_info_matches_read_excel(tmp_path):
+    path = tmp_path / "info.xlsx"
+    _build_workbook(path)
+
+    info = ExcelParser.get_file_info(path)
+
+    assert info["file_name"] == "info.xlsx"
+    assert info["sheets"]["data"] == {
+        "rows": 2,
+        "columns": 6,
+        "column_names": ["a", "a.2", "Unnamed: 2", "a.1", "a.3", "Unnamed: 5"],
+    }
+    assert info["sheets"]["empty"] == {"rows": 0, "columns": 0, "column_names": []}
+
+    df = pd.read_excel(path, sheet_name="data", engine="openpyxl")
+    assert info["sheets"]["data"]["rows"] == len(df)
+    assert info["sheets"]["data"]["column_names"] == list(df.columns)
+
+
+def _build_data_workbook(path):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "orders"
+    ws.append(["id", " name ", "amount", "note"])
+    ws.append([1, "a", 1.5, None])
+    ws.append([None, None, None, None])
+    ws.append([3, "c", None, "x"])
+    ws.append([4, None, 2.25, None])
+    other = wb.create_sheet("other")
+    other.append(["k", "v"])
+    other.append(["p", 10])
+    wb.save(path)
+
+
+def test_calamine_engine_matches_openpyxl(tmp_path, monkeypatch):
+    pytest.importorskip("python_calamine")
+    path = tmp_path / "orders.xlsx"
+    _build_data_workbook(path)
+
+    results = {}
+    for engine in ("openpyxl", "calamine"):
+        monkeypatch.setattr(excel_parser, "EXCEL_ENGINE", engine)
+        collection = ExcelParser.parse_file_all_sheets(path, file_id="f")
+        results[engine] = {
+            name: collection.get_table("f", name).get_data()
+            for name in ("orders", "other")
+        }
+
+    for name, expected in results["openpyxl"].items():
+        pd.testing.assert_frame_equal(results["calamine"][name], expected)
+    assert list(results["calamine"]["orders"].columns) == ["id", "name", "amount", "note"]
+    assert len(results["calamine"]["orders"]) == 3
+
+
+def test_numba_missing_rows_match_pandas():
+    pytest.importorskip("numba")
+    df = pd.DataFrame({
+        "a": [1.0, np.nan, np.nan, 4.0, np.nan],
+        "b": pd.array([1, None, 3, None, None], dtype="Int64"),
+        "c": ["x", None, None, None, None],
+    })
+
+    mask = ExcelParser._all_missing_rows(df)
+
+    np.testing.assert_array_equal(mask, df.isna().all(axis=1).to_numpy())
+
+
+def test_clean_dataframe_numba_path_matches_dropna(monkeypatch):
+    pytest.importorskip("numba")
+    rng = np.random.default_rng(0)
+    values = rng.random((200, 3))
+    values[rng.random(200) < 0.3] = np.nan
+    df = pd.DataFrame(values, columns=["a", "b", "c"])
+    df["d"] = np.where(np.isnan(values[:, 0]), None, "t")
+
+    monkeypatch.setattr(excel_parser, "NUMBA_MIN_ROWS", 0)
+    fast = ExcelParser._clean_dataframe(df.copy())
+    monkeypatch.setattr(excel_parser, "njit", None)
+    fallback = ExcelParser._clean_dataframe(df.copy())
+
+    pd.testing.assert_frame_equal(fast, fallback)
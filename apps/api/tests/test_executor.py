@@ -0,0 +1,63 @@
+"""执行引擎测试"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.engine import executor
+from app.engine.executor import execute_operations
+from app.engine.models import ExcelFile, FileCollection, Table
+from app.engine.parser import parse_operations
+
+
+def _collection():
+    collection = FileCollection()
+    excel_file = ExcelFile("f", "orders.xlsx")
+    excel_file.add_sheet(Table("orders", pd.DataFrame({
+        "qty": [1, 2, 2, 5, 3],
+        "price": [1.5, np.nan, 2.0, 4.0, 0.5],
+        "region": ["n", "s", "n", None, "s"],
+    })))
+    collection.add_file(excel_file)
+    return collection
+
+
+def _aggregate(function, column, condition_column, condition, name):
+    return {
+        "type": "aggregate", "function": function, "file_id": "f", "table": "orders",
+        "column": column, "condition_column": condition_column, "condition": condition,
+        "as": name,
+    }
+
+
+_OPERATIONS = [
+    _aggregate("SUMIF", "price", "qty", ">=2", "sum_ge2"),
+    _aggregate("SUMIF", "price", "qty", 2, "sum_eq2"),
+    _aggregate("AVERAGEIF", "price", "qty", "<>2", "avg_ne2"),
+    _aggregate("AVERAGEIF", "price", "qty", ">100", "avg_none"),
+    _aggregate("COUNTIF", None, "qty", "<3", "count_lt3"),
+    _aggregate("COUNTIF", None, "region", "n", "count_text"),
+    _aggregate("SUMIF", "price", "region", "s", "sum_text"),
+]
+
+
+def _run():
+    operations, errors = parse_operations(json.dumps({"operations": _OPERATIONS}))
+    assert errors == []
+    result = execute_operations(operations, _collection())
+    assert result.errors == []
+    return result.variables
+
+
+def test_conditional_aggregates_numba_path_matches_fallback(monkeypatch):
+    pytest.importorskip("numba")
+    fast = _run()
+    monkeypatch.setattr(executor, "NUMBA_AVAILABLE", False)
+    monkeypatch.setattr("app.engine.functions.NUMBA_AVAILABLE", False)
+    fallback = _run()
+
+    assert fast == fallback
+    assert fast["sum_ge2"] == 6.5
+    assert fast["count_lt3"] == 3
@@ -0,0 +1,90 @@
+"""函数库测试"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.engine import functions
+from app.engine.executor import FormulaEvaluator
+from app.engine.functions import ROW_FUNC_MAP
+from app.engine.models import VALUE, ExcelFile, FileCollection, Table
+
+
+def test_text_functions_return_value_error():
+    assert functions.FIND("x", "abc") is VALUE
+    assert functions.SEARCH("x", "abc") is VALUE
+    assert functions.VALUE("abc") is VALUE
+    assert functions.LEFT("abc", -1) is VALUE
+    assert functions.RIGHT("abc", -1) is VALUE
+    assert functions.MID("abc", 0, 1) is VALUE
+    assert functions.MIN([]) is VALUE
+
+
+def test_error_checks_see_value_error():
+    assert functions.ISERROR(functions.FIND("x", "abc")) is True
+    assert functions.IFERROR(functions.VALUE("abc"), -1) == -1
+
+
+def test_iferror_value_in_row_formula():
+    table = Table("s", pd.DataFrame({"cabin": ["C85", "12", None]}))
+    excel_file = ExcelFile("f", "f.xlsx")
+    excel_file.add_sheet(table)
+    collection = FileCollection()
+    collection.add_file(excel_file)
+
+    evaluator = FormulaEvaluator(
+        collection,
+        ROW_FUNC_MAP,
+        columns={"cabin": table.get_column("cabin")},
+    )
+    run = evaluator.compile({
+        "func": "IFERROR",
+        "args": [{"func": "VALUE", "args": [{"col": "cabin"}]}, {"value": -1}],
+    })
+    assert [run(i) for i in range(2)] == [-1, 12.0]
+
+
+# ==================== numba 内核与纯 Python 实现一致 ====================
+
+_CONDITIONS = [2, 2.5, ">2", ">=2", "<3", "<=3", "<>2", "=2", "x", ">a"]
+
+
+def _float_ranges():
+    values = np.array([1.0, 2.0, np.nan, 3.5, 2.0, 10.0])
+    criteria = np.array([1.0, 2.0, 2.0, np.nan, 3.0, 2.5])
+    return values, criteria
+
+
+@pytest.mark.parametrize("condition", _CONDITIONS)
+def test_conditional_aggregates_jit_match_python(condition, monkeypatch):
+    pytest.importorskip("numba")
+    values, criteria = _float_ranges()
+
+    fast = (
+        functions.SUMIF(values, criteria, condition),
+        functions.COUNTIF(criteria, condition),
+        functions.AVERAGEIF(values, criteria, condition),
+    )
+    monkeypatch.setattr(functions, "NUMBA_AVAILABLE", False)
+    fallback = (
+        functions.SUMIF(values, criteria, condition),
+        functions.COUNTIF(criteria, condition),
+        functions.AVERAGEIF(values, criteria, condition),
+    )
+
+    assert fast == fallback
+
+
+def test_sum_uses_pairwise_summation():
+    values = np.full(1000, 0.1)
+    values[::7] = np.nan
+
+    valid = values[~np.isnan(values)]
+    sequential = 0.0
+    for v in valid:
+        sequential += v
+
+    expected = float(valid.sum())
+    assert expected != sequential
+    assert functions.SUM(values) == expected
+    assert functions.AVERAGE(values) == expected / len(valid)
@@ -0,0 +1,49 @@
+"""LLM 客户端日志测试"""
+
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+from app.engine.llm_client import LLMClient
+
+
+class _FakeCompletions:
+    def create(self, **kwargs):
+        if kwargs.get("stream"):
+            return iter([
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+                for part in ("响应", "内容")
+            ])
+        message = SimpleNamespace(content=" 响应内容 ")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def client():
+    client = LLMClient(api_key="test-key", base_url="http://localhost", model="test-model")
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions()))
+    return client
+
+
+def _call_both(client):
+    assert client._call_llm("系统提示词", "用户消息") == "响应内容"
+    assert list(client._call_llm_stream("系统提示词", "用户消息"))[-1] == ("内容", "响应内容")
+
+
+def test_response_logged_at_info_without_prompt(client, caplog):
+    with caplog.at_level(logging.INFO, logger="llm_client"):
+        _call_both(client)
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert sum("[LLM 响应内容]" in message and "响应内容" in message for message in messages) == 2
+    assert not any("系统提示词" in message for message in messages)
+
+
+def test_prompt_logged_at_debug(client, caplog):
+    with caplog.at_level(logging.DEBUG, logger="llm_client"):
+        _call_both(client)
+
+    debug_messages = [r.getMessage() for r in caplog.records if r.levelno == logging.DEBUG]
+    assert len(debug_messages) == 2
+    assert all("系统提示词" in message and "用户消息" in message for message in debug_messages)
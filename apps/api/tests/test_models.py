@@ -0,0 +1,47 @@
+"""数据模型测试"""
+
+import datetime
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.engine import models
+from app.engine.models import ExcelFile, FileCollection, Table
+
+
+def _collection():
+    collection = FileCollection()
+    excel_file = ExcelFile("f", "orders.xlsx")
+    excel_file.add_sheet(Table("orders", pd.DataFrame({
+        "id": [1, 2, 3],
+        "name": ["a", None, "中文"],
+        "amount": [1.5, np.nan, 2.25],
+        "at": [datetime.datetime(2024, 1, 1), None, datetime.datetime(2024, 3, 1)],
+    })))
+    excel_file.add_sheet(Table("empty", pd.DataFrame({"x": []})))
+    collection.add_file(excel_file)
+    return collection
+
+
+def _read_back(content):
+    return pd.read_excel(io.BytesIO(content), sheet_name=None, engine="openpyxl")
+
+
+def test_xlsxwriter_export_matches_openpyxl(monkeypatch):
+    pytest.importorskip("xlsxwriter")
+    collection = _collection()
+
+    monkeypatch.setattr(models, "EXCEL_WRITER_ENGINE", "xlsxwriter")
+    fast = (collection.export_to_bytes(), collection.export_file_to_bytes("f"))
+    monkeypatch.setattr(models, "EXCEL_WRITER_ENGINE", "openpyxl")
+    fallback = (collection.export_to_bytes(), collection.export_file_to_bytes("f"))
+
+    for fast_content, fallback_content in zip(fast, fallback):
+        fast_sheets = _read_back(fast_content)
+        fallback_sheets = _read_back(fallback_content)
+        assert list(fast_sheets) == list(fallback_sheets)
+        for name, expected in fallback_sheets.items():
+            pd.testing.assert_frame_equal(fast_sheets[name], expected)
+    assert list(_read_back(fast[1])) == ["orders", "empty"]
@@ -0,0 +1,31 @@
+"""操作解析器测试"""
+
+import json
+
+import pytest
+
+from app.engine import parser
+
+
+_DOCUMENTS = [
+    '{"operations": [{"type": "aggregate", "function": "SUM", "value": 1.5}]}',
+    '{"text": "中文\\u00e9", "nested": [1, [2, {"a": null}]], "flag": true}',
+    '{"nan": NaN, "inf": Infinity}',
+    '{"big": 9223372036854775807, "negative": -9223372036854775808}',
+]
+
+
+@pytest.mark.parametrize("document", _DOCUMENTS)
+def test_loads_json_orjson_matches_stdlib(document, monkeypatch):
+    pytest.importorskip("orjson")
+    fast = parser._loads_json(document)
+    monkeypatch.setattr(parser, "orjson", None)
+    fallback = parser._loads_json(document)
+
+    assert json.dumps(fast, sort_keys=True) == json.dumps(fallback, sort_keys=True)
+
+
+def test_loads_json_invalid_input_raises_stdlib_error():
+    pytest.importorskip("orjson")
+    with pytest.raises(json.JSONDecodeError):
+        parser._loads_json('{"a": ')
@@ -0,0 +1,21 @@
+"""提示词构建测试"""
+
+from app.engine import prompt
+
+
+def _schema(column_name):
+    return {"f": {"s": {"A": column_name}}}
+
+
+def test_analysis_prompt_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(prompt, "ANALYSIS_PROMPT_CACHE_MAXSIZE", 2)
+    monkeypatch.setattr(prompt, "_analysis_prompt_cache", prompt.OrderedDict())
+
+    first = prompt.get_analysis_prompt_with_schema(_schema("x"))
+    prompt.get_analysis_prompt_with_schema(_schema("y"))
+    assert prompt.get_analysis_prompt_with_schema(_schema("x")) is first
+    prompt.get_analysis_prompt_with_schema(_schema("z"))
+
+    keys = list(prompt._analysis_prompt_cache)
+    assert keys == [prompt._freeze_schema(_schema("x")), prompt._freeze_schema(_schema("z"))]
+    assert "列：x" in first
@@ -0,0 +1,32 @@
+"""SSE 事件序列化测试"""
+
+import datetime
+import json
+
+import numpy as np
+import pytest
+
+from app.core import sse
+
+
+_OUTPUTS = [
+    {"rows": [[1, "a", None], [2.5, "中文", True]]},
+    {"value": np.float64(1.25), "count": np.int64(3), "array": np.array([1, 2])},
+    {"at": datetime.datetime(2024, 1, 2, 3, 4, 5), 1: "non-str key"},
+    {"big": 2 ** 70},
+]
+
+
+@pytest.mark.parametrize("output", _OUTPUTS)
+def test_step_done_orjson_matches_stdlib(output, monkeypatch):
+    pytest.importorskip("orjson")
+    fast = sse._dumps_output(output)
+    monkeypatch.setattr(sse, "orjson", None)
+    try:
+        fallback = sse._dumps_output(output)
+    except TypeError:
+        # 标准库不能直接序列化 numpy / datetime，只检查 orjson 的结果可解析
+        json.loads(fast)
+        return
+
+    assert json.loads(fast) == json.loads(fallback)